@@ -0,0 +1,441 @@
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from corpus_generators import (generate_passwords, generate_plain_file, generate_syslog,
+                               generate_tree)
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOOL_DIRS = ["Log Analyzer", "File Integrity Checker", "File Encryptor", "Password Tool"]
+for tool_dir in TOOL_DIRS:
+    sys.path.insert(0, os.path.join(REPO_ROOT, tool_dir))
+
+MB = 1024 * 1024
+
+# Input sizes for each scenario
+SIZES = {
+    'small': {'log_lines': 20_000, 'tree_files': 200, 'tree_bytes': 8 * MB,
+              'baseline_files': 10_000, 'image_bytes': 64 * MB, 'encrypt_bytes': 1 * MB,
+              'passwords': 10_000},
+    'medium': {'log_lines': 1_000_000, 'tree_files': 2_000, 'tree_bytes': 256 * MB,
+               'baseline_files': 100_000, 'image_bytes': 512 * MB, 'encrypt_bytes': 16 * MB,
+               'passwords': 200_000},
+    'huge': {'log_lines': 10_000_000, 'tree_files': 20_000, 'tree_bytes': 2048 * MB,
+             'baseline_files': 500_000, 'image_bytes': 4096 * MB, 'encrypt_bytes': 128 * MB,
+             'passwords': 2_000_000},
+}
+
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark setup that cannot run here (e.g. a missing package)"""
+
+
+def cached_input(path, generate):
+    """
+    Generate an input file or directory once and reuse it on later runs
+
+    Inputs are written under a temporary name and renamed when complete,
+    so an interrupted run never leaves a partial corpus behind.
+    """
+    if os.path.exists(path):
+        return path
+    temp_path = f"{path}.partial"
+    if os.path.isdir(temp_path):
+        shutil.rmtree(temp_path)
+    print(f"  generating {os.path.basename(path)}...")
+    generate(temp_path)
+    os.replace(temp_path, path)
+    return path
+
+
+def quiet():
+    """Silence a tool's progress output while it is being timed"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def bench_log_analyzer(data_dir, params, seed, use_mmap=False):
+    from log_analyzer import LogAnalyzer
+
+    lines = params['log_lines']
+    corpus = cached_input(os.path.join(data_dir, f"syslog-{lines}-{seed}.log"),
+                          lambda path: generate_syslog(path, lines, seed=seed))
+
+    def run():
+        with quiet():
+            if not LogAnalyzer().analyze_file(corpus, use_mmap=use_mmap):
+                raise RuntimeError(f"analyze_file failed on {corpus}")
+
+    return run, {'lines': lines, 'bytes': os.path.getsize(corpus)}
+
+
+def bench_log_analyzer_mmap(data_dir, params, seed):
+    return bench_log_analyzer(data_dir, params, seed, use_mmap=True)
+
+
+def bench_syslog_server(data_dir, params, seed):
+    from benchmark_syslog_server import measure
+
+    lines = params['log_lines']
+    corpus = cached_input(os.path.join(data_dir, f"syslog-{lines}-{seed}.log"),
+                          lambda path: generate_syslog(path, lines, seed=seed))
+
+    def run():
+        sent, server, _ = asyncio.run(measure(corpus, "tcp", None))
+        if server.analyzed != sent:
+            raise RuntimeError(f"syslog server analyzed {server.analyzed} of {sent} messages")
+
+    return run, {'messages': lines}
+
+
+def bench_integrity_check_all(data_dir, params, seed, mode="paranoid", checksum=None):
+    from file_hashing import file_metadata
+    from file_integrity_checker import FileIntegrityChecker
+
+    files, total = params['tree_files'], params['tree_bytes']
+    tree = cached_input(os.path.join(data_dir, f"tree-{files}-{total}-{seed}"),
+                        lambda path: generate_tree(path, files, total, seed=seed))
+    paths = [os.path.join(root, name) for root, _, names in os.walk(tree) for name in names]
+
+    database = os.path.join(data_dir, f"hashes-{files}-{total}-{seed}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    checker = FileIntegrityChecker(database_file=database, legacy_file=None, checksum=checksum)
+    with quiet():
+        for path in paths:
+            checker.hashes.set(path, checker.calculate_hash(path), file_metadata(path))
+        checker.save_hashes()
+        if checksum:
+            checker.check_all(mode="paranoid", tier="digest")  # stores the checksums
+
+    def run():
+        with quiet():
+            checker.check_all(mode=mode, tier="checksum" if checksum else "digest")
+
+    return run, {'files': len(paths), 'bytes': sum(os.path.getsize(path) for path in paths)}
+
+
+def bench_integrity_check_all_fast(data_dir, params, seed):
+    return bench_integrity_check_all(data_dir, params, seed, mode="fast")
+
+
+def bench_integrity_check_all_checksum(data_dir, params, seed):
+    return bench_integrity_check_all(data_dir, params, seed, checksum="crc32")
+
+
+def bench_integrity_monitor_tree(data_dir, params, seed):
+    from file_integrity_checker import FileIntegrityChecker
+
+    files, total = params['tree_files'], params['tree_bytes']
+    tree = cached_input(os.path.join(data_dir, f"tree-{files}-{total}-{seed}"),
+                        lambda path: generate_tree(path, files, total, seed=seed))
+    database = os.path.join(data_dir, f"tree-baseline-{files}-{total}-{seed}.db")
+
+    def run():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+        checker = FileIntegrityChecker(database_file=database, legacy_file=None)
+        with quiet():
+            if not checker.monitor_tree(tree):
+                raise RuntimeError(f"monitor_tree failed on {tree}")
+        checker.hashes.close()
+
+    paths = [os.path.join(root, name) for root, _, names in os.walk(tree) for name in names]
+    return run, {'files': len(paths), 'bytes': sum(os.path.getsize(path) for path in paths)}
+
+
+def bench_integrity_compare_baselines(data_dir, params, seed):
+    import random
+    import sqlite3
+    from baseline_store import BaselineStore
+    from file_integrity_checker import FileIntegrityChecker
+
+    # Two baselines of a synthetic tree (no files on disk) that differ in 10 files
+    files = params['baseline_files']
+    rng = random.Random(seed)
+    paths = [f"/srv/d{i // 10000}/e{i // 250 % 40}/f{i}" for i in range(files)]
+    databases = [os.path.join(data_dir, f"baseline-{files}-{seed}-{side}.db") for side in "ab"]
+    for database in databases:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+
+    store = BaselineStore(databases[0])
+    for path in paths:
+        store.set(path, f"{rng.getrandbits(256):064x}")
+    store.flush()
+    with sqlite3.connect(databases[1]) as copy:
+        store.connection.backup(copy)
+    store.close()
+    other = BaselineStore(databases[1])
+    for path in rng.sample(paths, 10):
+        other.set(path, f"{rng.getrandbits(256):064x}")
+    other.close()
+
+    checker = FileIntegrityChecker(database_file=databases[0], legacy_file=None)
+
+    def run():
+        with quiet():
+            if checker.compare_baseline(databases[1]):
+                raise RuntimeError("compare_baseline missed the differences")
+
+    return run, {'files': files}
+
+
+def bench_integrity_check_chunks(data_dir, params, seed, chunking="fixed"):
+    from file_integrity_checker import FileIntegrityChecker
+
+    size = params['image_bytes']
+    image = cached_input(os.path.join(data_dir, f"image-{size}-{seed}.img"),
+                         lambda path: generate_plain_file(path, size, seed))
+    database = os.path.join(data_dir, f"image-{chunking}-{size}-{seed}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(database + suffix):
+            os.remove(database + suffix)
+    checker = FileIntegrityChecker(database_file=database, legacy_file=None)
+    with quiet():
+        checker.monitor_file(image, chunking)
+
+    def run():
+        with quiet():
+            if not checker.check_file(image):
+                raise RuntimeError(f"check_file reported changes in {image}")
+
+    return run, {'files': 1, 'bytes': size}
+
+
+def bench_integrity_check_chunks_cdc(data_dir, params, seed):
+    return bench_integrity_check_chunks(data_dir, params, seed, chunking="cdc")
+
+
+def bench_hash_algorithm(data_dir, params, seed, algorithm="sha256"):
+    from file_hashing import hash_file
+
+    size = params['image_bytes']
+    image = cached_input(os.path.join(data_dir, f"image-{size}-{seed}.img"),
+                         lambda path: generate_plain_file(path, size, seed))
+
+    def run():
+        hash_file(image, algorithm=algorithm)
+
+    return run, {'files': 1, 'bytes': size}
+
+
+def bench_encrypt_file(data_dir, params, seed):
+    try:
+        from file_encryptor import FileEncryptor
+    except ImportError as e:
+        raise SkipBenchmark(f"File Encryptor needs the cryptography package ({e})")
+
+    size = params['encrypt_bytes']
+    plain = cached_input(os.path.join(data_dir, f"plain-{size}-{seed}.dat"),
+                         lambda path: generate_plain_file(path, size, seed))
+    encryptor = FileEncryptor()
+
+    def run():
+        # encrypt_file asks whether to delete the original; always keep it
+        with quiet(), mock.patch('builtins.input', return_value='n'):
+            if not encryptor.encrypt_file(plain, "benchmark passphrase"):
+                raise RuntimeError(f"encrypt_file failed on {plain}")
+        os.remove(plain + '.encrypted')
+
+    return run, {'files': 1, 'bytes': size}
+
+
+def bench_password_strength(data_dir, params, seed):
+    from password_tool import check_password_strength
+
+    count = params['passwords']
+    wordlist = cached_input(os.path.join(data_dir, f"passwords-{count}-{seed}.txt"),
+                            lambda path: generate_passwords(path, count, seed))
+    with open(wordlist, 'r') as f:
+        passwords = f.read().splitlines()
+
+    def run():
+        for password in passwords:
+            check_password_strength(password)
+
+    return run, {'passwords': len(passwords)}
+
+
+# name -> setup function returning (run once, work done by one run)
+BENCHMARKS = {
+    'log_analyzer.analyze_file': bench_log_analyzer,
+    'log_analyzer.analyze_file_mmap': bench_log_analyzer_mmap,
+    'log_analyzer.syslog_server_tcp': bench_syslog_server,
+    'file_integrity_checker.check_all': bench_integrity_check_all,
+    'file_integrity_checker.check_all_fast': bench_integrity_check_all_fast,
+    'file_integrity_checker.check_all_checksum': bench_integrity_check_all_checksum,
+    'file_integrity_checker.monitor_tree': bench_integrity_monitor_tree,
+    'file_integrity_checker.compare_baselines': bench_integrity_compare_baselines,
+    'file_integrity_checker.check_chunks_fixed': bench_integrity_check_chunks,
+    'file_integrity_checker.check_chunks_cdc': bench_integrity_check_chunks_cdc,
+    # One file hashed on one thread, from the page cache, with each algorithm
+    'file_integrity_checker.hash_sha256': functools.partial(bench_hash_algorithm, algorithm='sha256'),
+    'file_integrity_checker.hash_blake2b': functools.partial(bench_hash_algorithm, algorithm='blake2b'),
+    'file_integrity_checker.hash_blake2s': functools.partial(bench_hash_algorithm, algorithm='blake2s'),
+    'file_integrity_checker.hash_sha512': functools.partial(bench_hash_algorithm, algorithm='sha512'),
+    'file_integrity_checker.hash_sha3_256': functools.partial(bench_hash_algorithm, algorithm='sha3_256'),
+    'file_integrity_checker.hash_crc32': functools.partial(bench_hash_algorithm, algorithm='crc32'),
+    'file_integrity_checker.hash_adler32': functools.partial(bench_hash_algorithm, algorithm='adler32'),
+    'file_encryptor.encrypt_file': bench_encrypt_file,
+    'password_tool.check_password_strength': bench_password_strength,
+}
+
+
+def run_benchmark(name, data_dir, params, seed, repeat):
+    """
+    Set up one benchmark and time it
+
+    Returns:
+        Result dict (with a 'skipped' reason if it could not run)
+    """
+    try:
+        run, work = BENCHMARKS[name](data_dir, params, seed)
+    except SkipBenchmark as e:
+        return {'skipped': str(e)}
+
+    run()  # warm-up: fills the page cache and imports lazily loaded modules
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - started)
+
+    median = statistics.median(seconds)
+    return {
+        'work': work,
+        'seconds': seconds,
+        'min_seconds': min(seconds),
+        'median_seconds': median,
+        'throughput': {f"{unit}_per_second": amount / median for unit, amount in work.items()},
+    }
+
+
+def environment():
+    """Describe the machine and code being measured"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit or None,
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare median times against a baseline results file
+
+    Only benchmarks that ran with the same size, seed and work are compared.
+
+    Returns:
+        List of benchmark names that got slower by more than threshold
+    """
+    regressions = []
+    if (baseline.get('size'), baseline.get('seed')) != (results['size'], results['seed']):
+        print(f"Baseline is for size {baseline.get('size')!r}, seed {baseline.get('seed')!r}; "
+              "nothing to compare")
+        return regressions
+
+    print(f"\nCompared with baseline (threshold {threshold:.0%}):")
+    for name, result in results['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if 'skipped' in result or not old or 'skipped' in old or old['work'] != result['work']:
+            continue
+        change = result['median_seconds'] / old['median_seconds'] - 1
+        status = "REGRESSION" if change > threshold else "ok"
+        print(f"  {name:<42} {old['median_seconds']:8.3f}s -> "
+              f"{result['median_seconds']:8.3f}s {change:+7.1%} {status}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def format_rate(unit, rate):
+    if unit == 'bytes':
+        return f"{rate / MB:,.1f} MB/s"
+    return f"{rate:,.0f} {unit}/s"
+
+
+def print_results(results):
+    print(f"\n{'='*60}")
+    print(f"BENCHMARK RESULTS ({results['size']}, seed {results['seed']})")
+    print(f"{'='*60}")
+    for name, result in results['benchmarks'].items():
+        if 'skipped' in result:
+            print(f"{name:<42} skipped: {result['skipped']}")
+            continue
+        rates = ", ".join(format_rate(unit.replace('_per_second', ''), rate)
+                          for unit, rate in result['throughput'].items())
+        print(f"{name:<42} {result['median_seconds']:8.3f}s  {rates}")
+    print(f"{'='*60}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every tool in the repository")
+    parser.add_argument("--size", choices=SIZES, default='small')
+    parser.add_argument("--only", nargs='+', metavar="NAME",
+                        help="benchmarks to run (prefixes such as log_analyzer work)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(),
+                                                           "cyber_benchmarks"),
+                        help="where generated inputs are kept between runs")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown before a regression is reported (0.10 = 10%%)")
+    parser.add_argument("--list", action='store_true', help="list benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    names = [name for name in BENCHMARKS
+             if not args.only or any(name.startswith(prefix) for prefix in args.only)]
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    results = {'size': args.size, 'seed': args.seed, 'repeat': args.repeat,
+               'environment': environment(), 'benchmarks': {}}
+    for name in names:
+        print(f"Running {name} ({args.size})...")
+        results['benchmarks'][name] = run_benchmark(
+            name, args.data_dir, SIZES[args.size], args.seed, args.repeat)
+
+    print_results(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import os
+import random
+import sys
+
+# Reuse the syslog corpus generator that ships with the Log Analyzer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "Log Analyzer"))
+from benchmark_log_analyzer import generate_corpus as generate_syslog  # noqa: E402
+
+
+WORDS = ["password", "dragon", "monkey", "sunshine", "shadow", "master", "football",
+         "letmein", "welcome", "admin", "princess", "qwerty", "summer", "winter",
+         "security", "falcon", "orange", "purple", "coffee", "rocket"]
+SYMBOLS = "!@#$%^&*()_+-=[]{}:;\"'<>,.?/"
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def random_bytes(rng, size):
+    """Return `size` bytes from a seeded Random (works on Python 3.7+)"""
+    if size <= 0:
+        return b''
+    return rng.getrandbits(size * 8).to_bytes(size, 'little')
+
+
+def generate_tree(root, file_count, total_bytes, depth=3, seed=1234):
+    """
+    Write a seeded directory tree of binary files
+
+    File sizes are skewed like real trees: most files are small and a few
+    are large. Contents are built from one random 1 MB block with a
+    per-file header, so large trees generate quickly but no two files
+    hash the same.
+
+    Args:
+        root: Directory to create
+        file_count: Number of files
+        total_bytes: Approximate total size of all files
+        depth: Maximum directory nesting
+        seed: Random seed so runs are reproducible
+
+    Returns:
+        List of file paths written
+    """
+    rng = random.Random(seed)
+    block = random_bytes(rng, BLOCK_SIZE)
+    weights = [min(rng.paretovariate(1.2), 200.0) for _ in range(file_count)]
+    scale = total_bytes / sum(weights)
+
+    paths = []
+    for index, weight in enumerate(weights):
+        parts = [f"dir{rng.randint(0, 9)}" for _ in range(rng.randint(0, depth))]
+        directory = os.path.join(root, *parts)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"file{index:06d}.bin")
+
+        size = max(1, int(weight * scale))
+        offset = rng.randrange(BLOCK_SIZE)
+        with open(path, 'wb') as f:
+            f.write(f"{seed}:{index}\n".encode())
+            remaining = size
+            while remaining > 0:
+                piece = block[offset:offset + remaining] or block[:remaining]
+                f.write(piece)
+                remaining -= len(piece)
+                offset = 0
+        paths.append(path)
+    return paths
+
+
+def generate_password(rng):
+    """One password in a realistic mix of weak, typical and strong styles"""
+    style = rng.random()
+    if style < 0.3:
+        return rng.choice(WORDS) + str(rng.randint(0, 9999))
+    if style < 0.5:
+        return rng.choice(WORDS).capitalize() + rng.choice(SYMBOLS) + str(rng.randint(0, 99))
+    if style < 0.6:
+        return str(rng.randint(0, 99999999))
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789" + SYMBOLS
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(8, 24)))
+
+
+def generate_passwords(filepath, count, seed=1234):
+    """
+    Write a seeded password list, one per line
+
+    Args:
+        filepath: Output file path
+        count: Number of passwords
+        seed: Random seed so runs are reproducible
+    """
+    rng = random.Random(seed)
+    with open(filepath, 'w') as f:
+        for _ in range(count):
+            f.write(generate_password(rng) + "\n")
+
+
+def generate_plain_file(filepath, size, seed=1234):
+    """Write `size` bytes of seeded, partly compressible data"""
+    rng = random.Random(seed)
+    text = " ".join(rng.choice(WORDS) for _ in range(BLOCK_SIZE // 8)).encode()
+    noise = random_bytes(rng, BLOCK_SIZE)
+    with open(filepath, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            piece = (text if rng.random() < 0.5 else noise)[:remaining]
+            f.write(piece)
+            remaining -= len(piece)
@@ -0,0 +1,523 @@
+import json
+import os
+import sqlite3
+
+from chunk_manifest import ChunkManifest
+from file_hashing import DEFAULT_ALGORITHM, FileMetadata
+from merkle_tree import DIRECTORY, FILE, TOP, node_hash, split_path
+
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# PRAGMA user_version while Merkle directory hashes lag behind the files
+MERKLE_STALE = 1
+
+
+def is_sqlite_file(filepath):
+    """Return True if filepath is an SQLite database (False if missing or text)"""
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def is_text_baseline(filepath):
+    """Return True if filepath is a non-empty regular file that is not an SQLite database"""
+    return (os.path.isfile(filepath) and os.path.getsize(filepath) > 0
+            and not is_sqlite_file(filepath))
+
+
+def read_legacy_file(filepath):
+    """
+    Read a file_hashes.txt baseline from older versions
+
+    Lines are "path|hash", optionally followed by the five metadata
+    fields (size, mtime_ns, ctime_ns, inode, device).
+
+    Yields:
+        (path, hash, FileMetadata or None)
+    """
+    field_count = len(FileMetadata._fields)
+    with open(filepath, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            fields = line.rsplit('|', field_count + 1)
+            if len(fields) == field_count + 2 and all(field.isdigit() for field in fields[2:]):
+                yield fields[0], fields[1], FileMetadata(*map(int, fields[2:]))
+            else:
+                path, file_hash = line.rsplit('|', 1)
+                yield path, file_hash, None
+
+
+class BaselineStore:
+    """
+    Baseline of monitored files backed by an SQLite file (WAL mode)
+
+    Behaves like a dict of path -> hash, but nothing is loaded up front:
+    lookups are indexed queries and iteration streams rows in the order
+    files were first monitored. Writes are buffered and committed in one
+    transaction per batch, so adding N files costs O(N) and opening the
+    store takes the same time however many files it holds. Monitored
+    directory trees and their scan options are stored alongside.
+
+    A Merkle tree of the baseline is kept up to date on every flush: each
+    directory's hash covers the names and hashes of everything below it,
+    so an unchanged directory is confirmed with a single comparison.
+    Batches committed while many files are added only update file nodes;
+    the directories above them are re-hashed once, by flush(). Files
+    can also have a chunk manifest, to locate changes inside them.
+
+    The hash algorithm is recorded in the settings table, with the
+    optional fast checksum stored next to each hash.
+    """
+
+    COLUMNS = ('path', 'hash') + FileMetadata._fields + ('checksum',)
+
+    def __init__(self, database_file="file_hashes.db", batch_size=10000):
+        """
+        Args:
+            database_file: SQLite database path
+            batch_size: Changes buffered before each commit
+        """
+        self.database_file = database_file
+        self.batch_size = batch_size
+        self.pending = {}  # path -> row (None = remove)
+        self.dirty = set()  # directories whose Merkle hash must be recomputed
+
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS baseline (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                hash TEXT NOT NULL,
+                size INTEGER, mtime_ns INTEGER, ctime_ns INTEGER, inode INTEGER, device INTEGER,
+                checksum TEXT
+            )""")
+        # Baselines from older versions have no checksums
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(baseline)")]
+        if 'checksum' not in columns:
+            self.connection.execute("ALTER TABLE baseline ADD COLUMN checksum TEXT")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS trees (
+                root TEXT PRIMARY KEY,
+                options TEXT NOT NULL
+            )""")
+        # Merkle tree nodes: files (with their hash) and directories (with
+        # the hash of their children), keyed by parent directory
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS merkle (
+                parent TEXT NOT NULL,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (parent, name)
+            ) WITHOUT ROWID""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS manifests (
+                path TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                file_hash TEXT NOT NULL
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                path TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (path, start)
+            ) WITHOUT ROWID""")
+        self.connection.commit()
+
+        # A baseline from an older version has no Merkle tree, and one left
+        # between batches by a crash has stale directory hashes
+        stale = self.connection.execute("PRAGMA user_version").fetchone()[0] == MERKLE_STALE
+        if stale or (self and not self.connection.execute("SELECT 1 FROM merkle LIMIT 1").fetchone()):
+            self.rebuild_merkle()
+
+    def set(self, path, file_hash, metadata=None, checksum=None):
+        """
+        Store (or replace) the hash and metadata of a file
+
+        Args:
+            path: File path
+            file_hash: Hex digest
+            metadata: FileMetadata taken before hashing (None = unknown,
+                      the next fast check re-hashes the file)
+            checksum: Fast checksum of the same contents (None = not
+                      computed yet)
+        """
+        self.pending[path] = ((path, file_hash)
+                              + (tuple(metadata) if metadata else (None,) * len(FileMetadata._fields))
+                              + (checksum,))
+        if len(self.pending) >= self.batch_size:
+            self.write_pending()
+
+    def set_metadata(self, path, metadata):
+        """Replace the stored metadata of a file whose hash is unchanged"""
+        row = self.row(path)
+        self.set(path, row[1], metadata, row[-1])
+
+    def remove(self, path):
+        """Stop tracking a file"""
+        self.pending[path] = None
+        if len(self.pending) >= self.batch_size:
+            self.write_pending()
+
+    def flush(self):
+        """Commit buffered changes and re-hash the Merkle directories above them"""
+        self.write_pending()
+        if self.dirty:
+            with self.connection:
+                self.update_directories()
+
+    def write_pending(self):
+        """Commit buffered files and their Merkle file nodes in one transaction"""
+        if not self.pending:
+            return
+        rows = [row for row in self.pending.values() if row is not None]
+        removed = [(path,) for path, row in self.pending.items() if row is None]
+        placeholders = ', '.join('?' * len(self.COLUMNS))
+        updates = ', '.join(f"{column} = excluded.{column}" for column in self.COLUMNS[1:])
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT INTO baseline ({', '.join(self.COLUMNS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(path) DO UPDATE SET {updates}", rows)
+            self.connection.executemany("DELETE FROM baseline WHERE path = ?", removed)
+            self.connection.executemany("DELETE FROM manifests WHERE path = ?", removed)
+            self.connection.executemany("DELETE FROM chunks WHERE path = ?", removed)
+            self.update_files([row[:2] for row in rows], [path for path, in removed])
+        self.pending = {}
+
+    def update_files(self, changed, removed):
+        """
+        Update the Merkle nodes of changed and removed files, and mark
+        the directories above them dirty (inside the caller's transaction)
+
+        Args:
+            changed: (path, hash) of stored files
+            removed: Paths no longer monitored
+        """
+        changed_nodes = []
+        for path, file_hash in changed:
+            parent, name = split_path(path)
+            changed_nodes.append((parent, name, FILE, file_hash))
+            self.mark_dirty(parent)
+        removed_nodes = []
+        for path in removed:
+            parent, name = split_path(path)
+            removed_nodes.append((parent, name, FILE))
+            self.mark_dirty(parent)
+
+        self.connection.executemany(
+            "INSERT INTO merkle (parent, name, kind, hash) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(parent, name) DO UPDATE SET kind = excluded.kind, hash = excluded.hash",
+            changed_nodes)
+        self.connection.executemany(
+            "DELETE FROM merkle WHERE parent = ? AND name = ? AND kind = ?", removed_nodes)
+        if self.dirty:
+            self.connection.execute(f"PRAGMA user_version = {MERKLE_STALE}")
+
+    def mark_dirty(self, directory):
+        """Mark a directory and those above it for re-hashing"""
+        while directory not in self.dirty:
+            self.dirty.add(directory)
+            if directory == TOP:
+                break
+            directory, _ = split_path(directory)
+
+    def update_directories(self):
+        """Re-hash the dirty directories, bottom-up (inside the caller's transaction)"""
+        # Children are longer than their parents, so longest first is bottom-up
+        for directory in sorted(self.dirty - {TOP}, key=len, reverse=True):
+            children = self.query_children(directory)
+            if children:
+                self.connection.execute(
+                    "INSERT INTO merkle (parent, name, kind, hash) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(parent, name) DO UPDATE SET kind = excluded.kind, "
+                    "hash = excluded.hash WHERE hash != excluded.hash",
+                    split_path(directory) + (DIRECTORY, node_hash(children)))
+            else:
+                self.connection.execute("DELETE FROM merkle WHERE parent = ? AND name = ?",
+                                        split_path(directory))
+        self.connection.execute("PRAGMA user_version = 0")
+        self.dirty = set()
+
+    def rebuild_merkle(self):
+        """Build the Merkle tree from scratch (e.g. for a baseline from an older version)"""
+        with self.connection:
+            self.connection.execute("DELETE FROM merkle")
+            self.update_files(self.connection.execute("SELECT path, hash FROM baseline"), [])
+            self.update_directories()
+
+    def query_children(self, directory):
+        return {name: (kind, node) for name, kind, node in self.connection.execute(
+            "SELECT name, kind, hash FROM merkle WHERE parent = ?", (directory,))}
+
+    def children(self, directory):
+        """
+        Merkle nodes directly inside a directory
+
+        Returns:
+            {name: (kind, hash)}, kind being "f" (file) or "d" (directory)
+        """
+        self.flush()
+        return self.query_children(directory)
+
+    def directory_hash(self, directory=TOP):
+        """
+        Merkle hash of a directory (TOP = the whole baseline)
+
+        Returns:
+            Hex digest, or None if the directory holds no monitored files
+        """
+        self.flush()
+        if directory == TOP:
+            children = self.query_children(TOP)
+            return node_hash(children) if children else None
+        row = self.connection.execute(
+            "SELECT hash FROM merkle WHERE parent = ? AND name = ? AND kind = ?",
+            split_path(directory) + (DIRECTORY,)).fetchone()
+        return row[0] if row else None
+
+    def setting(self, key, default=None):
+        """Stored value of a baseline setting (a string), or default"""
+        row = self.connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_setting(self, key, value):
+        """Store a baseline setting (None removes it)"""
+        with self.connection:
+            if value is None:
+                self.connection.execute("DELETE FROM settings WHERE key = ?", (key,))
+            else:
+                self.connection.execute(
+                    "INSERT INTO settings (key, value) VALUES (?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, str(value)))
+
+    @property
+    def algorithm(self):
+        """Hash algorithm of the stored hashes"""
+        return self.setting('algorithm', DEFAULT_ALGORITHM)
+
+    @property
+    def checksum(self):
+        """Fast checksum algorithm stored with each hash, or None"""
+        return self.setting('checksum')
+
+    def replace_hashes(self, algorithm, rows):
+        """
+        Switch every stored hash to another algorithm in one transaction
+
+        Args:
+            algorithm: Name of the new algorithm
+            rows: Iterable of (path, hash, checksum) for every monitored
+                  file; if iterating it raises, nothing is changed
+        """
+        self.flush()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE baseline SET hash = ?, checksum = ? WHERE path = ?",
+                ((file_hash, checksum, path) for path, file_hash, checksum in rows))
+            self.connection.execute(
+                "INSERT INTO settings (key, value) VALUES ('algorithm', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (algorithm,))
+            self.connection.execute("DELETE FROM merkle")
+            self.update_files(self.connection.execute("SELECT path, hash FROM baseline"), [])
+            self.update_directories()
+
+    def clear_checksums(self):
+        """Forget every stored checksum (e.g. when the checksum algorithm changes)"""
+        self.flush()
+        with self.connection:
+            self.connection.execute("UPDATE baseline SET checksum = NULL")
+
+    def set_manifest(self, path, manifest):
+        """Store the ChunkManifest of a file, replacing any earlier one"""
+        with self.connection:
+            self.connection.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.connection.execute(
+                "INSERT INTO manifests (path, method, chunk_size, size, file_hash) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(path) DO UPDATE SET method = excluded.method, "
+                "chunk_size = excluded.chunk_size, size = excluded.size, "
+                "file_hash = excluded.file_hash",
+                (path, manifest.method, manifest.chunk_size, manifest.size, manifest.file_hash))
+            self.connection.executemany(
+                "INSERT INTO chunks (path, start, length, hash) VALUES (?, ?, ?, ?)",
+                ((path,) + tuple(chunk) for chunk in manifest.chunks))
+
+    def manifest(self, path):
+        """
+        Stored ChunkManifest of a file, or None
+
+        A manifest whose file_hash differs from the file's baseline hash
+        was built before the file was re-baselined and is out of date.
+        """
+        row = self.connection.execute(
+            "SELECT method, chunk_size, size, file_hash FROM manifests WHERE path = ?",
+            (path,)).fetchone()
+        if row is None:
+            return None
+        chunks = self.connection.execute(
+            "SELECT start, length, hash FROM chunks WHERE path = ? ORDER BY start", (path,)).fetchall()
+        return ChunkManifest(*row, chunks)
+
+    def row(self, path):
+        """Stored (path, hash, *metadata, checksum) row of a file, or None"""
+        if path in self.pending:
+            return self.pending[path]
+        return self.connection.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM baseline WHERE path = ?", (path,)).fetchone()
+
+    def metadata(self, path):
+        """Stored FileMetadata of a file, or None if unknown"""
+        row = self.row(path)
+        return entry_metadata(row) if row else None
+
+    def entries(self):
+        """
+        Stream every monitored file in monitoring order
+
+        Yields:
+            (path, hash, FileMetadata or None, checksum or None)
+        """
+        self.flush()
+        for row in self.connection.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM baseline ORDER BY id"):
+            yield row[0], row[1], entry_metadata(row), row[-1]
+
+    def entries_after(self, position, limit):
+        """
+        List monitored files after a position in monitoring order, for
+        scans that resume where they stopped
+
+        Args:
+            position: Position of the last file already scanned (0 =
+                      start from the first file)
+            limit: Maximum number of files
+
+        Returns:
+            List of (position, path, hash, FileMetadata or None,
+            checksum or None)
+        """
+        self.flush()
+        return [(row[0], row[1], row[2], entry_metadata(row[1:]), row[-1])
+                for row in self.connection.execute(
+                    f"SELECT id, {', '.join(self.COLUMNS)} FROM baseline "
+                    f"WHERE id > ? ORDER BY id LIMIT ?", (position, limit))]
+
+    def total_size(self, position=0):
+        """
+        Count the monitored files (after a position, see entries_after)
+
+        Returns:
+            (number of files, sum of their stored sizes)
+        """
+        self.flush()
+        return tuple(self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM baseline WHERE id > ?",
+            (position,)).fetchone())
+
+    def paths_under(self, directory):
+        """Stream the monitored paths inside a directory (an indexed range query)"""
+        self.flush()
+        prefix = directory.rstrip(os.sep) + os.sep
+        # Every path starting with prefix sorts between prefix and prefix with
+        # its last character incremented
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        for (path,) in self.connection.execute(
+                "SELECT path FROM baseline WHERE path >= ? AND path < ?", (prefix, upper)):
+            yield path
+
+    def add_tree(self, root, options):
+        """Remember a monitored directory tree and its scan options (a dict)"""
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO trees (root, options) VALUES (?, ?) "
+                "ON CONFLICT(root) DO UPDATE SET options = excluded.options",
+                (root, json.dumps(options)))
+
+    def trees(self):
+        """
+        List the monitored directory trees
+
+        Returns:
+            List of (root, options dict)
+        """
+        return [(root, json.loads(options)) for root, options in
+                self.connection.execute("SELECT root, options FROM trees ORDER BY root")]
+
+    def import_legacy_file(self, filepath):
+        """
+        Copy a file_hashes.txt baseline into the store in one transaction
+
+        Returns:
+            Number of files imported
+        """
+        count = 0
+        for path, file_hash, metadata in read_legacy_file(filepath):
+            self.set(path, file_hash, metadata)
+            count += 1
+        self.flush()
+        return count
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def get(self, path, default=None):
+        row = self.row(path)
+        return row[1] if row else default
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for path, file_hash, _, _ in self.entries():
+            yield path, file_hash
+
+    def __getitem__(self, path):
+        row = self.row(path)
+        if row is None:
+            raise KeyError(path)
+        return row[1]
+
+    def __setitem__(self, path, file_hash):
+        self.set(path, file_hash)
+
+    def __delitem__(self, path):
+        if path not in self:
+            raise KeyError(path)
+        self.remove(path)
+
+    def __contains__(self, path):
+        return self.row(path) is not None
+
+    def __iter__(self):
+        self.flush()
+        for (path,) in self.connection.execute("SELECT path FROM baseline ORDER BY id"):
+            yield path
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM baseline").fetchone()[0]
+
+    def __bool__(self):
+        self.flush()
+        return self.connection.execute("SELECT 1 FROM baseline LIMIT 1").fetchone() is not None
+
+
+def entry_metadata(row):
+    """FileMetadata from the metadata columns of a baseline row (None if not stored)"""
+    return FileMetadata._make(row[2:2 + len(FileMetadata._fields)]) if row[2] is not None else None
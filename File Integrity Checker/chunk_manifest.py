@@ -0,0 +1,344 @@
+import bisect
+import hashlib
+import math
+import os
+import re
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from file_hashing import DEFAULT_ALGORITHM, HASH_BLOCK_SIZE, default_workers, new_hash, read_buffer
+
+
+# fixed: chunks of exactly chunk_size bytes
+# cdc: content-defined chunks averaging about chunk_size bytes, whose
+#      boundaries move with the data when bytes are inserted or removed
+CHUNKING_METHODS = ('fixed', 'cdc')
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Content-defined boundaries fall after a run of "anchor" bytes. Each byte
+# value is assigned to one of two classes at random (zero is never an
+# anchor, so zero-filled regions are cut at the maximum size), and a run
+# of n anchor-class bytes occurs about once every 2^(n+1) bytes of random
+# data. bytes.translate() and bytes.find() do the scanning in C. As in
+# FastCDC, a longer run is required before the average size and a shorter
+# one after it, so chunk sizes cluster around the average and chunks are
+# hardly ever cut at the maximum (such cuts do not follow the content).
+ANCHOR_CLASSES = bytes(hashlib.sha256(b'cdc%d' % value).digest()[0] & 1 if value else 0
+                       for value in range(256))
+
+# Bytes read at a time while chunking a file sequentially
+READ_SIZE = 16 * 1024 * 1024
+
+# chunks is a list of (offset, length, hex digest); file_hash is the
+# whole-file hash the manifest was built with. Both use the baseline's
+# hash algorithm.
+ChunkManifest = namedtuple('ChunkManifest', ['method', 'chunk_size', 'size', 'file_hash', 'chunks'])
+
+
+def cdc_parameters(chunk_size):
+    """
+    Chunk size limits and anchor run length for an average chunk size
+
+    Returns:
+        (minimum, average, maximum, run); runs of run + 1 bytes end a
+        chunk before the average size and runs of run - 1 bytes after it
+    """
+    minimum = max(chunk_size // 4, 64)
+    maximum = chunk_size * 4
+    run = max(2, round(math.log2(chunk_size)) - 2)
+    return minimum, chunk_size, maximum, run
+
+
+def find_anchor(data, position, limit, run, window):
+    """
+    Find the first run of anchor bytes in data[position:limit]
+
+    Returns:
+        Index just after the run, or None
+    """
+    anchor = b'\x01' * run
+    # Scan a window at a time, so bytes far past the cut are not translated
+    while position < limit:
+        stop = min(position + window, limit)
+        hit = data[position:stop].translate(ANCHOR_CLASSES).find(anchor)
+        if hit >= 0:
+            return position + hit + run
+        if stop == limit:
+            return None
+        position = stop - run + 1
+    return None
+
+
+def find_cut(data, start, end, minimum, average, maximum, run):
+    """
+    Find where the content-defined chunk starting at data[start] ends
+
+    Returns:
+        Index just after the chunk (end if no boundary before it)
+    """
+    limit = min(start + maximum, end)
+    middle = min(start + average, limit)
+    window = max(minimum, run * 2)
+    cut = find_anchor(data, start + max(minimum - run - 1, 0), middle, run + 1, window)
+    if cut is None:
+        cut = find_anchor(data, middle, limit, run - 1, window)
+    return limit if cut is None else cut
+
+
+def read_chunks(filepath, method, chunk_size, start=0):
+    """
+    Read a file sequentially and split it into chunks
+
+    Args:
+        start: Offset to start at (a chunk boundary)
+
+    Yields:
+        (offset, memoryview of the chunk's bytes)
+    """
+    if method not in CHUNKING_METHODS:
+        raise ValueError(f"Unknown chunking method: {method} (use {' or '.join(CHUNKING_METHODS)})")
+    minimum, average, maximum, run = cdc_parameters(chunk_size)
+    read_size = max(READ_SIZE, maximum * 2)
+
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        offset = start
+        data = b''
+        position = 0
+        eof = False
+        while True:
+            if not eof and len(data) - position < (maximum if method == "cdc" else chunk_size):
+                more = f.read(read_size)
+                eof = len(more) < read_size
+                data = data[position:] + more
+                position = 0
+            if position >= len(data):
+                return
+            if method == "fixed":
+                cut = min(position + chunk_size, len(data))
+            else:
+                cut = find_cut(data, position, len(data), minimum, average, maximum, run)
+            yield offset, memoryview(data)[position:cut]
+            offset += cut - position
+            position = cut
+
+
+def hash_chunk(offset, data, algorithm=DEFAULT_ALGORITHM):
+    chunk_hash = new_hash(algorithm)
+    chunk_hash.update(data)
+    return offset, len(data), chunk_hash.hexdigest()
+
+
+def hash_span(filepath, span, algorithm=DEFAULT_ALGORITHM):
+    """Hash of length bytes at offset in a file, read in 1 MB blocks"""
+    offset, length = span
+    span_hash = new_hash(algorithm)
+    buffer = read_buffer(HASH_BLOCK_SIZE)
+    view = memoryview(buffer)
+    with open(filepath, 'rb', buffering=0) as f:
+        f.seek(offset)
+        while length > 0:
+            size = f.readinto(view[:min(length, len(buffer))])
+            if not size:
+                break
+            span_hash.update(view[:size])
+            length -= size
+    return span_hash.hexdigest()
+
+
+def hash_chunks(chunks, workers, file_hash=None, algorithm=DEFAULT_ALGORITHM):
+    """
+    Hash chunks from read_chunks() on a thread pool, in order
+
+    Args:
+        file_hash: hashlib object updated with every chunk in order
+                   (the whole-file hash, computed in the same pass)
+
+    Yields:
+        (offset, length, hex digest)
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for offset, data in chunks:
+            if file_hash is not None:
+                file_hash.update(data)
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+            in_flight.append(executor.submit(hash_chunk, offset, data, algorithm))
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def build_manifest(filepath, method="fixed", chunk_size=CHUNK_SIZE, workers=None,
+                   algorithm=DEFAULT_ALGORITHM):
+    """
+    Hash a file chunk by chunk, along with the whole file, in one pass
+
+    The file is read once; chunks are hashed on a thread pool while the
+    whole-file hash is computed as the data goes by.
+
+    Args:
+        method: "fixed" or "cdc" (content-defined)
+        chunk_size: Chunk size, or average chunk size for "cdc"
+        workers: Hashing threads (None = default_workers())
+        algorithm: Hash algorithm for the chunks and the whole file
+
+    Returns:
+        ChunkManifest, including the whole-file hex digest
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: For an unknown method or algorithm
+    """
+    workers = workers or default_workers()
+    file_hash = new_hash(algorithm)
+    chunks = list(hash_chunks(read_chunks(filepath, method, chunk_size), workers, file_hash,
+                              algorithm))
+    size = chunks[-1][0] + chunks[-1][1] if chunks else 0
+    return ChunkManifest(method, chunk_size, size, file_hash.hexdigest(), chunks)
+
+
+def verify_manifest(filepath, manifest, regions=None, workers=None, algorithm=DEFAULT_ALGORITHM):
+    """
+    Find the byte ranges of a file that differ from its chunk manifest
+
+    Fixed-size chunks are re-read in parallel, each thread reading its
+    own part of the file. Content-defined chunks are re-cut from the
+    data, so bytes inserted or removed only flag the chunks around them.
+
+    Args:
+        manifest: ChunkManifest from build_manifest()
+        regions: (start, end) byte ranges to re-verify (None = the whole
+                 file); the end of a file whose size changed is always
+                 re-verified
+        workers: Hashing threads (None = default_workers())
+        algorithm: Hash algorithm the manifest was built with
+
+    Returns:
+        (merged list of changed (start, end) ranges in the current file,
+        current size, bytes verified)
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    workers = workers or default_workers()
+    size = os.path.getsize(filepath)
+    if manifest.method == "fixed":
+        return verify_fixed(filepath, manifest, size, regions, workers, algorithm)
+    return verify_cdc(filepath, manifest, size, regions, workers, algorithm)
+
+
+def overlaps(start, end, regions):
+    return any(start < region_end and region_start < end for region_start, region_end in regions)
+
+
+def verify_fixed(filepath, manifest, size, regions, workers, algorithm):
+    stored = {offset: (length, chunk_hash) for offset, length, chunk_hash in manifest.chunks}
+    if regions is not None and size != manifest.size:
+        # From the last byte both versions have, so a shortened last chunk is included
+        regions = list(regions) + [(max(min(size, manifest.size) - 1, 0),
+                                    max(size, manifest.size))]
+    spans = [(offset, min(manifest.chunk_size, size - offset))
+             for offset in range(0, size, manifest.chunk_size)]
+    if regions is not None:
+        spans = [(offset, length) for offset, length in spans
+                 if overlaps(offset, offset + length, regions)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        hashes = executor.map(lambda span: hash_span(filepath, span, algorithm), spans)
+        changed = [(offset, offset + length) for (offset, length), chunk_hash in zip(spans, hashes)
+                   if stored.get(offset) != (length, chunk_hash)]
+    return merge_ranges(changed), size, sum(length for _, length in spans)
+
+
+def verify_cdc(filepath, manifest, size, regions, workers, algorithm):
+    stored_hashes = {chunk_hash for _, _, chunk_hash in manifest.chunks}
+    changed = []
+    verified = 0
+
+    if regions is None:
+        for offset, length, chunk_hash in hash_chunks(
+                read_chunks(filepath, "cdc", manifest.chunk_size), workers, algorithm=algorithm):
+            verified += length
+            if chunk_hash not in stored_hashes:
+                changed.append((offset, offset + length))
+        return merge_ranges(changed), size, verified
+
+    # Re-cut from the stored boundary before each region until a chunk past
+    # the region matches the manifest again (the boundaries are back in step).
+    # shift is the number of bytes inserted (or removed) before the position.
+    stored_at = {offset: chunk_hash for offset, _, chunk_hash in manifest.chunks}
+    first_offset = {}
+    for offset, _, chunk_hash in manifest.chunks:
+        first_offset.setdefault(chunk_hash, offset)
+    starts = [offset for offset, _, _ in manifest.chunks]
+    shift = 0
+    covered = 0
+
+    def verify_region(region_start, region_end):
+        nonlocal shift, covered, verified
+        if region_end <= covered or size == 0:
+            return
+        position = min(max(region_start, covered), size - 1)
+        index = bisect.bisect_right(starts, position - shift) - 1
+        start = max(starts[index] + shift, 0) if index >= 0 else 0
+        for offset, data in read_chunks(filepath, "cdc", manifest.chunk_size, start):
+            _, length, chunk_hash = hash_chunk(offset, data, algorithm)
+            verified += length
+            covered = offset + length
+            if chunk_hash not in first_offset:
+                changed.append((offset, covered))
+                continue
+            if stored_at.get(offset - shift) != chunk_hash:
+                shift = offset - first_offset[chunk_hash]
+            if offset >= region_end:
+                break
+
+    for region_start, region_end in merge_ranges(sorted(regions)):
+        verify_region(region_start, region_end)
+    if manifest.size + shift != size:
+        # The size change is not explained by the regions: check the end too
+        verify_region(max(min(size, manifest.size + shift) - 1, 0), size)
+    return merge_ranges(changed), size, verified
+
+
+def merge_ranges(ranges):
+    """Merge sorted (start, end) ranges that touch or overlap"""
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_size(text):
+    """Parse a byte count such as "4096", "64M" or "1.5G" """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', text, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_ranges(text):
+    """Parse byte ranges such as "0-64M,1G-2G" into [(start, end)]"""
+    ranges = []
+    for part in text.split(','):
+        start, separator, end = part.partition('-')
+        if not separator:
+            raise ValueError(f"Invalid range: {part.strip()} (use start-end)")
+        ranges.append((parse_size(start), parse_size(end)))
+    return ranges
+
+
+def format_size(size):
+    if size < 1024:
+        return f"{size:,} bytes"
+    for unit in ('KB', 'MB', 'GB', 'TB'):
+        size /= 1024
+        if size < 1024 or unit == 'TB':
+            return f"{size:,.1f} {unit}"
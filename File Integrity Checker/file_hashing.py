@@ -0,0 +1,270 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# Cryptographic digests a baseline can use (hashlib names). SHA-256 is the
+# default; on CPUs without SHA instructions BLAKE2b is faster and as strong.
+HASH_ALGORITHMS = ('sha256', 'blake2b', 'blake2s', 'sha512', 'sha3_256')
+DEFAULT_ALGORITHM = 'sha256'
+
+# Non-cryptographic checksums (zlib) for routine sweeps. They are several
+# times cheaper but can be forged, so a differing checksum is always
+# confirmed with the digest.
+CHECKSUM_ALGORITHMS = ('crc32', 'adler32')
+
+# Files are read in blocks of this size into a buffer reused by each thread
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Files hashed per task, so small files do not pay the pool overhead one by one
+THREAD_BATCH_SIZE = 16
+PROCESS_BATCH_SIZE = 64
+
+thread_buffers = threading.local()
+
+# posix_fadvise() is missing on some systems (e.g. macOS)
+FADVISE = hasattr(os, 'posix_fadvise')
+
+# Stat fields stored with each hash. Writing or replacing a file changes
+# at least one of them, and ctime cannot be set back by normal programs.
+FileMetadata = namedtuple('FileMetadata', ['size', 'mtime_ns', 'ctime_ns', 'inode', 'device'])
+
+
+def file_metadata(filepath):
+    """
+    Read the stat fields compared by a fast check
+
+    Raises:
+        OSError: If the file cannot be found or accessed
+    """
+    stat = os.stat(filepath)
+    return FileMetadata._make(
+        (stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_ino, stat.st_dev))
+
+
+def read_buffer(block_size):
+    """This thread's reusable read buffer"""
+    buffer = getattr(thread_buffers, 'buffer', None)
+    if buffer is None or len(buffer) != block_size:
+        buffer = thread_buffers.buffer = bytearray(block_size)
+    return buffer
+
+
+class Checksum:
+    """
+    zlib.crc32 or zlib.adler32 behind hashlib's update()/hexdigest()
+
+    Like hashlib, zlib releases the GIL on large blocks.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.function = getattr(zlib, name)
+        self.value = self.function(b'')
+
+    def update(self, data):
+        self.value = self.function(data, self.value)
+
+    def hexdigest(self):
+        return f"{self.value:08x}"
+
+
+class Throttle:
+    """
+    Limit the read bandwidth and read operations per second of hashing
+
+    One Throttle is shared by all hashing threads. After each read the
+    time both budgets are next free is pushed back by the read's share,
+    and the thread sleeps until then, so over time neither limit is
+    exceeded however many threads read.
+    """
+
+    def __init__(self, bytes_per_second=None, reads_per_second=None):
+        """
+        Args:
+            bytes_per_second: Read bandwidth budget (None = unlimited)
+            reads_per_second: Read operations (IOPS) budget (None = unlimited)
+        """
+        self.bytes_per_second = bytes_per_second
+        self.reads_per_second = reads_per_second
+        self.lock = threading.Lock()
+        self.bytes_free_at = 0.0  # time.monotonic() when each budget is next free
+        self.reads_free_at = 0.0
+
+    def consume(self, size):
+        """Account for a read of size bytes and sleep until the next read is allowed"""
+        with self.lock:
+            now = time.monotonic()
+            if self.bytes_per_second:
+                self.bytes_free_at = max(now, self.bytes_free_at) + size / self.bytes_per_second
+            if self.reads_per_second:
+                self.reads_free_at = max(now, self.reads_free_at) + 1 / self.reads_per_second
+            delay = max(self.bytes_free_at, self.reads_free_at) - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def new_hash(algorithm):
+    """
+    Hash object for a name in HASH_ALGORITHMS or CHECKSUM_ALGORITHMS
+
+    Raises:
+        ValueError: For an unknown algorithm
+    """
+    if algorithm in HASH_ALGORITHMS:
+        return getattr(hashlib, algorithm)()
+    if algorithm in CHECKSUM_ALGORITHMS:
+        return Checksum(algorithm)
+    raise ValueError(f"Unknown hash algorithm: {algorithm} "
+                     f"(use {', '.join(HASH_ALGORITHMS + CHECKSUM_ALGORITHMS)})")
+
+
+def hash_file(filepath, block_size=HASH_BLOCK_SIZE, algorithm=DEFAULT_ALGORITHM, throttle=None,
+              drop_cache=False):
+    """
+    Calculate the hash of a file
+
+    The file is read unbuffered straight into a reused buffer, and
+    hashlib releases the GIL while hashing each block, so several
+    threads can hash on several cores at once.
+
+    Args:
+        algorithm: Name from HASH_ALGORITHMS or CHECKSUM_ALGORITHMS, or
+                   a tuple of names to compute in the same read
+        throttle: Throttle to account each read against
+        drop_cache: Drop each block from the page cache once it is
+                    hashed (posix_fadvise), so a scan does not evict
+                    other programs' data; ignored where unsupported
+
+    Returns:
+        Hex digest (a tuple of them for a tuple of names)
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: For an unknown algorithm
+    """
+    names = (algorithm,) if isinstance(algorithm, str) else algorithm
+    hashers = [new_hash(name) for name in names]
+    drop_cache = drop_cache and FADVISE
+    buffer = read_buffer(block_size)
+    view = memoryview(buffer)
+    with open(filepath, 'rb', buffering=0) as f:
+        offset = 0
+        while True:
+            size = f.readinto(buffer)
+            if not size:
+                break
+            for hasher in hashers:
+                hasher.update(view[:size])
+            if drop_cache:
+                os.posix_fadvise(f.fileno(), offset, size, os.POSIX_FADV_DONTNEED)
+            offset += size
+            if throttle:
+                throttle.consume(size)
+        if drop_cache:
+            # Blocks the kernel was still reading ahead or adding to its
+            # page lists were skipped above
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    digests = tuple(hasher.hexdigest() for hasher in hashers)
+    return digests[0] if isinstance(algorithm, str) else digests
+
+
+def hash_batch(tasks, block_size=HASH_BLOCK_SIZE, throttle=None, drop_cache=False):
+    """
+    Hash a list of files, recording errors instead of raising
+
+    Args:
+        tasks: List of (path, algorithm) as taken by hash_file()
+        throttle, drop_cache: As for hash_file()
+
+    Returns:
+        List of (hex digest or None, error message or None)
+    """
+    results = []
+    for path, algorithm in tasks:
+        try:
+            results.append((hash_file(path, block_size, algorithm, throttle, drop_cache), None))
+        except OSError as e:
+            results.append((None, e.strerror or str(e)))
+    return results
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def default_workers(use_processes=False):
+    """Worker count for hashing: one process per core, or extra threads to overlap I/O"""
+    cores = os.cpu_count() or 1
+    return cores if use_processes else min(32, cores + 4)
+
+
+def hash_files(paths, workers=None, use_processes=False, block_size=HASH_BLOCK_SIZE,
+               algorithm=DEFAULT_ALGORITHM, throttle=None, drop_cache=False):
+    """
+    Hash many files concurrently, yielding results in the order given
+
+    Threads suit most trees: reads and hashing both release the GIL.
+    Processes avoid the GIL entirely for trees of many small files,
+    where per-file Python overhead dominates. Only a few batches are in
+    flight at a time, so memory stays flat however many files are
+    hashed.
+
+    Args:
+        paths: Iterable of file paths, or of (path, algorithm) pairs to
+               choose the algorithm file by file
+        workers: Threads or processes to use (None = default_workers(),
+                 1 = hash in the calling thread)
+        use_processes: Use a process pool instead of a thread pool
+        block_size: Read size per file
+        algorithm: Algorithm for plain paths (see hash_file)
+        throttle: Throttle shared by the threads (not with processes)
+        drop_cache: Drop files from the page cache as they are read
+
+    Yields:
+        (path, hex digest or None, error message or None)
+
+    Raises:
+        ValueError: For a throttle with use_processes
+    """
+    if throttle and use_processes:
+        raise ValueError("A throttle can only be shared by threads")
+    if workers is None:
+        workers = default_workers(use_processes)
+    batch_size = PROCESS_BATCH_SIZE if use_processes else THREAD_BATCH_SIZE
+    tasks = (path if isinstance(path, tuple) else (path, algorithm) for path in paths)
+
+    if workers <= 1:
+        for batch in batches(tasks, batch_size):
+            yield from zip_results(batch, hash_batch(batch, block_size, throttle, drop_cache))
+        return
+
+    pool = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool(max_workers=workers) as executor:
+        in_flight = deque()
+        for batch in batches(tasks, batch_size):
+            if len(in_flight) >= workers * 4:
+                batch_tasks, future = in_flight.popleft()
+                yield from zip_results(batch_tasks, future.result())
+            in_flight.append((batch, executor.submit(hash_batch, batch, block_size, throttle,
+                                                     drop_cache)))
+        while in_flight:
+            batch_tasks, future = in_flight.popleft()
+            yield from zip_results(batch_tasks, future.result())
+
+
+def zip_results(tasks, results):
+    """Pair a batch's paths with its hash_batch() results"""
+    for (path, _), (digest, error) in zip(tasks, results):
+        yield path, digest, error
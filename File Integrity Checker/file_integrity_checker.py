@@ -1,40 +1,335 @@
-import hashlib
 import os
+import random
+import time
+from collections import Counter
+
+from baseline_store import BaselineStore, entry_metadata, is_text_baseline
+from chunk_manifest import CHUNK_SIZE, build_manifest, format_size, parse_ranges, verify_manifest
+from file_hashing import (CHECKSUM_ALGORITHMS, HASH_ALGORITHMS, FileMetadata, Throttle,
+                          default_workers, file_metadata, hash_file, hash_files)
+from file_watcher import InotifyWatcher, PollingWatcher
+from merkle_tree import TOP, MerkleTree, diff_trees
+from tree_scan import TreeScan
+
+
+# fast: re-hash only files whose size, times, inode or device changed
+# paranoid: re-hash every file
+CHECK_MODES = ('fast', 'paranoid')
+
+# How files re-read despite unchanged metadata (paranoid mode, samples)
+# are verified when the baseline has a fast checksum:
+# checksum: with the checksum, escalating to the digest if it differs
+# digest: with the cryptographic digest
+# auto: checksum, but a paranoid check is a digest sweep once per interval
+CHECK_TIERS = ('auto', 'checksum', 'digest')
+
+# Default seconds between digest sweeps in two-tier mode
+DIGEST_INTERVAL = 7 * 24 * 3600
+
+# Files a scan slice verifies between progress saves
+SCAN_STEP = 1000
+
+# Bytes each file adds to a slice's share of the baseline, for its open
+# and metadata reads (so slices of many small files stay short)
+SCAN_FILE_COST = 64 * 1024
+
+# A file written continuously is still checked this many debounce
+# periods after its first event
+MAX_DEBOUNCE_PERIODS = 10
 
 
 class FileIntegrityChecker:
-    def __init__(self, database_file="file_hashes.txt"):
-        """Initialize the file integrity checker"""
+    def __init__(self, database_file="file_hashes.db", legacy_file="file_hashes.txt",
+                 algorithm=None, checksum=None):
+        """
+        Initialize the file integrity checker
+        
+        Args:
+            database_file: SQLite baseline database
+            legacy_file: Text baseline from older versions, imported once
+                         into database_file and renamed to *.migrated
+            algorithm: Hash algorithm for a new baseline (an existing one
+                       keeps its own; see set_algorithm)
+            checksum: Fast checksum for two-tier checks (see set_checksum)
+        """
+        # An old text baseline passed as the database is migrated next to it
+        if is_text_baseline(database_file):
+            legacy_file = database_file
+            root, extension = os.path.splitext(database_file)
+            database_file = root + (".db" if extension != ".db" else ".db.db")
+        
         self.database_file = database_file
-        self.hashes = {}
-        self.load_hashes()
+        self.hashes = BaselineStore(database_file)  # path -> hash, plus metadata
+        self.load_hashes(legacy_file)
+        
+        if algorithm and algorithm != self.hashes.algorithm:
+            if self.hashes:
+                print(f"{database_file} uses {self.hashes.algorithm} "
+                      f"(switch with set_algorithm)")
+            else:
+                self.set_algorithm(algorithm)
+        if checksum and checksum != self.hashes.checksum:
+            self.set_checksum(checksum)
     
     def calculate_hash(self, filepath):
-        """Calculate SHA-256 hash of a file"""
-        sha256 = hashlib.sha256()
-        with open(filepath, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b''):
-                sha256.update(chunk)
-        return sha256.hexdigest()
-    
-    def monitor_file(self, filepath):
-        """Add file to monitoring"""
+        """Calculate the hash of a file with the baseline's algorithm (read in 1 MB blocks)"""
+        return hash_file(filepath, algorithm=self.hashes.algorithm)
+    
+    def baseline_algorithms(self):
+        """Algorithms a file is hashed with for the baseline: the digest, and the checksum if any"""
+        checksum = self.hashes.checksum
+        return (self.hashes.algorithm, checksum) if checksum else (self.hashes.algorithm,)
+    
+    def set_algorithm(self, algorithm, workers=None, use_processes=False):
+        """
+        Switch the baseline to another hash algorithm
+        
+        Every monitored file is read once and hashed with both the old
+        and the new algorithm: the old digest proves the file has not
+        changed since it was baselined, and the new one replaces it. If
+        any file was modified, deleted or cannot be read, nothing is
+        changed. Chunk manifests are rebuilt by monitoring their files
+        again.
+        
+        Args:
+            algorithm: Name from HASH_ALGORITHMS
+            workers: Hashing threads or processes (see check_all)
+            use_processes: Hash in a process pool instead of threads
+        
+        Returns:
+            True if the baseline now uses algorithm
+        """
+        if algorithm not in HASH_ALGORITHMS:
+            print(f"Unknown hash algorithm: {algorithm} (use {', '.join(HASH_ALGORITHMS)})")
+            return False
+        old_algorithm = self.hashes.algorithm
+        if algorithm == old_algorithm:
+            print(f"The baseline already uses {algorithm}")
+            return True
+        if not self.hashes:
+            self.hashes.set_setting('algorithm', algorithm)
+            print(f"New files will be hashed with {algorithm}")
+            return True
+        
+        checksum = self.hashes.checksum
+        algorithms = (old_algorithm, algorithm) + ((checksum,) if checksum else ())
+        entries = [(path, file_hash) for path, file_hash, _, _ in self.hashes.entries()]
+        print(f"Re-hashing {len(entries)} files with {algorithm}...")
+        started = time.perf_counter()
+        failed = []
+        
+        def rows():
+            hashed = hash_files([path for path, _ in entries], workers, use_processes,
+                                algorithm=algorithms)
+            for (path, original_hash), (_, hashes, error) in zip(entries, hashed):
+                if error:
+                    failed.append((path, "UNREADABLE" if os.path.exists(path) else "DELETED"))
+                elif hashes[0] != original_hash:
+                    failed.append((path, "MODIFIED"))
+                else:
+                    yield path, hashes[1], hashes[2] if checksum else None
+            if failed:
+                raise ValueError(f"{len(failed)} files do not match the baseline")
+        
+        try:
+            self.hashes.replace_hashes(algorithm, rows())
+        except ValueError as e:
+            for path, status in failed:
+                print(f"{path} - {status}!")
+            print(f"Hash algorithm not changed: {e} (check them and monitor them again first)")
+            return False
+        print(f"The baseline now uses {algorithm} "
+              f"({len(entries)} files re-hashed in {time.perf_counter() - started:.1f}s)")
+        return True
+    
+    def set_checksum(self, checksum, digest_interval=None):
+        """
+        Enable or disable two-tier checking with a fast checksum
+        
+        The checksum is stored next to each hash. Files that check_all()
+        re-reads although their metadata is unchanged (paranoid mode and
+        samples) are then verified with the checksum, and the digest is
+        only computed when the checksum differs. Files whose metadata
+        changed are always verified with the digest, and with tier
+        "auto" a paranoid check is a full digest sweep once every
+        digest_interval, since a checksum can be forged.
+        
+        Args:
+            checksum: Name from CHECKSUM_ALGORITHMS (None = digest only)
+            digest_interval: Seconds between digest sweeps (None = keep
+                             the current interval, 7 days by default)
+        
+        Returns:
+            True unless the checksum name is unknown
+        """
+        if checksum is not None and checksum not in CHECKSUM_ALGORITHMS:
+            print(f"Unknown checksum: {checksum} (use {' or '.join(CHECKSUM_ALGORITHMS)})")
+            return False
+        if checksum != self.hashes.checksum:
+            # Checksums are stored again as files are next hashed with the digest
+            self.hashes.clear_checksums()
+            self.hashes.set_setting('checksum', checksum)
+        if digest_interval is not None:
+            self.hashes.set_setting('digest_interval', digest_interval)
+        if checksum:
+            days = float(self.hashes.setting('digest_interval', DIGEST_INTERVAL)) / 86400
+            print(f"Routine checks use {checksum}, with a {self.hashes.algorithm} "
+                  f"sweep every {days:g} days")
+        else:
+            print(f"Checks use {self.hashes.algorithm} only")
+        return True
+    
+    def check_tier(self, tier):
+        """
+        Resolve a check tier to "checksum" or "digest"
+        
+        "auto" is "digest" when the last digest sweep is older than the
+        digest interval (or there has been none).
+        """
+        if not self.hashes.checksum:
+            return "digest"
+        if tier != "auto":
+            return tier
+        last_sweep = float(self.hashes.setting('last_digest_sweep', 0))
+        interval = float(self.hashes.setting('digest_interval', DIGEST_INTERVAL))
+        return "checksum" if time.time() - last_sweep < interval else "digest"
+    
+    def monitor_file(self, filepath, chunking=None, chunk_size=CHUNK_SIZE, workers=None):
+        """
+        Add file to monitoring
+        
+        Args:
+            filepath: File to monitor
+            chunking: Also keep a chunk manifest, so checks can tell which
+                      byte ranges changed: "fixed" (chunk_size chunks) or
+                      "cdc" (content-defined chunks averaging chunk_size,
+                      which follow inserted or removed bytes). None keeps
+                      the file's existing manifest settings, if any.
+            chunk_size: Chunk size in bytes
+            workers: Threads hashing chunks (None = one per core plus a few)
+        """
         if not os.path.exists(filepath):
             print(f"File not found: {filepath}")
             return False
         
-        file_hash = self.calculate_hash(filepath)
-        self.hashes[filepath] = file_hash
+        previous = self.hashes.manifest(filepath) if chunking is None else None
+        if previous:
+            chunking, chunk_size = previous.method, previous.chunk_size
+        
+        # Stat first: a write during hashing then shows up as changed metadata
+        metadata = file_metadata(filepath)
+        if chunking:
+            try:
+                manifest = build_manifest(filepath, chunking, chunk_size, workers,
+                                          self.hashes.algorithm)
+            except ValueError as e:
+                print(f"Error: {e}")
+                return False
+            file_hash, checksum = manifest.file_hash, None
+            self.hashes.set_manifest(filepath, manifest)
+        else:
+            file_hash, checksum = split_hashes(
+                hash_file(filepath, algorithm=self.baseline_algorithms()))
+        self.hashes.set(filepath, file_hash, metadata, checksum)
         self.save_hashes()
-        print(f"Now monitoring: {filepath}")
+        if chunking:
+            print(f"Now monitoring: {filepath} ({len(manifest.chunks)} {chunking} chunks)")
+        else:
+            print(f"Now monitoring: {filepath}")
         return True
     
-    def check_file(self, filepath):
-        """Check if file has been modified"""
+    def monitor_tree(self, root, include=None, exclude=None, symlinks="skip",
+                     one_filesystem=False, workers=None, use_processes=False):
+        """
+        Add every regular file in a directory tree to monitoring
+        
+        The tree is walked once with os.scandir while files are hashed
+        in parallel, and the baseline is committed in batches. The tree
+        is remembered, so check_all() also reports files added to it or
+        deleted from it. Monitoring the same tree again re-baselines it:
+        new and changed files get their current hashes and files that no
+        longer exist are dropped.
+        
+        Args:
+            root: Directory to monitor
+            include: Globs a file's path (relative to root) or name must
+                     match, e.g. ["*.conf", "bin/*"] (None = every file)
+            exclude: Globs for files and directories to leave out, e.g.
+                     ["*.log", "cache"]
+            symlinks: "skip" symlinks or "follow" them
+            one_filesystem: Do not cross into other mounted file systems
+            workers: Hashing threads or processes (see check_all)
+            use_processes: Hash in a process pool instead of threads
+        
+        Returns:
+            True if the tree was scanned
+        """
+        if not os.path.isdir(root):
+            print(f"Directory not found: {root}")
+            return False
+        try:
+            scan = TreeScan(root, include, exclude, symlinks, one_filesystem)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+        
+        print(f"Scanning and hashing {scan.root}...")
+        started = time.perf_counter()
+        found = {}  # path -> FileMetadata from the walk (stat'ed before hashing)
+        
+        def walk():
+            for path, metadata in scan.files():
+                found[path] = metadata
+                yield path
+        
+        count = 0
+        total_bytes = 0
+        hashed = hash_files(walk(), workers, use_processes, algorithm=self.baseline_algorithms())
+        for path, hashes, error in hashed:
+            if error:
+                scan.errors.append((path, error))
+                continue
+            file_hash, checksum = split_hashes(hashes)
+            self.hashes.set(path, file_hash, found[path], checksum)
+            count += 1
+            total_bytes += found[path].size
+        
+        removed = [path for path in self.hashes.paths_under(scan.root) if path not in found]
+        for path in removed:
+            self.hashes.remove(path)
+        self.hashes.add_tree(scan.root, scan.options())
+        self.save_hashes()
+        
+        print(f"Now monitoring {count} files under {scan.root} "
+              f"({total_bytes / 1e6:,.1f} MB hashed in {time.perf_counter() - started:.1f}s)")
+        if removed:
+            print(f"Stopped monitoring {len(removed)} files that no longer exist")
+        for path, error in scan.errors:
+            print(f"Could not read {path}: {error}")
+        return True
+    
+    def check_file(self, filepath, regions=None, workers=None):
+        """
+        Check if file has been modified
+        
+        Files with a chunk manifest are checked chunk by chunk in
+        parallel, and the byte ranges that changed are reported.
+        
+        Args:
+            filepath: Monitored file
+            regions: For files with a chunk manifest, only re-verify
+                     these (start, end) byte ranges, e.g. where a change
+                     is suspected (None = the whole file)
+            workers: Threads hashing chunks
+        """
         if filepath not in self.hashes:
             print(f"File not being monitored: {filepath}")
             return False
         
+        manifest = self.hashes.manifest(filepath)
+        if manifest and manifest.file_hash == self.hashes[filepath]:
+            return self.check_chunks(filepath, manifest, regions, workers)
+        
         current_hash = self.calculate_hash(filepath)
         original_hash = self.hashes[filepath]
         
@@ -47,33 +342,644 @@ class FileIntegrityChecker:
             print(f"Current hash:  {current_hash}")
             return False
     
-    def check_all(self):
-        """Check all monitored files"""
-        if not self.hashes:
+    def check_chunks(self, filepath, manifest, regions=None, workers=None):
+        """Check a file against its chunk manifest and report the changed byte ranges"""
+        try:
+            changed, size, verified = verify_manifest(filepath, manifest, regions, workers,
+                                                      self.hashes.algorithm)
+        except OSError as e:
+            print(f"Error: could not read {filepath}: {e.strerror or e}")
+            return False
+        scope = "" if regions is None else f" ({format_size(verified)} re-verified)"
+        
+        if not changed and size == manifest.size:
+            print(f"{filepath} - NO CHANGES DETECTED{scope}")
+            return True
+        print(f"ALERT! {filepath} HAS BEEN MODIFIED{scope}")
+        if size != manifest.size:
+            print(f"Size changed from {manifest.size:,} to {size:,} bytes")
+        for start, end in changed:
+            print(f"Changed bytes {start:,}-{end:,} ({format_size(end - start)})")
+        return False
+    
+    def check_all(self, workers=None, use_processes=False, mode="fast", sample=0.0, tier="auto"):
+        """
+        Check all monitored files
+        
+        Files are hashed concurrently and reported in monitoring order.
+        Monitored trees are walked again, so files added to them are
+        reported too (the walk's stat results are reused). In fast mode
+        a file whose size, mtime, ctime, inode and device match the
+        baseline is not read at all. Files whose metadata changed but
+        whose contents did not (e.g. touched files) get their stored
+        metadata refreshed, so the next fast check skips them.
+        If the baseline has a fast checksum, files re-read although their
+        metadata is unchanged can be verified with it instead of the
+        digest (see set_checksum).
+        
+        Args:
+            workers: Hashing threads or processes (None = one per core
+                     plus a few for I/O, 1 = no pool)
+            use_processes: Hash in a process pool instead of threads
+                           (faster for trees of many small files)
+            mode: "fast" or "paranoid" (re-hash every file)
+            sample: Fraction of unchanged files to re-hash anyway in
+                    fast mode (e.g. 0.01), to catch edits that kept
+                    the metadata
+            tier: "auto", "checksum" or "digest" (see CHECK_TIERS)
+        
+        Returns:
+            True if no file was modified, added, deleted or unreadable
+        """
+        trees = self.hashes.trees()
+        if not self.hashes and not trees:
             print("No files being monitored")
             return
+        if mode not in CHECK_MODES:
+            print(f"Unknown check mode: {mode} (use {' or '.join(CHECK_MODES)})")
+            return False
+        if tier not in CHECK_TIERS:
+            print(f"Unknown check tier: {tier} (use {', '.join(CHECK_TIERS)})")
+            return False
         
         print(f"\n{'='*50}")
         print("CHECKING ALL MONITORED FILES")
         print(f"{'='*50}\n")
         
-        all_clean = True
-        for filepath in self.hashes:
-            current_hash = self.calculate_hash(filepath)
-            original_hash = self.hashes[filepath]
+        started = time.perf_counter()
+        found, unreadable = self.scan_trees(trees)
+        for path, error in unreadable:
+            print(f"{path} - UNREADABLE! ({error})")
+        
+        tier = self.check_tier(tier)
+        plan = self.plan_check(mode, sample, found)
+        counts = self.verify_plan(plan, tier, workers, use_processes)
+        counts['unreadable'] += len(unreadable)
+        
+        # Files left in found are in a monitored tree but not in the baseline
+        for filepath in found:
+            print(f"{filepath} - ADDED!")
+        counts['added'] = len(found)
+        
+        if mode == "paranoid" and tier == "digest":
+            self.hashes.set_setting('last_digest_sweep', time.time())
+        return self.print_summary(counts, time.perf_counter() - started)
+    
+    def verify_plan(self, plan, tier, workers=None, use_processes=False, throttle=None,
+                    drop_cache=False):
+        """
+        Hash the files a plan from plan_check() marks for re-hashing and
+        print the status of every file, in plan order
+        
+        Args:
+            plan: List from plan_check()
+            tier: "checksum" or "digest" (as resolved by check_tier)
+            workers: Hashing threads or processes (see check_all)
+            use_processes: Hash in a process pool instead of threads
+            throttle: Throttle limiting the reads (threads only)
+            drop_cache: Drop the files from the page cache as they are read
+        
+        Returns:
+            Counter of files "checked", "hashed" (with the digest),
+            "checksummed", "escalated", "modified", "deleted" and
+            "unreadable"
+        """
+        algorithm = self.hashes.algorithm
+        checksum = self.hashes.checksum
+        quick = (checksum,)
+        
+        def read_algorithms(stored, metadata, stored_checksum):
+            if tier == "checksum" and stored_checksum and metadata == stored:
+                return quick
+            if checksum and not stored_checksum:
+                return (algorithm, checksum)
+            return (algorithm,)
+        
+        rehash = [(filepath, read_algorithms(stored, metadata, stored_checksum))
+                  for filepath, _, stored, metadata, must_hash, stored_checksum in plan if must_hash]
+        counts = Counter(checked=len(plan))
+        counts['checksummed'] = sum(1 for _, algorithms in rehash if algorithms == quick)
+        counts['hashed'] = len(rehash) - counts['checksummed']
+        hashed = hash_files(rehash, workers, use_processes, throttle=throttle, drop_cache=drop_cache)
+        refreshed = 0
+        
+        for filepath, original_hash, stored, metadata, must_hash, stored_checksum in plan:
+            if not isinstance(metadata, FileMetadata):
+                # metadata is the stat error
+                if isinstance(metadata, FileNotFoundError):
+                    print(f"{filepath} - DELETED!")
+                    counts['deleted'] += 1
+                else:
+                    print(f"{filepath} - UNREADABLE! ({metadata.strerror or metadata})")
+                    counts['unreadable'] += 1
+                continue
+            if not must_hash:
+                print(f"{filepath} - NO CHANGES")
+                continue
+            
+            _, hashes, error = next(hashed)
+            if not error and read_algorithms(stored, metadata, stored_checksum) == quick:
+                if hashes[0] == stored_checksum:
+                    print(f"{filepath} - NO CHANGES")
+                    continue
+                # The checksum differs: the digest decides
+                counts['escalated'] += 1
+                counts['hashed'] += 1
+                try:
+                    hashes = hash_file(filepath, algorithm=(algorithm, checksum),
+                                       throttle=throttle, drop_cache=drop_cache)
+                except OSError as e:
+                    error = e.strerror or str(e)
             
-            if current_hash == original_hash:
+            if error:
+                if not os.path.exists(filepath):
+                    print(f"{filepath} - DELETED!")
+                    counts['deleted'] += 1
+                else:
+                    print(f"{filepath} - UNREADABLE! ({error})")
+                    counts['unreadable'] += 1
+            elif hashes[0] == original_hash:
                 print(f"{filepath} - NO CHANGES")
+                current_checksum = split_hashes(hashes)[1] or stored_checksum
+                if stored != metadata or current_checksum != stored_checksum:
+                    self.hashes.set(filepath, original_hash, metadata, current_checksum)
+                    refreshed += 1
             else:
                 print(f"{filepath} - MODIFIED!")
-                all_clean = False
+                counts['modified'] += 1
+        
+        if refreshed:
+            self.save_hashes()
+        return counts
+    
+    def print_summary(self, counts, seconds, progress=None):
+        """
+        Print the closing summary of a check
+        
+        Args:
+            counts: Counter from verify_plan(), plus "added" files
+            seconds: Time the check took
+            progress: Extra line to print (e.g. a scan's progress)
         
+        Returns:
+            True if no file was modified, added, deleted or unreadable
+        """
+        all_clean = not (counts['modified'] or counts['added'] or counts['deleted']
+                         or counts['unreadable'])
         print(f"\n{'='*50}")
         if all_clean:
             print("All files are secure")
         else:
             print("Some files have been modified")
+        hashed_count = f"{counts['hashed']} hashed with {self.hashes.algorithm}"
+        if counts['checksummed']:
+            hashed_count += (f", {counts['checksummed']} checksummed with {self.hashes.checksum}, "
+                             f"{counts['escalated']} escalated")
+        print(f"Checked {counts['checked']} files in {seconds:.2f}s ({hashed_count})")
+        if not all_clean:
+            print(f"{counts['modified']} modified, {counts['added']} added, "
+                  f"{counts['deleted']} deleted")
+        if progress:
+            print(progress)
+        print(f"{'='*50}\n")
+        return all_clean
+    
+    def check_slice(self, slices=24, workers=1, bytes_per_second=None, reads_per_second=None,
+                    drop_cache=True, tier="auto"):
+        """
+        Check the next slice of the baseline, so that a full paranoid
+        pass is spread over several runs (e.g. one slice an hour)
+        
+        Each slice re-reads about 1/slices of the monitored bytes, in
+        monitoring order, at a limited rate and without filling the page
+        cache, so it does not compete with other programs for the disk.
+        A slice that reads more than its share (to finish a large file)
+        is made up for by the next ones. Progress is saved every
+        SCAN_STEP files, so a slice that is interrupted continues where
+        it stopped. The first slice of each pass also walks the
+        monitored trees to report added files.
+        
+        Args:
+            slices: Slices per full pass
+            workers: Hashing threads (one keeps the disk queue shortest)
+            bytes_per_second: Read bandwidth budget (None = unlimited)
+            reads_per_second: Read operations (IOPS) budget (None = unlimited)
+            drop_cache: Drop the files from the page cache as they are read
+            tier: "auto", "checksum" or "digest"; "auto" is decided once
+                  per pass, and a pass verified with the digest counts
+                  as a digest sweep
+        
+        Returns:
+            True if no file in the slice was modified, added, deleted or
+            unreadable
+        """
+        if not self.hashes:
+            print("No files being monitored")
+            return False
+        if tier not in CHECK_TIERS:
+            print(f"Unknown check tier: {tier} (use {', '.join(CHECK_TIERS)})")
+            return False
+        
+        files, total_bytes = self.hashes.total_size()
+        share = (total_bytes + files * SCAN_FILE_COST) / slices
+        debt = float(self.hashes.setting('scan_debt', 0))
+        if debt >= share:
+            self.hashes.set_setting('scan_debt', debt - share)
+            print("Skipping this slice: the last one read ahead to finish a large file")
+            return True
+        
+        position = int(self.hashes.setting('scan_position', 0))
+        if position == 0:
+            self.hashes.set_setting('scan_tier', self.check_tier(tier))
+            self.hashes.set_setting('scan_slice', 1)
+        if tier == "auto":
+            tier = self.hashes.setting('scan_tier') or self.check_tier(tier)
+        else:
+            tier = self.check_tier(tier)
+        slice_number = int(self.hashes.setting('scan_slice', 1))
+        
+        print(f"\n{'='*50}")
+        print(f"SCANNING SLICE {slice_number} OF {slices}")
         print(f"{'='*50}\n")
+        
+        started = time.perf_counter()
+        counts = Counter()
+        if position == 0:
+            found, unreadable = self.scan_trees(self.hashes.trees())
+            for path, error in unreadable:
+                print(f"{path} - UNREADABLE! ({error})")
+            counts['unreadable'] += len(unreadable)
+            for path in found:
+                if path not in self.hashes:
+                    print(f"{path} - ADDED!")
+                    counts['added'] += 1
+        
+        throttle = Throttle(bytes_per_second, reads_per_second)
+        budget = share - debt
+        spent = 0
+        while spent < budget:
+            rows = []
+            for row in self.hashes.entries_after(position, SCAN_STEP):
+                if spent >= budget:
+                    break
+                rows.append(row)
+                metadata = row[3]
+                spent += (metadata.size if metadata else 0) + SCAN_FILE_COST
+            if not rows:
+                break
+            plan = self.plan_check("paranoid", 0.0, entries=[row[1:] for row in rows])
+            counts += self.verify_plan(plan, tier, workers, throttle=throttle,
+                                       drop_cache=drop_cache)
+            position = rows[-1][0]
+            self.hashes.set_setting('scan_position', position)
+            self.hashes.set_setting('scan_debt', max(spent - budget, 0))
+        
+        remaining_files, remaining_bytes = self.hashes.total_size(position)
+        if remaining_files:
+            self.hashes.set_setting('scan_slice', slice_number + 1)
+            remaining = remaining_bytes + remaining_files * SCAN_FILE_COST
+            progress = f"Pass {100 - 100 * remaining / (share * slices):.0f}% complete"
+        else:
+            # Pass complete: the next slice starts over
+            self.hashes.set_setting('scan_position', 0)
+            self.hashes.set_setting('last_full_pass', time.time())
+            if tier == "digest":
+                self.hashes.set_setting('last_digest_sweep', time.time())
+            progress = f"Full pass complete in {slice_number} slices"
+        return self.print_summary(counts, time.perf_counter() - started, progress)
+    
+    def schedule_scans(self, interval=3600, slices=24, duration=None, workers=1,
+                       bytes_per_second=None, reads_per_second=None, drop_cache=True,
+                       tier="auto"):
+        """
+        Run check_slice() every interval seconds, in the background of
+        other work, until stopped
+        
+        The start of the last completed slice is saved, so after a
+        restart the schedule carries on (and an interrupted slice is
+        resumed at once).
+        
+        Args:
+            interval: Seconds between slice starts (3600 with 24 slices
+                      = one full pass a day)
+            slices: Slices per full pass
+            duration: Seconds to run (None = until Ctrl+C)
+            workers, bytes_per_second, reads_per_second, drop_cache,
+            tier: As for check_slice()
+        
+        Returns:
+            True once the scheduler stops
+        """
+        if not self.hashes:
+            print("No files being monitored")
+            return False
+        print(f"Scanning 1/{slices} of the baseline every {interval / 60:g} minutes; "
+              f"press Ctrl+C to stop")
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                due = float(self.hashes.setting('scan_last_slice', 0)) + interval
+                wait = due - time.time()
+                if wait > 0:
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                    time.sleep(max(wait, 0))
+                    continue
+                slice_started = time.time()
+                self.check_slice(slices, workers, bytes_per_second, reads_per_second,
+                                 drop_cache, tier)
+                self.hashes.set_setting('scan_last_slice', slice_started)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.save_hashes()
+        
+        print("\nStopped scheduled scans")
+        return True
+    
+    def scan_trees(self, trees):
+        """
+        Walk the monitored trees with their stored options
+        
+        Returns:
+            ({path: FileMetadata} of the files found, [(path, error)]
+            for entries that could not be read)
+        """
+        found = {}
+        unreadable = []
+        for root, options in trees:
+            scan = TreeScan(root, **options)
+            found.update(scan.files())
+            unreadable.extend(scan.errors)
+        return found, unreadable
+    
+    def plan_check(self, mode, sample, found=None, entries=None):
+        """
+        Stat every monitored file and decide which ones to re-hash
+        
+        Args:
+            found: {path: FileMetadata} from scan_trees(); matching
+                   entries are removed and used instead of a new stat
+            entries: (path, hash, FileMetadata, checksum) of the files
+                     to plan (None = every monitored file)
+        
+        Returns:
+            List of (filepath, baseline hash, baseline FileMetadata,
+            current FileMetadata or the OSError from stat, whether to
+            re-hash, baseline checksum)
+        """
+        found = {} if found is None else found
+        plan = []
+        entries = self.hashes.entries() if entries is None else entries
+        for filepath, original_hash, stored, checksum in entries:
+            metadata = found.pop(filepath, None)
+            try:
+                if metadata is None:
+                    metadata = file_metadata(filepath)
+            except OSError as e:
+                plan.append((filepath, original_hash, stored, e, False, checksum))
+                continue
+            must_hash = (mode == "paranoid" or metadata != stored
+                         or (sample and random.random() < sample))
+            plan.append((filepath, original_hash, stored, metadata, must_hash, checksum))
+        return plan
+    
+    def watch(self, duration=None, debounce=0.5, polling=False, poll_interval=5.0,
+              workers=None, on_alert=None):
+        """
+        Watch monitored files and trees, and check files as they change
+        
+        Changes are detected with inotify (falling back to polling where
+        it is unavailable), so only touched files are re-hashed and an
+        idle watcher uses no CPU. Bursts of writes are debounced: a file
+        is checked once it has been quiet for debounce seconds. Changes
+        made while not watching are found by check_all().
+        
+        Args:
+            duration: Seconds to watch (None = until Ctrl+C)
+            debounce: Seconds a file must be quiet before it is checked
+            polling: Poll instead of using inotify
+            poll_interval: Seconds between polls when polling
+            workers: Hashing threads (see check_all)
+            on_alert: Called with (path, status) for each alert, where
+                      status is "MODIFIED", "ADDED", "DELETED" or
+                      "UNREADABLE"
+        
+        Returns:
+            True once watching stops
+        """
+        trees = [TreeScan(root, **options) for root, options in self.hashes.trees()]
+        if not self.hashes and not trees:
+            print("No files being monitored")
+            return False
+        
+        watcher = None
+        if not polling:
+            try:
+                watcher = InotifyWatcher(self.hashes, trees, poll_interval)
+            except OSError as e:
+                print(f"Cannot use inotify ({e.strerror or e}); "
+                      f"polling every {poll_interval}s instead")
+        if watcher is None:
+            watcher = PollingWatcher(self.hashes, trees, poll_interval)
+        
+        print(f"\n{'='*50}")
+        print(f"WATCHING MONITORED FILES ({watcher.method})")
+        print("Press Ctrl+C to stop")
+        print(f"{'='*50}\n")
+        
+        pending = {}  # path -> (first event, last event)
+        longest = debounce * MAX_DEBOUNCE_PERIODS
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while True:
+                now = time.monotonic()
+                timeouts = [min(last + debounce, first + longest) - now
+                            for first, last in pending.values()]
+                if deadline is not None:
+                    timeouts.append(deadline - now)
+                    if deadline <= now:
+                        break
+                touched = watcher.wait(min(timeouts) if timeouts else None)
+                
+                now = time.monotonic()
+                if touched is None:
+                    print("Some events were lost; checking every monitored file")
+                    pending.clear()
+                    self.check_all(workers)
+                    continue
+                for path in touched:
+                    first, _ = pending.get(path, (now, now))
+                    pending[path] = (first, now)
+                
+                due = [path for path, (first, last) in pending.items()
+                       if now - last >= debounce or now - first >= longest]
+                for path in due:
+                    del pending[path]
+                if due:
+                    self.verify_paths(sorted(due), trees, workers, on_alert)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            self.save_hashes()
+        
+        print("\nStopped watching")
+        return True
+    
+    def verify_paths(self, paths, trees, workers=None, on_alert=None):
+        """
+        Check touched paths against the baseline and print an alert for
+        each change
+        
+        Files whose metadata still matches the baseline are not read,
+        and touched files with unchanged contents get their metadata
+        refreshed, as in a fast check_all().
+        
+        Args:
+            paths: Touched paths (any path; unmonitored ones are ignored)
+            trees: TreeScan of each monitored tree, to recognise new files
+        """
+        def alert(path, status, detail=""):
+            print(f"[{time.strftime('%H:%M:%S')}] {path} - {status}!{detail}")
+            if on_alert:
+                on_alert(path, status)
+        
+        rehash = []
+        for path in paths:
+            row = self.hashes.row(path)
+            if row is None:
+                if any(tree.selects(path) for tree in trees):
+                    alert(path, "ADDED")
+                continue
+            try:
+                metadata = file_metadata(path)
+            except FileNotFoundError:
+                alert(path, "DELETED")
+                continue
+            except OSError as e:
+                alert(path, "UNREADABLE", f" ({e.strerror or e})")
+                continue
+            if metadata != entry_metadata(row):
+                rehash.append((path, row[1], metadata, row[-1]))
+        
+        hashed = hash_files([path for path, _, _, _ in rehash], workers,
+                            algorithm=self.hashes.algorithm)
+        for (path, original_hash, metadata, checksum), (_, current_hash, error) in zip(rehash, hashed):
+            if error:
+                if os.path.exists(path):
+                    alert(path, "UNREADABLE", f" ({error})")
+                else:
+                    alert(path, "DELETED")
+            elif current_hash == original_hash:
+                self.hashes.set(path, original_hash, metadata, checksum)
+            else:
+                alert(path, "MODIFIED")
+        self.save_hashes()
+    
+    def compare_baseline(self, other_database=None, directory=None, mode="fast", workers=None):
+        """
+        Compare the baseline with the files on disk or with another
+        baseline (e.g. from another machine), using their Merkle trees
+        
+        Matching directory hashes prove whole subtrees identical, so the
+        comparison only descends into directories that differ: its cost
+        grows with the number of changes, not the number of files. The
+        scan of the files on disk still stats every file (and hashes
+        those that need it, as check_all() does).
+        
+        Args:
+            other_database: Baseline database to compare with (None =
+                            scan the monitored files now)
+            directory: Only compare this directory (None = everything)
+            mode: "fast" or "paranoid", for scanning the files on disk
+            workers: Hashing threads for the scan (see check_all)
+        
+        Returns:
+            True if both sides are identical
+        """
+        if other_database is not None and not os.path.isfile(other_database):
+            print(f"Baseline not found: {other_database}")
+            return False
+        if mode not in CHECK_MODES:
+            print(f"Unknown check mode: {mode} (use {' or '.join(CHECK_MODES)})")
+            return False
+        directory = (directory.rstrip(os.sep) or os.sep) if directory else TOP
+        
+        started = time.perf_counter()
+        if other_database is None:
+            other = self.current_merkle(mode, workers)
+            label = "FILES ON DISK"
+        else:
+            other = BaselineStore(other_database)
+            label = other_database
+            if other.algorithm != self.hashes.algorithm:
+                print(f"Cannot compare: {other_database} uses {other.algorithm} "
+                      f"and this baseline uses {self.hashes.algorithm}")
+                other.close()
+                return False
+        
+        print(f"\n{'='*50}")
+        print(f"COMPARING BASELINE WITH {label}")
+        print(f"{'='*50}\n")
+        
+        counts = {"MODIFIED": 0, "ADDED": 0, "DELETED": 0}
+        for path, status in diff_trees(self.hashes, other, directory):
+            print(f"{path} - {status}!")
+            counts[status] += 1
+        root_hash = other.directory_hash(directory)
+        if other_database is not None:
+            other.close()
+        
+        identical = not any(counts.values())
+        print(f"\n{'='*50}")
+        if identical:
+            print(f"Identical (Merkle root {root_hash or 'empty'})")
+        else:
+            print(f"{counts['MODIFIED']} modified, {counts['ADDED']} added, "
+                  f"{counts['DELETED']} deleted")
+        print(f"Compared in {time.perf_counter() - started:.2f}s")
+        print(f"{'='*50}\n")
+        return identical
+    
+    def current_merkle(self, mode="fast", workers=None):
+        """
+        Scan the monitored files and trees and build their Merkle tree
+        
+        Files that cannot be read keep their baseline hash (and are
+        reported), since their contents are unknown.
+        
+        Returns:
+            MerkleTree
+        """
+        found, unreadable = self.scan_trees(self.hashes.trees())
+        plan = self.plan_check(mode, 0.0, found)
+        current = {}
+        rehash = []
+        for filepath, original_hash, _, metadata, must_hash, _ in plan:
+            if isinstance(metadata, FileNotFoundError):
+                continue
+            if not isinstance(metadata, FileMetadata):
+                unreadable.append((filepath, metadata.strerror or str(metadata)))
+                current[filepath] = original_hash
+            elif must_hash:
+                rehash.append(filepath)
+            else:
+                current[filepath] = original_hash
+        
+        # Added files are hashed too, so the tree is comparable with any baseline
+        hashed = hash_files(rehash + list(found), workers, algorithm=self.hashes.algorithm)
+        for filepath, file_hash, error in hashed:
+            if not error:
+                current[filepath] = file_hash
+            elif os.path.exists(filepath):
+                unreadable.append((filepath, error))
+                if filepath in self.hashes:
+                    current[filepath] = self.hashes[filepath]
+        
+        for path, error in unreadable:
+            print(f"{path} - UNREADABLE! ({error})")
+        return MerkleTree(current.items())
     
     def list_monitored_files(self):
         """List all monitored files"""
@@ -89,20 +995,31 @@ class FileIntegrityChecker:
         print(f"{'='*50}\n")
     
     def save_hashes(self):
-        """Save hashes to file"""
-        with open(self.database_file, 'w') as f:
-            for filepath, file_hash in self.hashes.items():
-                f.write(f"{filepath}|{file_hash}\n")
-    
-    def load_hashes(self):
-        """Load hashes from file"""
-        if os.path.exists(self.database_file):
-            with open(self.database_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        filepath, file_hash = line.split('|')
-                        self.hashes[filepath] = file_hash
+        """Commit baseline changes to the database"""
+        self.hashes.flush()
+    
+    def load_hashes(self, legacy_file="file_hashes.txt"):
+        """
+        Import a text baseline from older versions (once)
+        
+        The baseline itself is read lazily from the database, so nothing
+        else is loaded at startup.
+        """
+        if not legacy_file or not is_text_baseline(legacy_file):
+            return
+        
+        try:
+            count = self.hashes.import_legacy_file(legacy_file)
+            os.replace(legacy_file, legacy_file + ".migrated")
+        except (OSError, ValueError) as e:
+            print(f"Error: could not migrate {legacy_file}: {e}")
+            return
+        print(f"Migrated {count} monitored files from {legacy_file} to {self.database_file}")
+
+
+def split_hashes(hashes):
+    """(digest, checksum or None) from hashing with baseline_algorithms()"""
+    return hashes[0], hashes[1] if len(hashes) > 1 else None
 
 
 def display_menu():
@@ -114,9 +1031,14 @@ def display_menu():
     print("2. Check a file")
     print("3. Check all files")
     print("4. List monitored files")
-    print("5. Exit")
+    print("5. Monitor a directory tree")
+    print("6. Watch for changes in real time")
+    print("7. Compare with files on disk or another baseline")
+    print("8. Hash algorithm settings")
+    print("9. Run scheduled background scans")
+    print("10. Exit")
     print(f"{'='*50}")
-    return input("Select option (1-5): ")
+    return input("Select option (1-10): ")
 
 
 def monitor_file_interactive(checker):
@@ -127,7 +1049,32 @@ def monitor_file_interactive(checker):
         print("No file path entered")
         return
     
-    checker.monitor_file(filepath)
+    chunking = input("Keep a chunk manifest to locate changes in large files? "
+                     "(fixed/cdc, press Enter for none): ").strip().lower()
+    
+    checker.monitor_file(filepath, chunking or None)
+
+
+def monitor_tree_interactive(checker):
+    """Interactive directory tree monitoring"""
+    root = input("Enter directory to monitor: ").strip()
+    
+    if not root:
+        print("No directory entered")
+        return
+    
+    include = input("Only files matching (globs separated by commas, e.g. *.conf,bin/*; "
+                    "press Enter for all): ").strip()
+    exclude = input("Leave out files or directories matching (e.g. *.log,cache; "
+                    "press Enter for none): ").strip()
+    follow = input("Follow symlinks? (y/N): ").strip().lower() == 'y'
+    one_filesystem = input("Stay on this file system (skip mount points)? (y/N): "
+                           ).strip().lower() == 'y'
+    
+    checker.monitor_tree(root,
+                         [pattern.strip() for pattern in include.split(',') if pattern.strip()],
+                         [pattern.strip() for pattern in exclude.split(',') if pattern.strip()],
+                         "follow" if follow else "skip", one_filesystem)
 
 
 def check_file_interactive(checker):
@@ -138,7 +1085,111 @@ def check_file_interactive(checker):
         print("No file path entered")
         return
     
-    checker.check_file(filepath)
+    regions = None
+    if checker.hashes.manifest(filepath):
+        ranges = input("Only re-verify byte ranges (e.g. 0-64M,1G-2G; "
+                       "press Enter for the whole file): ").strip()
+        try:
+            regions = parse_ranges(ranges) if ranges else None
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+    
+    checker.check_file(filepath, regions)
+
+
+def check_all_interactive(checker):
+    """Interactive check of every monitored file"""
+    mode = input("Check mode - fast (skip files whose size, times and inode are unchanged) "
+                 "or paranoid (re-hash everything) [fast]: ").strip().lower() or "fast"
+    sample = 0.0
+    if mode == "fast":
+        percent = input("Also re-hash a random sample of unchanged files "
+                        "(percent, press Enter for none): ").strip().rstrip('%')
+        sample = float(percent) / 100 if percent else 0.0
+    use_processes = input("Hash in separate processes (best for many small files)? (y/N): "
+                          ).strip().lower() == 'y'
+    workers_input = input(f"Hashing workers (press Enter for "
+                          f"{default_workers(use_processes)}): ").strip()
+    workers = int(workers_input) if workers_input.isdigit() else None
+    tier = "auto"
+    if checker.hashes.checksum:
+        tier = input(f"Verify re-read files with - checksum ({checker.hashes.checksum}), "
+                     f"digest ({checker.hashes.algorithm}) or auto (digest when a sweep is due) "
+                     f"[auto]: ").strip().lower() or "auto"
+    
+    checker.check_all(workers, use_processes, mode, sample, tier)
+
+
+def watch_interactive(checker):
+    """Interactive real-time watching"""
+    if input("Check all files first, for changes made while not watching? (Y/n): "
+             ).strip().lower() != 'n':
+        checker.check_all()
+    polling = input("Poll instead of using inotify (e.g. for network file systems)? (y/N): "
+                    ).strip().lower() == 'y'
+    poll_interval = 5.0
+    if polling:
+        interval = input("Seconds between polls (press Enter for 5): ").strip()
+        try:
+            poll_interval = float(interval) if interval else 5.0
+        except ValueError:
+            print("Invalid interval, using 5 seconds")
+    
+    checker.watch(polling=polling, poll_interval=poll_interval)
+
+
+def compare_baseline_interactive(checker):
+    """Interactive baseline comparison"""
+    other_database = input("Baseline database to compare with "
+                           "(press Enter to compare with the files on disk): ").strip()
+    directory = input("Only compare directory (press Enter for everything): ").strip()
+    
+    checker.compare_baseline(other_database or None, directory or None)
+
+
+def hash_settings_interactive(checker):
+    """Interactive hash algorithm settings"""
+    print(f"Hash algorithm: {checker.hashes.algorithm}")
+    print(f"Fast checksum: {checker.hashes.checksum or 'none'}")
+    algorithm = input(f"New hash algorithm ({', '.join(HASH_ALGORITHMS)}; "
+                      f"press Enter to keep): ").strip().lower()
+    if algorithm and not checker.set_algorithm(algorithm):
+        return
+    checksum = input(f"Fast checksum for routine checks ({', '.join(CHECKSUM_ALGORITHMS)} "
+                     f"or none; press Enter to keep): ").strip().lower()
+    if not checksum:
+        return
+    digest_interval = None
+    if checksum != "none":
+        days = input("Days between full digest sweeps (press Enter to keep): ").strip()
+        try:
+            digest_interval = float(days) * 86400 if days else None
+        except ValueError:
+            print("Invalid number of days, keeping the current interval")
+    
+    checker.set_checksum(None if checksum == "none" else checksum, digest_interval)
+
+
+def schedule_scans_interactive(checker):
+    """Interactive scheduled background scans"""
+    try:
+        slices = int(input("Spread each full pass over how many slices "
+                           "(press Enter for 24): ").strip() or 24)
+        minutes = float(input("Minutes between slices (press Enter for 60): ").strip() or 60)
+        rate = input("Read limit in MB/s (press Enter for none): ").strip()
+        iops = input("Read operations per second limit (press Enter for none): ").strip()
+        bytes_per_second = float(rate) * 1024 * 1024 if rate else None
+        reads_per_second = float(iops) if iops else None
+    except ValueError:
+        print("Invalid number")
+        return
+    if slices < 1:
+        print("Invalid number of slices")
+        return
+    
+    checker.schedule_scans(minutes * 60, slices, bytes_per_second=bytes_per_second,
+                           reads_per_second=reads_per_second)
 
 
 def main():
@@ -158,10 +1209,20 @@ def main():
         elif choice == "2":
             check_file_interactive(checker)
         elif choice == "3":
-            checker.check_all()
+            check_all_interactive(checker)
         elif choice == "4":
             checker.list_monitored_files()
         elif choice == "5":
+            monitor_tree_interactive(checker)
+        elif choice == "6":
+            watch_interactive(checker)
+        elif choice == "7":
+            compare_baseline_interactive(checker)
+        elif choice == "8":
+            hash_settings_interactive(checker)
+        elif choice == "9":
+            schedule_scans_interactive(checker)
+        elif choice == "10":
             print("\nThank you for using File Integrity Checker!")
             break
         else:
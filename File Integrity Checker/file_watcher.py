@@ -0,0 +1,354 @@
+import ctypes
+import errno
+import math
+import os
+import select
+import struct
+import sys
+import time
+
+from file_hashing import file_metadata
+
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+
+# Everything that can change a file's contents, metadata or existence.
+# Directories are watched rather than files, so files replaced by rename
+# (as editors and package managers do) stay watched.
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR | IN_EXCL_UNLINK)
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+EVENT_HEADER = struct.Struct('iIII')
+READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """
+    Minimal inotify binding through ctypes (Linux only)
+
+    The descriptor is non-blocking and read() waits with poll(), so an
+    idle watcher sleeps in the kernel and uses no CPU.
+    """
+
+    def __init__(self):
+        """
+        Raises:
+            OSError: If inotify is not available on this system
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = ctypes.CDLL(None, use_errno=True)
+        try:
+            self.add_watch_function = libc.inotify_add_watch
+            self.rm_watch_function = libc.inotify_rm_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError(errno.ENOSYS, "the C library has no inotify support") from None
+        self.add_watch_function.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.rm_watch_function.argtypes = [ctypes.c_int, ctypes.c_int]
+
+        self.fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise last_os_error()
+        self.poller = select.poll()
+        self.poller.register(self.fd, select.POLLIN)
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """
+        Watch a directory
+
+        Returns:
+            Watch descriptor (the same one if path is already watched)
+
+        Raises:
+            OSError: ENOSPC when fs.inotify.max_user_watches is reached
+        """
+        wd = self.add_watch_function(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise last_os_error(path)
+        return wd
+
+    def rm_watch(self, wd):
+        self.rm_watch_function(self.fd, wd)
+
+    def read(self, timeout=None):
+        """
+        Wait for events
+
+        Args:
+            timeout: Seconds to wait (None = until an event arrives)
+
+        Returns:
+            List of (watch descriptor, mask, name); empty on timeout
+        """
+        if not self.poller.poll(None if timeout is None else math.ceil(max(timeout, 0) * 1000)):
+            return []
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def last_os_error(path=None):
+    """OSError for the errno left by the last ctypes call"""
+    code = ctypes.get_errno()
+    return OSError(code, os.strerror(code), path)
+
+
+def snapshot(paths):
+    """{path: FileMetadata or None if missing} for each path"""
+    current = {}
+    for path in paths:
+        try:
+            current[path] = file_metadata(path)
+        except OSError:
+            current[path] = None
+    return current
+
+
+class InotifyWatcher:
+    """
+    Report paths touched under the monitored trees and the directories
+    of individually monitored files, as inotify events arrive
+    """
+
+    method = "inotify"
+
+    def __init__(self, hashes, trees, poll_interval=5.0):
+        """
+        Args:
+            hashes: The checker's BaselineStore
+            trees: TreeScan of each monitored tree
+            poll_interval: Seconds between polls of the monitored files
+                           in directories that cannot be watched
+
+        Raises:
+            OSError: If inotify is unavailable or the watch limit is
+                     reached while adding watches
+        """
+        self.hashes = hashes
+        self.trees = trees
+        self.poll_interval = poll_interval
+        self.next_poll = time.monotonic() + poll_interval
+        self.inotify = Inotify()
+        self.directories = {}  # watch descriptor -> directory
+        self.unwatched = {}  # directory -> {path: FileMetadata or None}, polled instead
+
+        # Events name absolute paths; files monitored by a relative path
+        # (e.g. "a.txt") are reported under the path they are stored as
+        self.aliases = {}  # absolute path -> stored paths
+        directories = set()
+        for path in hashes:
+            absolute = os.path.abspath(path)
+            if absolute != path:
+                self.aliases.setdefault(absolute, []).append(path)
+            directories.add(os.path.dirname(absolute))
+        for absolute, paths in self.aliases.items():
+            if absolute in hashes:
+                paths.append(absolute)
+
+        try:
+            for tree in trees:
+                for directory, _ in tree.walk(files=False, directories=True):
+                    self.watch(directory)
+            for directory in directories - set(self.directories.values()):
+                self.watch(directory)
+        except OSError:
+            self.inotify.close()
+            raise
+
+    def watch(self, directory):
+        """
+        Watch a directory, or poll its monitored files if it cannot be
+        watched (e.g. it is missing or unreadable)
+
+        Returns:
+            True if the directory is watched
+        """
+        try:
+            self.directories[self.inotify.add_watch(directory)] = directory
+            return True
+        except OSError as e:
+            if e.errno == errno.ENOSPC:
+                raise OSError(e.errno, "inotify watch limit reached (raise "
+                                       "fs.inotify.max_user_watches)", directory) from None
+            if directory not in self.unwatched:
+                print(f"Cannot watch {directory} ({e.strerror or e}); "
+                      f"polling its monitored files every {self.poll_interval}s")
+                self.unwatched[directory] = snapshot(self.monitored_files(directory))
+            return False
+
+    def monitored_files(self, directory):
+        """Stored paths of the monitored files directly in a directory"""
+        return [path for path in self.hashes
+                if os.path.dirname(os.path.abspath(path)) == directory]
+
+    def poll(self):
+        """
+        Check the directories that could not be watched: watch those
+        that can be now, and compare the files of the rest with their
+        last snapshot
+
+        Returns:
+            Set of touched paths
+        """
+        touched = set()
+        for directory, seen in list(self.unwatched.items()):
+            try:
+                self.directories[self.inotify.add_watch(directory)] = directory
+            except OSError:
+                current = snapshot(seen)
+                touched.update(path for path, metadata in current.items()
+                               if seen[path] != metadata)
+                self.unwatched[directory] = current
+                continue
+            # Watched from now on; anything may have changed in between
+            del self.unwatched[directory]
+            touched.update(seen)
+        return touched
+
+    def forget(self, directory):
+        """Stop watching a directory that was moved or deleted, and those below it"""
+        prefix = directory + os.sep
+        for wd, path in list(self.directories.items()):
+            if path == directory or path.startswith(prefix):
+                self.inotify.rm_watch(wd)
+                del self.directories[wd]
+
+    def added_directory(self, directory):
+        """Watch a new directory in a tree; return the files already in it"""
+        touched = []
+        for tree in self.trees:
+            if tree.contains(directory):
+                for path, metadata in tree.walk(directory, directories=True):
+                    if metadata is None:
+                        self.watch(path)
+                    else:
+                        touched.append(path)
+        return touched
+
+    def wait(self, timeout=None):
+        """
+        Wait for files to be touched
+
+        Args:
+            timeout: Seconds to wait (None = until something happens)
+
+        Returns:
+            Set of touched paths (empty on timeout), or None if the
+            kernel dropped events and everything must be checked
+        """
+        touched = set()
+        lost = False
+        if self.unwatched:
+            delay = max(self.next_poll - time.monotonic(), 0)
+            timeout = delay if timeout is None else min(timeout, delay)
+        for wd, mask, name in self.inotify.read(timeout):
+            if mask & IN_Q_OVERFLOW:
+                lost = True
+                continue
+            directory = self.directories.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.directories[wd]
+                continue
+            if not name:  # the watched directory itself was moved or deleted
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    touched.update(self.added_directory(path))
+                elif mask & (IN_MOVED_FROM | IN_DELETE):
+                    touched.update(self.hashes.paths_under(path))
+                    self.forget(path)
+                continue
+            touched.update(self.aliases.get(path, (path,)))
+        if self.unwatched and time.monotonic() >= self.next_poll:
+            self.next_poll = time.monotonic() + self.poll_interval
+            touched.update(self.poll())
+        return None if lost else touched
+
+    def close(self):
+        self.inotify.close()
+
+
+class PollingWatcher:
+    """
+    Report touched paths by comparing stat results every few seconds
+
+    Used where inotify is unavailable (other systems, watch limit
+    reached). Each poll costs one stat per monitored file.
+    """
+
+    method = "polling"
+
+    def __init__(self, hashes, trees, interval=5.0):
+        """
+        Args:
+            hashes: The checker's BaselineStore
+            trees: TreeScan of each monitored tree
+            interval: Seconds between polls
+        """
+        self.hashes = hashes
+        self.trees = trees
+        self.interval = interval
+        self.seen = self.snapshot()
+        self.next_poll = time.monotonic() + interval
+
+    def snapshot(self):
+        """{path: FileMetadata or None if missing} for every watched file"""
+        current = snapshot(self.hashes)
+        for tree in self.trees:
+            current.update(tree.files())
+            tree.errors.clear()
+        return current
+
+    def wait(self, timeout=None):
+        """Same as InotifyWatcher.wait(); events are never lost"""
+        delay = self.next_poll - time.monotonic()
+        if timeout is not None and timeout < delay:
+            time.sleep(max(timeout, 0))
+            return set()
+        time.sleep(max(delay, 0))
+        self.next_poll = time.monotonic() + self.interval
+
+        current = self.snapshot()
+        touched = {path for path, metadata in current.items() if self.seen.get(path) != metadata}
+        touched.update(path for path in self.seen if path not in current)
+        self.seen = current
+        return touched
+
+    def close(self):
+        pass
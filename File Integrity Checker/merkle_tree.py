@@ -0,0 +1,145 @@
+import hashlib
+import os
+
+
+# Node kinds stored with each child
+FILE = 'f'
+DIRECTORY = 'd'
+
+# The parent of the file system root and of relative paths. Its hash is
+# the root hash of the whole baseline.
+TOP = ''
+
+
+def split_path(path):
+    """
+    Split a node path into (parent directory, name)
+
+    "/etc/passwd" -> ("/etc", "passwd"), "/" -> ("", "/"),
+    "notes.txt" -> ("", "notes.txt")
+    """
+    parent, name = os.path.split(path)
+    if not name:  # the file system root
+        return TOP, path
+    return parent, name
+
+
+def join_path(parent, name):
+    """Inverse of split_path()"""
+    return name if parent == TOP else os.path.join(parent, name)
+
+
+def ancestors(path):
+    """Yield the directories above path, nearest first, ending with TOP"""
+    while path != TOP:
+        path, _ = split_path(path)
+        yield path
+
+
+def node_hash(children):
+    """
+    Hash a directory from its children
+
+    Args:
+        children: {name: (kind, hash)}
+
+    Returns:
+        Hex SHA-256 over the children sorted by name, so two directories
+        hash the same exactly when they hold the same names, kinds and
+        contents
+    """
+    sha256 = hashlib.sha256()
+    for name in sorted(children):
+        kind, child_hash = children[name]
+        sha256.update(f"{kind}{name}\0{child_hash}\0".encode('utf-8', 'surrogateescape'))
+    return sha256.hexdigest()
+
+
+class MerkleTree:
+    """
+    Merkle tree held in memory, e.g. of a fresh scan
+
+    Has the same children() and directory_hash() as BaselineStore, so
+    either can be compared with diff_trees().
+    """
+
+    def __init__(self, files):
+        """
+        Args:
+            files: Iterable of (path, hash)
+        """
+        self.nodes = {}  # directory -> {name: (kind, hash)}
+        directories = set()
+        for path, file_hash in files:
+            parent, name = split_path(path)
+            self.nodes.setdefault(parent, {})[name] = (FILE, file_hash)
+            for directory in ancestors(path):
+                if directory in directories:
+                    break
+                directories.add(directory)
+
+        # Children are longer than their parents, so longest first is bottom-up
+        for directory in sorted(directories, key=len, reverse=True):
+            if directory != TOP:
+                parent, name = split_path(directory)
+                self.nodes.setdefault(parent, {})[name] = (
+                    DIRECTORY, node_hash(self.nodes.get(directory, {})))
+
+    def children(self, directory):
+        """{name: (kind, hash)} of a directory (empty if unknown)"""
+        return self.nodes.get(directory, {})
+
+    def directory_hash(self, directory=TOP):
+        """Merkle hash of a directory, or None if it holds no monitored files"""
+        if directory == TOP:
+            return node_hash(self.nodes[TOP]) if self.nodes.get(TOP) else None
+        parent, name = split_path(directory)
+        kind, node = self.nodes.get(parent, {}).get(name, (None, None))
+        return node if kind == DIRECTORY else None
+
+
+def diff_trees(old, new, directory=TOP):
+    """
+    Compare two Merkle trees, descending only into directories whose
+    hashes differ
+
+    Args:
+        old, new: MerkleTree or BaselineStore
+        directory: Only compare this directory (TOP = everything)
+
+    Yields:
+        (path, "MODIFIED", "ADDED" or "DELETED") for each differing file
+    """
+    if old.directory_hash(directory) == new.directory_hash(directory):
+        return
+    yield from diff_directory(old, new, directory)
+
+
+def diff_directory(old, new, directory):
+    old_children = old.children(directory)
+    new_children = new.children(directory)
+    for name in sorted(old_children.keys() | new_children.keys()):
+        old_node = old_children.get(name)
+        new_node = new_children.get(name)
+        if old_node == new_node:
+            continue
+        path = join_path(directory, name)
+        if old_node and new_node and old_node[0] == new_node[0]:
+            if old_node[0] == DIRECTORY:
+                yield from diff_directory(old, new, path)
+            else:
+                yield path, "MODIFIED"
+            continue
+        if old_node:
+            yield from subtree_files(old, path, old_node[0], "DELETED")
+        if new_node:
+            yield from subtree_files(new, path, new_node[0], "ADDED")
+
+
+def subtree_files(tree, path, kind, status):
+    """Yield (path, status) for a file, or every file under a directory"""
+    if kind == FILE:
+        yield path, status
+        return
+    for name, (child_kind, _) in sorted(tree.children(path).items()):
+        yield from subtree_files(tree, join_path(path, name), child_kind, status)
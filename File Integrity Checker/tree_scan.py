@@ -0,0 +1,159 @@
+import fnmatch
+import os
+import stat
+
+from file_hashing import FileMetadata
+
+
+# skip: ignore symlinks; follow: monitor what they point to (loops are skipped)
+SYMLINK_POLICIES = ('skip', 'follow')
+
+
+class TreeScan:
+    """
+    Walk a directory tree with os.scandir and list its regular files
+
+    Each file is stat'ed once and the result is returned with its path,
+    so callers never stat it again. Devices, FIFOs and sockets are never
+    listed (reading a FIFO would block).
+    """
+
+    def __init__(self, root, include=None, exclude=None, symlinks="skip", one_filesystem=False):
+        """
+        Args:
+            root: Directory to walk
+            include: Globs a file's path (relative to root) or name must
+                     match to be listed (None = every file)
+            exclude: Globs for files and directories to leave out;
+                     excluded directories are not entered
+            symlinks: "skip" or "follow"
+            one_filesystem: Do not enter directories on other file
+                            systems (mount points)
+        """
+        if symlinks not in SYMLINK_POLICIES:
+            raise ValueError(f"Unknown symlink policy: {symlinks} "
+                             f"(use {' or '.join(SYMLINK_POLICIES)})")
+        self.root = os.path.abspath(root)
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ())
+        self.symlinks = symlinks
+        self.one_filesystem = one_filesystem
+        self.errors = []  # (path, error message) for unreadable entries
+
+    def matches(self, patterns, relative, name):
+        return any(fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern)
+                   for pattern in patterns)
+
+    def contains(self, path):
+        """Return True if path is inside the tree and none of its parts are excluded"""
+        prefix = self.root.rstrip(os.sep) + os.sep
+        if not path.startswith(prefix):
+            return False
+        if not self.exclude:
+            return True
+        parts = path[len(prefix):].split(os.sep)
+        return not any(self.matches(self.exclude, os.sep.join(parts[:depth]), parts[depth - 1])
+                       for depth in range(1, len(parts) + 1))
+
+    def selects(self, path):
+        """Return True if the walk would list path (e.g. a file created after it)"""
+        if not self.contains(path):
+            return False
+        relative = path[len(self.root.rstrip(os.sep)) + 1:]
+        if self.include and not self.matches(self.include, relative, os.path.basename(path)):
+            return False
+        try:
+            if self.symlinks == "skip" and os.path.islink(path):
+                return False
+            path_stat = os.stat(path)
+            root_stat = os.stat(self.root)
+        except OSError:
+            return False
+        return stat.S_ISREG(path_stat.st_mode) and not (
+            self.one_filesystem and path_stat.st_dev != root_stat.st_dev)
+
+    def files(self):
+        """
+        Yield every regular file in the tree, depth first in directory order
+
+        Yields:
+            (path, FileMetadata)
+        """
+        return self.walk()
+
+    def walk(self, top=None, files=True, directories=False):
+        """
+        Walk the tree, or the part of it under top
+
+        Globs still apply to paths relative to the tree root. Files are
+        only stat'ed when they are listed.
+
+        Args:
+            top: Directory inside the tree to start from (None = root)
+            files: List regular files
+            directories: List each directory entered, top included
+
+        Yields:
+            (path, FileMetadata) for files and (path, None) for directories
+        """
+        top = os.path.abspath(top or self.root)
+        try:
+            root_stat = os.stat(self.root)
+            top_stat = os.stat(top)
+        except OSError as e:
+            self.errors.append((top, e.strerror or str(e)))
+            return
+        visited = {(top_stat.st_dev, top_stat.st_ino)}
+        follow = self.symlinks == "follow"
+        prefix_length = len(self.root.rstrip(os.sep)) + 1
+        stack = [top]
+
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError as e:
+                self.errors.append((directory, e.strerror or str(e)))
+                continue
+            if directories:
+                yield directory, None
+
+            subdirectories = []
+            for entry in entries:
+                relative = entry.path[prefix_length:]
+                if self.exclude and self.matches(self.exclude, relative, entry.name):
+                    continue
+                try:
+                    if entry.is_symlink() and not follow:
+                        continue
+                    if entry.is_dir(follow_symlinks=follow):
+                        entry_stat = entry.stat(follow_symlinks=follow)
+                        if self.one_filesystem and entry_stat.st_dev != root_stat.st_dev:
+                            continue
+                        key = (entry_stat.st_dev, entry_stat.st_ino)
+                        if key not in visited:  # followed links can form loops
+                            visited.add(key)
+                            subdirectories.append(entry.path)
+                        continue
+                    if not files:
+                        continue
+                    entry_stat = entry.stat(follow_symlinks=follow)
+                except OSError as e:  # dangling link, vanished entry
+                    self.errors.append((entry.path, e.strerror or str(e)))
+                    continue
+
+                if stat.S_ISREG(entry_stat.st_mode):
+                    if self.include and not self.matches(self.include, relative, entry.name):
+                        continue
+                    yield entry.path, FileMetadata._make(
+                        (entry_stat.st_size, entry_stat.st_mtime_ns, entry_stat.st_ctime_ns,
+                         entry_stat.st_ino, entry_stat.st_dev))
+
+            # Reversed so directories are walked in the order they were listed
+            stack.extend(reversed(subdirectories))
+
+    def options(self):
+        """The scan settings, as stored with a monitored tree"""
+        return {'include': list(self.include), 'exclude': list(self.exclude),
+                'symlinks': self.symlinks, 'one_filesystem': self.one_filesystem}
@@ -0,0 +1,166 @@
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from log_analyzer import LogAnalyzer
+from syslog_parser import SyslogParser
+
+
+HOSTS = ["web01", "web02", "db01", "mail", "gateway", "server"]
+USERS = ["root", "admin", "deploy", "www-data", "postgres", "alice", "bob"]
+
+# Mostly clean traffic with a realistic sprinkling of threats
+CLEAN_TEMPLATES = [
+    "systemd[1]: Started Session {n} of user {user}.",
+    "CRON[{pid}]: (root) CMD (run-parts /etc/cron.hourly)",
+    "sshd[{pid}]: Accepted publickey for {user} from {ip} port {port} ssh2",
+    "sshd[{pid}]: pam_unix(sshd:session): session opened for user {user} by (uid=0)",
+    "kernel: [{n}.{pid}] eth0: link up, 1000Mbps, full-duplex",
+    "dhclient[{pid}]: DHCPACK of {ip} from 10.0.0.1",
+    "nginx[{pid}]: {ip} - - \"GET /index.html HTTP/1.1\" 200 {n}",
+    "postfix/smtpd[{pid}]: connect from unknown[{ip}]",
+]
+THREAT_TEMPLATES = [
+    "sshd[{pid}]: Failed password for invalid user {user} from {ip} port {port} ssh2",
+    "sshd[{pid}]: pam_unix(sshd:auth): authentication failure; rhost={ip} user={user}",
+    "sshd[{pid}]: Invalid user {user} from {ip} port {port}",
+    "sudo[{pid}]: {user} : command denied ; TTY=pts/0 ; USER=root",
+    "kernel: [{n}.{pid}] httpd[{pid}]: segmentation fault at 0 ip 00007f sp 00007ffd error 4",
+    "sshd[{pid}]: Connection closed by authenticating user {user} {ip} port {port} [preauth]",
+    "snort[{pid}]: portscan detected from {ip}",
+    "httpd[{pid}]: possible buffer overflow in request from {ip}",
+]
+
+
+def generate_corpus(filepath, line_count, threat_ratio=0.01, seed=1234):
+    """
+    Write a seeded synthetic syslog corpus
+
+    Args:
+        filepath: Output file path
+        line_count: Number of lines to generate
+        threat_ratio: Fraction of lines that contain a threat
+        seed: Random seed so runs are reproducible
+    """
+    rng = random.Random(seed)
+    with open(filepath, 'w') as f:
+        for i in range(line_count):
+            templates = THREAT_TEMPLATES if rng.random() < threat_ratio else CLEAN_TEMPLATES
+            message = rng.choice(templates).format(
+                n=rng.randint(1, 99999),
+                pid=rng.randint(100, 65535),
+                user=rng.choice(USERS),
+                ip=f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+                port=rng.randint(1024, 65535),
+            )
+            seconds = i // 50
+            f.write(f"Jan {1 + seconds // 86400:2d} {seconds // 3600 % 24:02d}:"
+                    f"{seconds // 60 % 60:02d}:{seconds % 60:02d} "
+                    f"{rng.choice(HOSTS)} {message}\n")
+
+
+class LegacyLogAnalyzer(LogAnalyzer):
+    """Analyzer using the original per-pattern re.search loop and parser"""
+
+    def parse_syslog_line(self, line):
+        match = re.match(r"^(\w+ +\d+ \d+:\d+:\d+) (\S+) (.+?)(\[.+?\])?: (.*)$", line)
+        if match:
+            timestamp, hostname, service, pid, message = match.groups()
+            return {'timestamp': timestamp, 'hostname': hostname, 'service': service,
+                    'pid': pid, 'message': message}
+        return {'timestamp': 'N/A', 'hostname': 'N/A', 'service': 'N/A',
+                'pid': 'N/A', 'message': line}
+
+    def analyze_line(self, line):
+        threats = []
+        for pattern, severity in self.threat_patterns.items():
+            if re.search(pattern, line, re.IGNORECASE):
+                match = re.search(pattern, line, re.IGNORECASE)
+                threats.append({
+                    'type': match.group(0),
+                    'severity': severity,
+                    'line': line
+                })
+                self.stats[severity] += 1
+        return threats
+
+
+def time_matcher(analyzer, filepath):
+    """
+    Time analyze_line over every line of a file
+
+    Returns:
+        (lines per second, threats found)
+    """
+    line_count = 0
+    threat_count = 0
+    start = time.perf_counter()
+    with open(filepath, 'r', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            line_count += 1
+            threat_count += len(analyzer.analyze_line(line))
+    elapsed = time.perf_counter() - start
+    return line_count / elapsed, threat_count
+
+
+def time_parser(parse, filepath, max_lines=1_000_000):
+    """
+    Time a parse function over the first lines of a file
+
+    Returns:
+        Lines per second
+    """
+    with open(filepath, 'r', errors='ignore') as f:
+        lines = [line.strip() for _, line in zip(range(max_lines), f)]
+    start = time.perf_counter()
+    for line in lines:
+        parse(line)
+    return len(lines) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LogAnalyzer threat matching")
+    parser.add_argument("--lines", type=int, default=10_000_000,
+                        help="lines in the generated corpus (default: 10M)")
+    parser.add_argument("--corpus", help="reuse or keep the corpus at this path")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    corpus = args.corpus or os.path.join(tempfile.gettempdir(), f"syslog_{args.lines}.log")
+    # Only a corpus generated by this run is removed afterwards
+    generated = not os.path.exists(corpus)
+    if generated:
+        print(f"Generating {args.lines} lines into {corpus}...")
+        generate_corpus(corpus, args.lines, seed=args.seed)
+
+    before, before_threats = time_matcher(LegacyLogAnalyzer(), corpus)
+    after, after_threats = time_matcher(LogAnalyzer(), corpus)
+    parse_before = time_parser(LegacyLogAnalyzer().parse_syslog_line, corpus)
+    parse_after = time_parser(SyslogParser().parse, corpus)
+
+    print(f"\n{'='*60}")
+    print("THREAT MATCHER BENCHMARK")
+    print(f"{'='*60}")
+    print(f"Corpus: {corpus} ({os.path.getsize(corpus) / 1e6:.1f} MB)")
+    print(f"Before: {before:12,.0f} lines/sec ({before_threats} threats)")
+    print(f"After:  {after:12,.0f} lines/sec ({after_threats} threats)")
+    print(f"Speedup: {after / before:.1f}x")
+    if before_threats != after_threats:
+        print("WARNING: threat counts differ between matchers")
+    print("\nSyslog parsing (every line, first 1M lines):")
+    print(f"Before: {parse_before:12,.0f} lines/sec")
+    print(f"After:  {parse_after:12,.0f} lines/sec")
+    print(f"{'='*60}\n")
+
+    if generated and not args.corpus:
+        os.remove(corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,24 @@
 import re
 import os
+import io
+import mmap
+import time
+import contextlib
 from datetime import datetime
 from collections import defaultdict
-import csv
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import itertools
+import locale
+
+from log_correlation import BruteForceDetector
+from log_profiler import AnalysisProfiler
+from log_sources import (CheckpointStore, LogFollower, detect_compression,
+                         discover_log_files, read_compressed_lines, rotation_set)
+from threat_exporters import CSVExporter, exporter_for
+from syslog_parser import SyslogParser
+from syslog_server import SyslogServer
+from threat_rules import RulePack, ServiceFilter, default_rules, rules_from_patterns
+from threat_store import MemoryThreatStore, SQLiteThreatStore, ThreatRecord
 
 
 class ThreatLevel:
@@ -12,41 +28,290 @@ class ThreatLevel:
     CRITICAL = "CRITICAL"
 
 
+# Threat patterns (regex: severity), used only when default_rules.json
+# (the built-in rule table) is missing
+FALLBACK_THREAT_PATTERNS = {
+    # Authentication threats
+    r"Failed password.*invalid user": ThreatLevel.CRITICAL,
+    r"authentication failure": ThreatLevel.WARNING,
+    r"Invalid user.*from": ThreatLevel.WARNING,
+    r"root.*denied.*password": ThreatLevel.CRITICAL,
+    r"sudo.*denied": ThreatLevel.WARNING,
+    
+    # Network threats
+    r"port scan": ThreatLevel.WARNING,
+    r"portscan": ThreatLevel.WARNING,
+    r"SSH.*closed.*too many": ThreatLevel.CRITICAL,
+    r"Connection closed by authenticating user": ThreatLevel.INFO,
+    
+    # System threats
+    r"segmentation fault": ThreatLevel.WARNING,
+    r"kernel.*error": ThreatLevel.WARNING,
+    r"permission denied": ThreatLevel.INFO,
+    r"file.*not found": ThreatLevel.INFO,
+    
+    # Malware/Exploit
+    r"shellcode": ThreatLevel.CRITICAL,
+    r"buffer overflow": ThreatLevel.CRITICAL,
+    r"exploit": ThreatLevel.CRITICAL,
+}
+
+
+class ThreatMatcher:
+    """
+    Compiled threat pattern table
+
+    Every pattern is compiled once. Most log lines match nothing, so each
+    pattern also gets a lowercase literal that must appear in any line it
+    can match (e.g. "password" for "root.*denied.*password"). A line is
+    lowercased once and only the patterns whose literal is present are
+    verified with their regex. Patterns without a usable literal are always
+    verified, so every matching pattern is still reported. Rules limited to
+    some services are skipped for lines from other services.
+    """
+
+    # Pieces between these wildcards are plain text in simple patterns
+    WILDCARD_PATTERN = re.compile(r"\.\*\??|\.\+\??| \+")
+    REGEX_METACHARS = set("\\.^$*+?{}[]|()")
+    parser = SyslogParser()
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: dict of {regex: severity}, or ThreatRules (see
+                      threat_rules) which may be limited to some services
+        """
+        rules = rules_from_patterns(patterns) if isinstance(patterns, dict) else tuple(patterns)
+        self.patterns = {rule.pattern: rule.severity for rule in rules}
+        self.compiled = []      # (pattern, regex, severity)
+        self.services = []      # ServiceFilter or None, per compiled pattern
+        self.literals = {}      # literal -> indexes into self.compiled
+        self.always_check = []  # indexes without a literal prefilter
+
+        for rule in rules:
+            index = len(self.compiled)
+            self.compiled.append((rule.pattern, re.compile(rule.pattern, re.IGNORECASE),
+                                  rule.severity))
+            self.services.append(ServiceFilter(rule.services) if rule.services else None)
+
+            literal = self.required_literal(rule.pattern)
+            if literal:
+                self.literals.setdefault(literal, []).append(index)
+            else:
+                self.always_check.append(index)
+
+        self.literal_items = list(self.literals.items())
+        self.filtered = any(self.services)
+    
+    @property
+    def literal_bytes(self):
+        """
+        Prefilter literals as bytes for scanning raw file contents
+        
+        Returns:
+            List of lowercase ASCII byte strings, or None if some pattern
+            has no literal (then every line has to be checked)
+        """
+        if self.always_check:
+            return None
+        return [literal.encode('ascii') for literal in self.literals]
+
+    @classmethod
+    def required_literal(cls, pattern):
+        """
+        Find a literal that every match of the pattern must contain
+
+        Returns:
+            Longest lowercase literal piece, or None if the pattern is not
+            simple enough to prefilter safely
+        """
+        pieces = cls.WILDCARD_PATTERN.split(pattern)
+        for piece in pieces:
+            if any(char in cls.REGEX_METACHARS for char in piece):
+                return None
+            if not piece.isascii():
+                return None
+
+        longest = max(pieces, key=len)
+        return longest.lower() if longest else None
+
+    def match(self, line):
+        """
+        Find every pattern that matches a line
+
+        Returns:
+            List of (matched_text, severity) tuples in pattern table order
+        """
+        # Lowercasing is only equivalent to re.IGNORECASE for ASCII text
+        if line.isascii():
+            lowered = line.lower()
+            candidates = [index for literal, indexes in self.literal_items
+                          if literal in lowered for index in indexes]
+            if not candidates and not self.always_check:
+                return []
+            candidates.extend(self.always_check)
+            candidates.sort()
+        else:
+            candidates = range(len(self.compiled))
+
+        matches = []
+        service = None
+        for index in candidates:
+            if self.filtered and self.services[index] is not None:
+                # Parsed only when a candidate rule is limited to some services
+                if service is None:
+                    service = self.parser.parse(line).service
+                if not self.services[index].allows(service):
+                    continue
+            pattern, regex, severity = self.compiled[index]
+            match = regex.search(line)
+            if match:
+                matches.append((match.group(0), severity))
+        return matches
+
+
+# Matchers already compiled in this process, by rule set
+MATCHER_CACHE = {}
+
+
+def compiled_matcher(rules):
+    """
+    Get the ThreatMatcher for a tuple of ThreatRules, compiling it once
+    
+    Matchers hold no per-analyzer state, so every analyzer (including the
+    ones created for each parallel chunk) shares one per rule set.
+    """
+    matcher = MATCHER_CACHE.get(rules)
+    if matcher is None:
+        if len(MATCHER_CACHE) >= 32:
+            MATCHER_CACHE.clear()  # rule sets replaced by hot reloads
+        matcher = MATCHER_CACHE[rules] = ThreatMatcher(rules)
+    return matcher
+
+
 class LogAnalyzer:
-    def __init__(self):
-        """Initialize analyzer with threat patterns"""
+    # Parallel analysis splits files into chunks of at least this many bytes
+    MIN_CHUNK_SIZE = 1024 * 1024
+    READ_BLOCK_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, threat_patterns=None, threat_store=None, rules=None, correlate=False):
+        """
+        Initialize analyzer with threat patterns
+        
+        Args:
+            threat_patterns: Optional dict of {regex: severity} replacing
+                             the built-in rules (default_rules.json)
+            threat_store: Where found threats are kept (default: in memory,
+                          use SQLiteThreatStore to keep memory flat)
+            rules: Optional RulePack, rule pack path or ThreatRules
+                   replacing the pattern table (see load_rules)
+            correlate: Detect brute-force bursts of failed logins; each
+                       burst is recorded as an extra CRITICAL threat
+        """
         
         self.current_logfile = "Unknown"
 
-        # Threat patterns (regex: severity)
-        self.threat_patterns = {
-            # Authentication threats
-            r"Failed password.*invalid user": ThreatLevel.CRITICAL,
-            r"authentication failure": ThreatLevel.WARNING,
-            r"Invalid user.*from": ThreatLevel.WARNING,
-            r"root.*denied.*password": ThreatLevel.CRITICAL,
-            r"sudo.*denied": ThreatLevel.WARNING,
-            
-            # Network threats
-            r"port scan": ThreatLevel.WARNING,
-            r"portscan": ThreatLevel.WARNING,
-            r"SSH.*closed.*too many": ThreatLevel.CRITICAL,
-            r"Connection closed by authenticating user": ThreatLevel.INFO,
-            
-            # System threats
-            r"segmentation fault": ThreatLevel.WARNING,
-            r"kernel.*error": ThreatLevel.WARNING,
-            r"permission denied": ThreatLevel.INFO,
-            r"file.*not found": ThreatLevel.INFO,
-            
-            # Malware/Exploit
-            r"shellcode": ThreatLevel.CRITICAL,
-            r"buffer overflow": ThreatLevel.CRITICAL,
-            r"exploit": ThreatLevel.CRITICAL,
-        }
+        self.rule_pack = None
+        self.profiler = None  # AnalysisProfiler while profiling (see enable_profiling)
+        if rules is not None:
+            if not self.load_rules(rules):
+                raise ValueError("Could not load threat rules")
+        elif threat_patterns is not None:
+            self.set_rules(rules_from_patterns(threat_patterns))
+        else:
+            self.set_rules(default_rules(rules_from_patterns(FALLBACK_THREAT_PATTERNS)))
+        self.parser = SyslogParser()
         
-        self.threats_found = []
+        self.threats_found = threat_store if threat_store is not None else MemoryThreatStore()
         self.stats = defaultdict(int)
+        self.threat_listeners = []
+        self.file_summaries = {}  # logfile -> lines, threats, severities, bytes, seconds
+        
+        # Brute-force burst detection (None = off)
+        self.correlator = BruteForceDetector() if correlate else None
+    
+    def set_rules(self, rules):
+        """Use a new set of ThreatRules (the matcher is compiled once per rule set)"""
+        self.rules = tuple(rules)
+        self.threat_patterns = {rule.pattern: rule.severity for rule in self.rules}
+        self.matcher = compiled_matcher(self.rules)
+        if self.profiler is not None:
+            # Timed regexes go in a private matcher, not the shared one
+            self.matcher = ThreatMatcher(self.rules)
+            self.profiler.instrument_matcher(self.matcher, self.rules)
+    
+    def enable_profiling(self):
+        """
+        Start collecting throughput, per-stage and per-rule timings
+        
+        Timed wrappers replace the parser, matcher and correlator methods
+        of this analyzer, so analysis without profiling is not slowed down.
+        
+        Returns:
+            The AnalysisProfiler (also available as self.profiler)
+        """
+        if self.profiler is not None:
+            return self.profiler
+        
+        self.profiler = AnalysisProfiler()
+        self.set_rules(self.rules)
+        self.parser.parse = self.profiler.timed(self.parser.parse, 'parse')
+        self.parser.normalize = self.profiler.timed(self.parser.normalize, 'normalize')
+        if self.correlator is not None:
+            for method in ('extract', 'event', 'record'):
+                setattr(self.correlator, method,
+                        self.profiler.timed(getattr(self.correlator, method), 'correlate'))
+        return self.profiler
+    
+    def load_rules(self, rules, tags=None):
+        """
+        Replace the threat patterns with rules from a rule pack
+        
+        Args:
+            rules: RulePack, path to a .json/.yaml rule pack, or ThreatRules
+            tags: Only use rules with one of these tags (rule pack paths only)
+        
+        Returns:
+            True if the rules were loaded
+        """
+        try:
+            if isinstance(rules, str):
+                rules = RulePack(rules, tags)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return False
+        
+        if isinstance(rules, RulePack):
+            self.rule_pack = rules
+            rules = rules.rules
+        self.set_rules(rules)
+        return True
+    
+    def reload_rules(self):
+        """
+        Reload the rule pack if its file changed (safe to call often)
+        
+        A pack that no longer loads is reported and the current rules are
+        kept.
+        
+        Returns:
+            True if new rules are in use
+        """
+        if self.rule_pack is None or not self.rule_pack.changed():
+            return False
+        
+        digest = self.rule_pack.digest
+        try:
+            self.rule_pack.load()
+        except ValueError as e:
+            print(f"Error: {e} (keeping the current rules)")
+            return False
+        if self.rule_pack.digest == digest:
+            return False
+        
+        self.set_rules(self.rule_pack.rules)
+        print(f"Reloaded {len(self.rules)} rules from {self.rule_pack.path}")
+        return True
     
     def parse_syslog_line(self, line):
         """
@@ -56,26 +321,14 @@ class LogAnalyzer:
             dict with timestamp, service, message
         """
         # Standard syslog format: MMM DD HH:MM:SS hostname service[pid]: message
-        syslog_pattern = r"^(\w+ +\d+ \d+:\d+:\d+) (\S+) (.+?)(\[.+?\])?: (.*)$"
-        
-        match = re.match(syslog_pattern, line)
-        if match:
-            timestamp, hostname, service, pid, message = match.groups()
-            return {
-                'timestamp': timestamp,
-                'hostname': hostname,
-                'service': service,
-                'pid': pid,
-                'message': message
-            }
-        
-        # Fallback for unstructured logs
+        # (RFC 5424 and ISO timestamps too; unstructured lines get 'N/A')
+        parsed = self.parser.parse(line)
         return {
-            'timestamp': 'N/A',
-            'hostname': 'N/A',
-            'service': 'N/A',
-            'pid': 'N/A',
-            'message': line
+            'timestamp': parsed.timestamp,
+            'hostname': parsed.hostname,
+            'service': parsed.service,
+            'pid': parsed.pid,
+            'message': line[parsed.message_start:]
         }
     
     def analyze_line(self, line):
@@ -90,34 +343,36 @@ class LogAnalyzer:
         """
         threats = []
         
-        # Check each threat pattern
-        for pattern, severity in self.threat_patterns.items():
-            if re.search(pattern, line, re.IGNORECASE):
-                # Extract the matching pattern
-                match = re.search(pattern, line, re.IGNORECASE)
-                threat_type = match.group(0) if match else pattern
-                
-                threats.append({
-                    'type': threat_type,
-                    'severity': severity,
-                    'line': line
-                })
-                
-                # Update statistics
-                self.stats[severity] += 1
+        # Single pass over the compiled pattern table
+        for threat_type, severity in self.matcher.match(line):
+            threats.append({
+                'type': threat_type,
+                'severity': severity,
+                'line': line
+            })
+            
+            # Update statistics
+            self.stats[severity] += 1
         
         return threats
     
-    def analyze_file(self, filepath, limit=None):
+    def analyze_file(self, filepath, limit=None, workers=1, checkpoints=None, use_mmap=False):
         """
         Analyze a log file
         
         Args:
             filepath: Path to log file
             limit: Maximum lines to analyze (None = all)
+            workers: Number of processes to analyze with (1 = in process,
+                     compressed files are always analyzed in process)
+            checkpoints: Optional CheckpointStore to resume from and update
+            use_mmap: Scan the memory-mapped file and decode only lines
+                      that may contain a threat (plain files only)
         """
         self.current_logfile = os.path.basename(filepath)
         print(f"Analyzing {filepath}...")
+        started = time.perf_counter()
+        stats_before = dict(self.stats)
         
         if not os.path.exists(filepath):
             print(f"File not found: {filepath}")
@@ -130,38 +385,483 @@ class LogAnalyzer:
                 print("Try running with sudo for /var/log files")
                 return False
             
-            line_count = 0
-            
-            with open(filepath, 'r', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    if limit and line_num > limit:
-                        break
-                    
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    line_count += 1
-                    
-                    # Analyze line
-                    threats = self.analyze_line(line)
-                    if threats:
-                        parsed = self.parse_syslog_line(line)
-                        for threat in threats:
-                            self.threats_found.append({
-                                **threat,
-                                **parsed,
-                                'line_number': line_num,
-                                'logfile': self.current_logfile
-                            })
+            compression = detect_compression(filepath)
+            if compression:
+                line_count = self.analyze_compressed_file(filepath, compression, limit, checkpoints)
+            elif checkpoints is not None:
+                line_count = self.analyze_file_resumable(
+                    filepath, checkpoints, limit, workers, use_mmap)
+            elif workers and workers > 1:
+                line_count, _ = self.analyze_file_parallel(
+                    filepath, limit, workers, use_mmap=use_mmap)
+            elif use_mmap:
+                end = offset_after_lines(filepath, limit) if limit else os.path.getsize(filepath)
+                line_count, _ = self.analyze_mapped(filepath, 0, end)
+            else:
+                with open(filepath, 'r', errors='ignore') as f:
+                    line_count, _ = self.analyze_lines(f, limit=limit)
             
             print(f"Analysis complete: {line_count} log lines analyzed")
+            self.record_file_summary(filepath, line_count, stats_before,
+                                     time.perf_counter() - started)
             return True
         
         except Exception as e:
             print(f"Error: {e}")
             return False
     
+    def analyze_lines(self, lines, first_line_num=1, limit=None):
+        """
+        Analyze an iterable of raw log lines
+        
+        Args:
+            lines: Iterable of log lines (e.g. an open file)
+            first_line_num: Line number of the first line
+            limit: Stop after this line number (None = all)
+        
+        Returns:
+            (non-empty lines analyzed, total lines read)
+        """
+        line_count = 0
+        total_lines = 0
+        if self.profiler is not None:
+            lines = self.profiler.timed_lines(lines)
+        
+        for line_num, line in enumerate(lines, first_line_num):
+            if limit and line_num > limit:
+                break
+            total_lines += 1
+            
+            line = line.strip()
+            if not line:
+                continue
+            
+            line_count += 1
+            
+            # journald JSON export lines are analyzed as syslog text
+            if line[0] == '{':
+                line = self.parser.normalize(line)
+            
+            # Analyze line; it is parsed at most once, and only if needed
+            parsed = None
+            threats = self.analyze_line(line)
+            if threats:
+                parsed = self.parser.parse(line)
+                for threat in threats:
+                    self.record_threat(self.make_threat(
+                        threat['type'], threat['severity'], line, line_num, parsed))
+            
+            if self.correlator is not None:
+                failure = self.correlator.extract(line)
+                if failure:
+                    if parsed is None:
+                        parsed = self.parser.parse(line)
+                    event = self.correlator.event(failure, parsed.timestamp)
+                    if event:
+                        self.handle_auth_event(event, line, line_num, parsed)
+        
+        return line_count, total_lines
+    
+    def make_threat(self, threat_type, severity, line, line_num, parsed):
+        """Build the stored record for a threat found on a parsed line"""
+        return ThreatRecord(self.current_logfile, line_num, parsed.timestamp, parsed.hostname,
+                            parsed.service, parsed.pid, severity, threat_type, line,
+                            parsed.message_start)
+    
+    def handle_auth_event(self, event, line, line_num, parsed=None):
+        """Feed a failed login to the correlator and record any burst"""
+        for kind, value, count in self.correlator.record(event):
+            if parsed is None:
+                parsed = self.parser.parse(line)
+            self.stats[ThreatLevel.CRITICAL] += 1
+            self.record_threat(self.make_threat(
+                self.correlator.describe(kind, value, count), ThreatLevel.CRITICAL,
+                line, line_num, parsed))
+    
+    def record_threat(self, threat):
+        """Store a threat and pass the stored record to every listener"""
+        record = self.threats_found.append(threat)
+        for listener in self.threat_listeners:
+            listener(record)
+    
+    def add_threat_listener(self, listener):
+        """
+        Register a callback for threats as they are found
+        
+        Args:
+            listener: Callable taking one threat dict
+        """
+        self.threat_listeners.append(listener)
+    
+    def add_exporter(self, exporter):
+        """
+        Stream every new threat to an exporter while analyzing
+        
+        Args:
+            exporter: ThreatExporter (close it when analysis is finished)
+        """
+        self.add_threat_listener(exporter.write)
+    
+    def remove_threat_listener(self, listener):
+        """Unregister a threat callback"""
+        if listener in self.threat_listeners:
+            self.threat_listeners.remove(listener)
+    
+    def analyze_rotation_set(self, pattern, limit=None, workers=1, checkpoints=None,
+                             use_mmap=False):
+        """
+        Analyze every file matching a glob (e.g. auth.log*) oldest first
+        
+        Returns:
+            True if every file was analyzed
+        """
+        paths = rotation_set(pattern)
+        if not paths:
+            print(f"No files match: {pattern}")
+            return False
+        
+        results = [self.analyze_file(path, limit, workers, checkpoints, use_mmap)
+                   for path in paths]
+        return all(results)
+    
+    def analyze_paths(self, paths, limit=None, workers=None, use_mmap=False,
+                      pattern="*", recursive=True):
+        """
+        Analyze many log files at once, one file per worker process
+        
+        Files are scheduled largest first (compressed files weighted by
+        COMPRESSED_SIZE_FACTOR) so the biggest file never starts last and
+        the run takes about as long as that file alone. Each worker
+        analyzes, parses and correlates its whole file; threats are merged
+        into this analyzer as each file finishes, labelled with the file's
+        path relative to the directory it was found in.
+        
+        Args:
+            paths: Log files, globs or directories (see discover_log_files)
+            limit: Maximum lines to analyze per file (None = all)
+            workers: Number of worker processes (None = one per CPU,
+                     1 = analyze in this process)
+            use_mmap: Use memory-mapped scanning for plain files
+            pattern: Glob that file names inside directories must match
+            recursive: Descend into subdirectories
+        
+        Returns:
+            True if every file was analyzed
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        found = discover_log_files(paths, pattern, recursive)
+        if not found:
+            print(f"No log files found in: {', '.join(paths)}")
+            return False
+        
+        found.sort(key=lambda item: scheduling_weight(item[0]), reverse=True)
+        workers = min(workers or os.cpu_count() or 1, len(found))
+        correlate = self.correlator is not None
+        profile = self.profiler is not None
+        jobs = [(path, self.rules, correlate, limit, use_mmap, profile) for path, _ in found]
+        labels = [label for _, label in found]
+        print(f"Analyzing {len(jobs)} log files with {workers} worker(s)...")
+        
+        succeeded = 0
+        started = time.perf_counter()
+        if workers == 1:
+            results = ((index, analyze_path(job)) for index, job in enumerate(jobs))
+            succeeded = sum(self.merge_path_result(labels[index], result, done, len(jobs))
+                            for done, (index, result) in enumerate(results, 1))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(analyze_path, job): index
+                           for index, job in enumerate(jobs)}
+                for done, future in enumerate(as_completed(futures), 1):
+                    succeeded += self.merge_path_result(
+                        labels[futures[future]], future.result(), done, len(jobs))
+        
+        line_count = sum(self.file_summaries[label]['lines'] for label in labels
+                         if label in self.file_summaries)
+        print(f"Analysis complete: {line_count} log lines in {succeeded}/{len(jobs)} files "
+              f"({time.perf_counter() - started:.1f}s)")
+        return succeeded == len(jobs)
+    
+    def analyze_directory(self, directory, pattern="*", recursive=True, limit=None,
+                          workers=None, use_mmap=False):
+        """
+        Analyze every log file under a directory (e.g. /var/log)
+        
+        Returns:
+            True if every file was analyzed
+        """
+        if not os.path.isdir(directory):
+            print(f"Directory not found: {directory}")
+            return False
+        return self.analyze_paths([directory], limit, workers, use_mmap, pattern, recursive)
+    
+    def merge_path_result(self, label, result, done, total):
+        """
+        Merge one file's worker result (see analyze_path) into this analyzer
+        
+        Returns:
+            True if the file was analyzed
+        """
+        analyzed, output, threats, stats, summary, failures, bursts, profile = result
+        if profile is not None:
+            self.profiler.merge(profile)
+        if not analyzed:
+            print(f"[{done}/{total}] {label}: failed")
+            print(output.strip())
+            return False
+        
+        for threat in threats:
+            threat.logfile = label
+            self.record_threat(threat)
+        for severity, count in stats.items():
+            self.stats[severity] += count
+        if self.correlator is not None:
+            self.correlator.failures.update(failures)
+            self.correlator.bursts.extend(bursts)
+        
+        self.add_file_summary(label, summary)
+        if self.profiler is not None:
+            self.profiler.add_file(summary['lines'], summary['bytes'], summary['seconds'])
+        print(f"[{done}/{total}] {label}: {summary['lines']} lines, "
+              f"{summary['threats']} threats ({summary['seconds']:.1f}s)")
+        return True
+    
+    def record_file_summary(self, filepath, line_count, stats_before, seconds, byte_count=None):
+        """
+        Store per-file totals for the file (or network source) just analyzed
+        
+        Args:
+            byte_count: Bytes read (default: the size of filepath)
+        """
+        severities = {severity: count - stats_before.get(severity, 0)
+                      for severity, count in self.stats.items()
+                      if count != stats_before.get(severity, 0)}
+        if byte_count is None:
+            byte_count = os.path.getsize(filepath)
+        self.add_file_summary(self.current_logfile, {
+            'lines': line_count,
+            'threats': sum(severities.values()),
+            'severities': severities,
+            'bytes': byte_count,
+            'seconds': seconds,
+        })
+        if self.profiler is not None:
+            self.profiler.add_file(line_count, byte_count, seconds)
+    
+    def add_file_summary(self, label, summary):
+        """
+        Store per-file totals under a label
+        
+        If the label already has totals (e.g. the file was analyzed again,
+        resuming from a checkpoint), the new totals are added to them
+        rather than replacing them.
+        """
+        existing = self.file_summaries.get(label)
+        if existing is None:
+            self.file_summaries[label] = summary
+            return
+        for field in ('lines', 'threats', 'bytes', 'seconds'):
+            existing[field] += summary[field]
+        for severity, count in summary['severities'].items():
+            existing['severities'][severity] = existing['severities'].get(severity, 0) + count
+    
+    def analyze_compressed_file(self, filepath, compression, limit=None, checkpoints=None):
+        """
+        Analyze a gzip, bz2 or xz compressed log file
+        
+        Compressed files cannot be resumed mid-stream, so a checkpoint
+        either marks the whole file as done or records how many lines to
+        skip after decompressing.
+        
+        Returns:
+            Number of non-empty lines analyzed
+        """
+        skip = 0
+        if checkpoints is not None:
+            start, skip = checkpoints.resume_point(filepath)
+            if start and start == os.path.getsize(filepath):
+                print("Already analyzed")
+                return 0
+            if skip:
+                print(f"Resuming at line {skip + 1}")
+        
+        lines = read_compressed_lines(filepath, compression)
+        if skip:
+            lines = itertools.islice(lines, skip, None)
+        line_count, total_lines = self.analyze_lines(
+            lines, skip + 1, limit=skip + limit if limit else None)
+        
+        if checkpoints is not None:
+            finished = not limit or total_lines < limit
+            offset = os.path.getsize(filepath) if finished else 0
+            checkpoints.update(filepath, offset, skip + total_lines)
+            checkpoints.save()
+        return line_count
+    
+    def analyze_file_resumable(self, filepath, checkpoints, limit=None, workers=1,
+                               use_mmap=False):
+        """
+        Analyze only the part of a log file not covered by its checkpoint
+        
+        Only complete lines are analyzed, so a line that is still being
+        written is picked up whole on the next run.
+        
+        Args:
+            filepath: Path to log file
+            checkpoints: CheckpointStore to resume from and update
+            limit: Maximum lines to analyze in this run (None = all)
+            workers: Number of processes to analyze with
+            use_mmap: Use memory-mapped scanning (see analyze_mapped)
+        
+        Returns:
+            Number of non-empty lines analyzed
+        """
+        start, line_base = checkpoints.resume_point(filepath)
+        if start:
+            print(f"Resuming at line {line_base + 1} (byte {start})")
+        
+        end = complete_lines_end(filepath, start)
+        if limit:
+            end = min(end, offset_after_lines(filepath, limit, start))
+        
+        if workers and workers > 1:
+            line_count, total_lines = self.analyze_file_parallel(
+                filepath, workers=workers, start=start, end=end,
+                first_line_num=line_base + 1, use_mmap=use_mmap)
+        elif use_mmap:
+            line_count, total_lines = self.analyze_mapped(filepath, start, end, line_base + 1)
+        else:
+            line_count, total_lines = self.analyze_lines(
+                read_byte_range(filepath, start, end), line_base + 1)
+        
+        checkpoints.update(filepath, end, line_base + total_lines)
+        checkpoints.save()
+        return line_count
+    
+    def analyze_mapped(self, filepath, start=0, end=None, first_line_num=1):
+        """
+        Analyze a byte range by scanning the memory-mapped file
+        
+        Large windows of the file are lowercased and searched for the
+        matcher's prefilter literals (and the correlator's). Only lines
+        containing one, plus lines with non-ASCII bytes and journald JSON
+        lines, are decoded and analyzed; line numbers are recovered by
+        counting newlines between candidates. Results are the same as
+        analyze_lines, but empty lines are counted as scanned lines.
+        
+        Args:
+            filepath: Path to a plain (uncompressed) log file
+            start: Offset of the first line
+            end: Offset to stop at (None = end of file)
+            first_line_num: Line number of the line at `start`
+        
+        Returns:
+            (lines scanned, total lines read)
+        """
+        if end is None:
+            end = os.path.getsize(filepath)
+        literals = self.matcher.literal_bytes
+        if literals is None:
+            # Some pattern can match anywhere: every line must be decoded
+            return self.analyze_lines(read_byte_range(filepath, start, end), first_line_num)
+        if self.correlator is not None:
+            literals += [literal.lower().encode('ascii') for literal in self.correlator.PREFILTER]
+        if end <= start:
+            return 0, 0
+        
+        encoding = locale.getpreferredencoding(False)
+        line_base = first_line_num - 1
+        with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            position = start
+            while position < end:
+                window_end = min(end, position + self.READ_BLOCK_SIZE)
+                if window_end < end:
+                    # Windows end at a line boundary
+                    newline = mapped.rfind(b'\n', position, window_end)
+                    if newline == -1:
+                        newline = mapped.find(b'\n', window_end, end)
+                    window_end = end if newline == -1 else newline + 1
+                window = mapped[position:window_end]
+                
+                counted = 0
+                line_num = line_base
+                for line_start in candidate_line_starts(window, literals):
+                    line_num += window.count(b'\n', counted, line_start)
+                    counted = line_start
+                    line_end = window.find(b'\n', line_start)
+                    line = window[line_start:line_end if line_end != -1 else len(window)]
+                    self.analyze_lines((line.decode(encoding, errors='ignore'),), line_num + 1)
+                
+                line_base += window.count(b'\n') + (not window.endswith(b'\n'))
+                position = window_end
+        
+        total_lines = line_base - (first_line_num - 1)
+        return total_lines, total_lines
+    
+    def analyze_file_parallel(self, filepath, limit=None, workers=None,
+                              start=0, end=None, first_line_num=1, use_mmap=False):
+        """
+        Analyze a log file with a process pool
+        
+        The file is split into byte ranges that start at line boundaries.
+        Each range is analyzed in a worker and the results are merged back
+        in file order, so line numbers match a sequential run. Lines are
+        split on newline bytes only (a lone carriage return does not end a line).
+        
+        Args:
+            filepath: Path to log file
+            limit: Maximum lines to analyze (None = all)
+            workers: Number of worker processes (None = one per CPU)
+            start: Byte offset of the first line to analyze
+            end: Byte offset to stop at (None = end of file)
+            first_line_num: Line number of the line at `start`
+            use_mmap: Workers use memory-mapped scanning (see analyze_mapped)
+        
+        Returns:
+            (non-empty lines analyzed, total lines read)
+        """
+        workers = workers or os.cpu_count() or 1
+        if end is None:
+            end = os.path.getsize(filepath)
+        if limit:
+            end = min(end, offset_after_lines(filepath, limit, start))
+        
+        chunk_count = min(workers * 4, max(1, (end - start) // self.MIN_CHUNK_SIZE))
+        ranges = split_byte_ranges(filepath, chunk_count, start, end)
+        correlate = self.correlator is not None
+        profile = self.profiler is not None
+        jobs = [(filepath, start, stop, self.current_logfile, self.rules, correlate,
+                 use_mmap, profile) for start, stop in ranges]
+        
+        line_count = 0
+        line_base = first_line_num - 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields results in submission order, i.e. file order
+            for threats, events, stats, chunk_lines, chunk_total, chunk_profile in executor.map(
+                    analyze_chunk, jobs):
+                if chunk_profile is not None:
+                    self.profiler.merge(chunk_profile)
+                # Failed logins are correlated here, in file order, so
+                # bursts that span chunk boundaries are still found
+                pending = iter(events)
+                event = next(pending, None)
+                for threat in threats:
+                    while event and event[2] < threat.line_number:
+                        self.handle_auth_event(event[0], event[1], event[2] + line_base)
+                        event = next(pending, None)
+                    threat.line_number += line_base
+                    self.record_threat(threat)
+                while event:
+                    self.handle_auth_event(event[0], event[1], event[2] + line_base)
+                    event = next(pending, None)
+                for severity, count in stats.items():
+                    self.stats[severity] += count
+                line_count += chunk_lines
+                line_base += chunk_total
+        
+        return line_count, line_base - (first_line_num - 1)
+    
     def print_summary(self):
         """Print analysis summary"""
         print(f"\n{'='*60}")
@@ -175,36 +875,107 @@ class LogAnalyzer:
             
             # Statistics by severity
             print("Threats by Severity:")
+            counts = self.threats_found.count_by_severity()
             for severity in [ThreatLevel.CRITICAL, ThreatLevel.WARNING, ThreatLevel.INFO]:
-                count = self.stats[severity]
+                count = counts.get(severity, 0)
                 if count > 0:
                     print(f"  {severity}: {count}")
         
+        if self.correlator is not None and self.correlator.failures:
+            print("\nTop Failed Login Sources:")
+            for ip, count in self.correlator.top_sources('ip'):
+                print(f"  {ip}: {count}")
+            print(f"Brute-force bursts detected: {len(self.correlator.bursts)}")
+        
         print(f"\n{'='*60}\n")
     
+    def print_file_summaries(self):
+        """Print lines, threats and time for each analyzed file, then totals"""
+        if not self.file_summaries:
+            print("No files analyzed yet")
+            return
+        
+        print(f"\n{'='*60}")
+        print("PER-FILE SUMMARY")
+        print(f"{'='*60}")
+        print(f"{'File':<28} {'Lines':>10} {'Threats':>8} {'Critical':>8} {'Time':>6}")
+        
+        totals = defaultdict(float)
+        for logfile, summary in sorted(self.file_summaries.items()):
+            critical = summary['severities'].get(ThreatLevel.CRITICAL, 0)
+            print(f"{logfile[-28:]:<28} {summary['lines']:>10} {summary['threats']:>8} "
+                  f"{critical:>8} {summary['seconds']:>5.1f}s")
+            for key in ('lines', 'threats', 'bytes', 'seconds'):
+                totals[key] += summary[key]
+            totals['critical'] += critical
+        
+        print(f"{'-'*60}")
+        print(f"{f'Total ({len(self.file_summaries)} files)':<28} {int(totals['lines']):>10} "
+              f"{int(totals['threats']):>8} {int(totals['critical']):>8} "
+              f"{totals['seconds']:>5.1f}s")
+        print(f"Data analyzed: {totals['bytes'] / 1e6:.1f} MB")
+        print(f"{'='*60}\n")
+    
     def print_detailed_threats(self, show_critical_only=False):
         """Print detailed threat list"""
         if not self.threats_found:
             print("No threats to display")
             return
         
-        # Filter if needed
-        threats = self.threats_found
-        if show_critical_only:
-            threats = [t for t in threats if t['severity'] == ThreatLevel.CRITICAL]
+        # Filter if needed (the store streams matching threats lazily)
+        severity = ThreatLevel.CRITICAL if show_critical_only else None
+        threats = self.threats_found.query(severity=severity)
         
         print(f"\n{'='*60}")
         print(f"DETAILED THREATS - {self.current_logfile} ")
         print(f"{'='*60}\n")
         
         for i, threat in enumerate(threats, 1):
-            print(f"{i}. {threat['severity']} - From: {threat.get('logfile', 'Unknown')}")
-            print(f"   Type: {threat['type']}")
-            print(f"   Time: {threat['timestamp']}")
-            print(f"   Host: {threat['hostname']}")
-            print(f"   Service: {threat['service']}")
-            print(f"   Line {threat['line_number']}: {threat['message'][:80]}")
-            print()
+            self.print_threat(i, threat)
+    
+    def print_threat(self, number, threat):
+        """Print one numbered threat"""
+        print(f"{number}. {threat['severity']} - From: {threat.get('logfile', 'Unknown')}")
+        print(f"   Type: {threat['type']}")
+        print(f"   Time: {threat['timestamp']}")
+        print(f"   Host: {threat['hostname']}")
+        print(f"   Service: {threat['service']}")
+        print(f"   Line {threat['line_number']}: {threat['message'][:80]}")
+        print()
+    
+    def print_threat_page(self, page=1, page_size=20, **filters):
+        """
+        Print one page of the threats matching some filters
+        
+        Args:
+            page: Page number, starting at 1
+            page_size: Threats per page
+            filters: Any of severity, service, hostname, source_ip, since
+                     and until (epoch seconds), see MemoryThreatStore.query
+        
+        Returns:
+            Number of pages (0 if nothing matches)
+        """
+        total = self.threats_found.count(**filters)
+        if not total:
+            print("No matching threats")
+            return 0
+        
+        pages = (total + page_size - 1) // page_size
+        page = min(max(page, 1), pages)
+        offset = (page - 1) * page_size
+        
+        described = ', '.join(f"{name}={value}" for name, value in filters.items()
+                              if value is not None and name not in ('since', 'until'))
+        print(f"\n{'='*60}")
+        print(f"THREATS {offset + 1}-{min(offset + page_size, total)} OF {total} "
+              f"(page {page}/{pages}){' - ' + described if described else ''}")
+        print(f"{'='*60}\n")
+        
+        threats = self.threats_found.query(offset=offset, limit=page_size, **filters)
+        for i, threat in enumerate(threats, offset + 1):
+            self.print_threat(i, threat)
+        return pages
     
     def export_threats_csv(self, filename="threats.csv"):
         """Export threats to CSV file"""
@@ -214,28 +985,257 @@ class LogAnalyzer:
             return
         
         try:
-            with open(filename, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=[
-                    'logfile', 'line_number', 'timestamp', 'hostname', 'service',
-                    'severity', 'type', 'message'
-                ])
-                writer.writeheader()
-                
-                for threat in self.threats_found:
-                    writer.writerow({
-                        'logfile': threat.get('logfile', 'Unknown'),
-                        'line_number': threat['line_number'],
-                        'timestamp': threat['timestamp'],
-                        'hostname': threat['hostname'],
-                        'service': threat['service'],
-                        'severity': threat['severity'],
-                        'type': threat['type'],
-                        'message': threat['line']
-                    })
+            with CSVExporter(filename) as exporter:
+                exporter.write_all(self.threats_found)
             
             print(f"Threats exported to {filename}")
         except Exception as e:
             print(f"Export failed: {e}")
+    
+    def export_threats(self, filename):
+        """
+        Export threats in the format given by the file extension
+        
+        Supports .csv, .jsonl (JSON Lines) and .thrc (columnar binary),
+        each optionally followed by .gz for gzip compression.
+        """
+        if not self.threats_found:
+            print("No threats to export")
+            return
+        
+        try:
+            exporter = exporter_for(filename)
+            if exporter is None:
+                print(f"Unsupported export format: {filename}")
+                print("Use .csv, .jsonl or .thrc (optionally with .gz)")
+                return
+            
+            with exporter:
+                exporter.write_all(self.threats_found)
+            
+            print(f"{exporter.count} threats exported to {filename}")
+        except Exception as e:
+            print(f"Export failed: {e}")
+
+
+def split_byte_ranges(filepath, parts, start, end):
+    """
+    Split a byte range of a file into pieces aligned to line starts
+    
+    Returns:
+        List of (start, end) byte offsets covering [start, end)
+    """
+    boundaries = [start]
+    size = end - start
+    with open(filepath, 'rb') as f:
+        for i in range(1, parts):
+            target = start + size * i // parts
+            if target <= boundaries[-1]:
+                continue
+            # Move to the first line starting at or after target
+            f.seek(target - 1)
+            f.readline()
+            boundary = f.tell()
+            if boundaries[-1] < boundary < end:
+                boundaries.append(boundary)
+    boundaries.append(end)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def offset_after_lines(filepath, line_limit, start=0, block_size=LogAnalyzer.READ_BLOCK_SIZE):
+    """
+    Find the byte offset just past the given number of lines
+    
+    Args:
+        filepath: Path to file
+        line_limit: Number of lines to skip over
+        start: Offset of the first line to count
+    
+    Returns:
+        Offset of the end of line `line_limit` (or the file size)
+    """
+    remaining = line_limit
+    offset = start
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return offset
+            newlines = block.count(b'\n')
+            if newlines >= remaining:
+                position = -1
+                for _ in range(remaining):
+                    position = block.index(b'\n', position + 1)
+                return offset + position + 1
+            remaining -= newlines
+            offset += len(block)
+
+
+def complete_lines_end(filepath, start=0, block_size=64 * 1024):
+    """
+    Find the offset just past the last newline at or after start
+    
+    Returns:
+        Offset where the last complete line ends (start if there is none)
+    """
+    with open(filepath, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        while position > start:
+            block_start = max(start, position - block_size)
+            f.seek(block_start)
+            block = f.read(position - block_start)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                return block_start + newline + 1
+            position = block_start
+    return start
+
+
+def candidate_line_starts(window, literals):
+    """
+    Find the lines of a buffer that need to be analyzed
+    
+    Args:
+        window: bytes made of whole lines
+        literals: Lowercase byte strings, at least one of which appears in
+                  any line that can match
+    
+    Returns:
+        Sorted offsets of the starts of candidate lines
+    """
+    lowered = window.lower()
+    starts = set()
+    for literal in literals:
+        position = lowered.find(literal)
+        while position != -1:
+            starts.add(lowered.rfind(b'\n', 0, position) + 1)
+            line_end = lowered.find(b'\n', position)
+            if line_end == -1:
+                break
+            position = lowered.find(literal, line_end)
+    
+    # Non-ASCII lines are checked with every pattern, like analyze_line does
+    if not window.isascii():
+        for match in NON_ASCII_PATTERN.finditer(window):
+            starts.add(window.rfind(b'\n', 0, match.start()) + 1)
+    
+    # journald JSON lines are converted before matching
+    if window.startswith(b'{'):
+        starts.add(0)
+    position = window.find(b'\n{')
+    while position != -1:
+        starts.add(position + 1)
+        position = window.find(b'\n{', position + 1)
+    
+    return sorted(starts)
+
+
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]+")
+
+
+def read_byte_range(filepath, start, end, block_size=LogAnalyzer.READ_BLOCK_SIZE):
+    """
+    Yield decoded lines from a byte range of a file
+    
+    Args:
+        filepath: Path to file
+        start: Offset of the first line
+        end: Offset just past the last line
+    """
+    encoding = locale.getpreferredencoding(False)
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        pending = b''
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            lines = (pending + block).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line.decode(encoding, errors='ignore')
+        if pending:
+            yield pending.decode(encoding, errors='ignore')
+
+
+class ChunkAnalyzer(LogAnalyzer):
+    """Worker-side analyzer that collects failed logins instead of correlating them"""
+    
+    def __init__(self, rules, correlate):
+        super().__init__(rules=rules, correlate=correlate)
+        self.auth_events = []
+    
+    def handle_auth_event(self, event, line, line_num, parsed=None):
+        self.auth_events.append((event, line, line_num))
+
+
+def analyze_chunk(job):
+    """
+    Worker entry point for parallel analysis
+    
+    Args:
+        job: (filepath, start, end, logfile, rules, correlate, use_mmap, profile)
+    
+    Returns:
+        (threats and failed-login events with chunk-relative line numbers,
+         stats, non-empty lines analyzed, total lines read,
+         profiler snapshot or None)
+    """
+    filepath, start, end, logfile, rules, correlate, use_mmap, profile = job
+    analyzer = ChunkAnalyzer(rules, correlate)
+    analyzer.current_logfile = logfile
+    if profile:
+        analyzer.enable_profiling()
+    if use_mmap:
+        line_count, total_lines = analyzer.analyze_mapped(filepath, start, end)
+    else:
+        line_count, total_lines = analyzer.analyze_lines(read_byte_range(filepath, start, end))
+    return (list(analyzer.threats_found), analyzer.auth_events, dict(analyzer.stats),
+            line_count, total_lines, analyzer.profiler.snapshot() if profile else None)
+
+
+# Compressed logs expand to roughly this many times their size on disk
+COMPRESSED_SIZE_FACTOR = 10
+
+
+def scheduling_weight(filepath):
+    """Estimate how much work a file is, for largest-first scheduling"""
+    try:
+        size = os.path.getsize(filepath)
+        return size * COMPRESSED_SIZE_FACTOR if detect_compression(filepath) else size
+    except OSError:
+        return 0
+
+
+def analyze_path(job):
+    """
+    Worker entry point for multi-file analysis
+    
+    Args:
+        job: (filepath, rules, correlate, limit, use_mmap, profile)
+    
+    Returns:
+        (success, captured output, threats, stats, file summary,
+         failed-login counts, brute-force bursts, profiler snapshot or None)
+    """
+    filepath, rules, correlate, limit, use_mmap, profile = job
+    analyzer = LogAnalyzer(rules=rules, correlate=correlate)
+    if profile:
+        analyzer.enable_profiling()
+    
+    # Progress is reported by the parent, once per file
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        analyzed = analyzer.analyze_file(filepath, limit, use_mmap=use_mmap)
+    
+    failures = analyzer.correlator.failures if correlate else None
+    bursts = analyzer.correlator.bursts if correlate else None
+    return (analyzed, output.getvalue(), list(analyzer.threats_found), dict(analyzer.stats),
+            analyzer.file_summaries.get(analyzer.current_logfile), failures, bursts,
+            analyzer.profiler.snapshot() if profile else None)
 
 
 def display_menu():
@@ -247,15 +1247,20 @@ def display_menu():
     print("2. View threat summary")
     print("3. View detailed threats")
     print("4. View critical threats only")
-    print("5. Export threats to CSV")
-    print("6. Exit")
+    print("5. Export threats (CSV, JSON Lines or columnar)")
+    print("6. Follow a log file (live)")
+    print("7. View per-file summary")
+    print("8. View performance report")
+    print("9. Search threats (severity, service, host, source IP, time)")
+    print("10. Receive syslog over the network (live)")
+    print("11. Exit")
     print(f"{'='*60}")
-    return input("Select option (1-6): ")
+    return input("Select option (1-11): ")
 
 
 def analyze_file_interactive(analyzer):
     """Interactive file analysis"""
-    filepath = input("Enter log file path: ").strip()
+    filepath = input("Enter log file path or directory: ").strip()
     
     if not filepath:
         print("No file path entered")
@@ -264,7 +1269,135 @@ def analyze_file_interactive(analyzer):
     limit_input = input("Max lines to analyze (press Enter for all): ").strip()
     limit = int(limit_input) if limit_input else None
     
-    analyzer.analyze_file(filepath, limit)
+    workers_input = input(f"Worker processes (press Enter for 1, max {os.cpu_count()}): ").strip()
+    workers = int(workers_input) if workers_input else 1
+    
+    use_mmap = input("Fast scan (memory-mapped, plain files)? (y/N): ").strip().lower() == 'y'
+    resume = input("Resume from last checkpoint? (y/N): ").strip().lower() == 'y'
+    checkpoints = CheckpointStore() if resume else None
+    
+    stream_to = input("Stream new threats to a file while analyzing "
+                      "(.csv/.jsonl/.thrc, press Enter to skip): ").strip()
+    exporter = exporter_for(stream_to) if stream_to else None
+    if stream_to and exporter is None:
+        print(f"Unsupported export format: {stream_to}")
+        return
+    if exporter:
+        analyzer.add_exporter(exporter)
+    
+    try:
+        # A directory analyzes every log file in it, one file per worker
+        if os.path.isdir(filepath):
+            analyzer.analyze_directory(filepath, limit=limit, workers=workers, use_mmap=use_mmap)
+        # A glob such as /var/log/auth.log* analyzes the whole rotation set
+        elif any(char in filepath for char in "*?["):
+            analyzer.analyze_rotation_set(filepath, limit, workers, checkpoints, use_mmap)
+        else:
+            analyzer.analyze_file(filepath, limit, workers, checkpoints, use_mmap)
+    finally:
+        if exporter:
+            analyzer.remove_threat_listener(exporter.write)
+            exporter.close()
+            print(f"{exporter.count} threats streamed to {stream_to}")
+
+
+def browse_threats(analyzer, page_size=20, **filters):
+    """Page through matching threats until the user quits"""
+    if not analyzer.threats_found:
+        print("No threats to display")
+        return
+    
+    page = 1
+    while True:
+        pages = analyzer.print_threat_page(page, page_size, **filters)
+        if pages <= 1:
+            return
+        answer = input(f"Page {page}/{pages} - Enter for next, page number, or q to quit: ").strip()
+        if answer.lower() == 'q' or (not answer and page >= pages):
+            return
+        page = int(answer) if answer.isdigit() else page + 1
+
+
+def search_threats_interactive(analyzer):
+    """Interactive filtered threat search"""
+    if not analyzer.threats_found:
+        print("No threats to search")
+        return
+    
+    print("Press Enter to skip any filter")
+    severity = input("Severity (CRITICAL, WARNING, INFO): ").strip().upper() or None
+    service = input("Service (e.g. sshd): ").strip() or None
+    hostname = input("Host: ").strip() or None
+    source_ip = input("Source IP: ").strip() or None
+    
+    since = None
+    minutes = input("Only the last N minutes of log time: ").strip()
+    if minutes.isdigit():
+        # Relative to the newest threat, so old logs can be searched too
+        latest = analyzer.threats_found.latest_epoch()
+        if latest is not None:
+            since = latest - int(minutes) * 60
+    
+    browse_threats(analyzer, severity=severity, service=service, hostname=hostname,
+                   source_ip=source_ip, since=since)
+
+
+def follow_file_interactive(analyzer):
+    """Interactive live log following"""
+    filepath = input("Enter log file path to follow: ").strip()
+    
+    if not filepath:
+        print("No file path entered")
+        return
+    
+    from_start = input("Analyze existing lines first? (y/N): ").strip().lower() == 'y'
+    follower = LogFollower(analyzer, filepath, from_start=from_start)
+    print(f"Following {filepath} (press Ctrl+C to stop)...")
+    
+    try:
+        for threat in follower.follow():
+            print(f"{threat['severity']} - {threat['logfile']} line {threat['line_number']}: "
+                  f"{threat['type']}")
+    except KeyboardInterrupt:
+        print("\nStopped following")
+    finally:
+        follower.close()
+
+
+def syslog_server_interactive(analyzer):
+    """Interactive syslog listener"""
+    port_input = input("Port for UDP and TCP syslog (press Enter for 5140, 514 needs root): ").strip()
+    port = int(port_input) if port_input else 5140
+    host = input("Listen address (press Enter for all interfaces): ").strip() or "0.0.0.0"
+    
+    def show(threat):
+        print(f"{threat['severity']} - {threat['hostname']} {threat['service']}: {threat['type']}")
+    
+    server = SyslogServer(analyzer, host, port)
+    analyzer.add_threat_listener(show)
+    print("Receiving syslog (press Ctrl+C to stop)...")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        print("\nStopped receiving")
+    finally:
+        analyzer.remove_threat_listener(show)
+
+
+def performance_report_interactive(analyzer):
+    """Show the performance report and optionally save it"""
+    if analyzer.profiler is None:
+        print("Performance statistics are off (turn them on when starting the program)")
+        return
+    
+    analyzer.profiler.print_report()
+    filename = input("Save report as (.json or .prom for Prometheus, press Enter to skip): ").strip()
+    if filename:
+        try:
+            analyzer.profiler.save(filename)
+            print(f"Performance report saved to {filename}")
+        except OSError as e:
+            print(f"Could not save report: {e}")
 
 
 def main():
@@ -274,7 +1407,18 @@ def main():
     print("Threat Detection in System Logs")
     print(f"{'='*60}\n")
     
-    analyzer = LogAnalyzer()
+    use_disk = input("Keep threats on disk in threats.db for large logs? (y/N): ").strip().lower() == 'y'
+    correlate = input("Detect brute-force bursts (adds CRITICAL threats for them)? "
+                      "(y/N): ").strip().lower() == 'y'
+    analyzer = LogAnalyzer(threat_store=SQLiteThreatStore() if use_disk else None,
+                           correlate=correlate)
+    
+    rules_file = input("Threat rule pack (.json/.yaml, press Enter for built-in rules): ").strip()
+    if rules_file and analyzer.load_rules(rules_file):
+        print(f"Loaded {len(analyzer.rules)} rules from {rules_file}")
+    
+    if input("Collect performance statistics (slightly slower)? (y/N): ").strip().lower() == 'y':
+        analyzer.enable_profiling()
     
     while True:
         choice = display_menu()
@@ -284,14 +1428,25 @@ def main():
         elif choice == "2":
             analyzer.print_summary()
         elif choice == "3":
-            analyzer.print_detailed_threats(show_critical_only=False)
+            browse_threats(analyzer)
         elif choice == "4":
-            analyzer.print_detailed_threats(show_critical_only=True)
+            browse_threats(analyzer, severity=ThreatLevel.CRITICAL)
         elif choice == "5":
-            filename = input("Enter CSV filename (default: threats.csv): ").strip()
+            filename = input("Enter filename: .csv, .jsonl or .thrc, add .gz to compress "
+                             "(default: threats.csv): ").strip()
             filename = filename if filename else "threats.csv"
-            analyzer.export_threats_csv(filename)
+            analyzer.export_threats(filename)
         elif choice == "6":
+            follow_file_interactive(analyzer)
+        elif choice == "7":
+            analyzer.print_file_summaries()
+        elif choice == "8":
+            performance_report_interactive(analyzer)
+        elif choice == "9":
+            search_threats_interactive(analyzer)
+        elif choice == "10":
+            syslog_server_interactive(analyzer)
+        elif choice == "11":
             print("\nThank you for using Log Analyzer!")
             break
         else:
@@ -0,0 +1,254 @@
+import calendar
+import re
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+
+MONTHS = {name: number for number, name in enumerate(
+    ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)}
+
+
+class SyslogClock:
+    """
+    Convert parsed syslog timestamps to epoch seconds
+
+    RFC 3164 timestamps ("Jan  1 10:20:30") have no year, so the current
+    year is assumed and dates more than a day in the future are moved to
+    the previous year. The epoch of each "Mon DD" prefix is cached, so a
+    timestamp costs a slice, a dict lookup and three int() calls. ISO 8601
+    timestamps (RFC 5424) are also accepted.
+    """
+
+    def __init__(self, year=None):
+        self.year = year or time.gmtime().tm_year
+        self.day_epochs = {}
+
+    def to_epoch(self, timestamp):
+        """
+        Convert a timestamp from SyslogParser
+
+        Returns:
+            Epoch seconds (UTC naive times), or None if it cannot be read
+        """
+        if timestamp is None or len(timestamp) < 14:
+            return None
+        if timestamp[4] == '-':
+            return self.iso_epoch(timestamp)
+        if len(timestamp) == 14:
+            timestamp = timestamp[:4] + ' ' + timestamp[4:]  # "Jan 1 ..." from the regex path
+        if (len(timestamp) != 15 or timestamp[3] != ' ' or timestamp[9] != ':'
+                or timestamp[12] != ':'):
+            return None
+
+        day = timestamp[:6]
+        day_epoch = self.day_epochs.get(day)
+        if day_epoch is None:
+            day_epoch = self.day_epoch(day)
+            if day_epoch is None:
+                return None
+            self.day_epochs[day] = day_epoch
+
+        try:
+            return (day_epoch + int(timestamp[7:9]) * 3600 + int(timestamp[10:12]) * 60
+                    + int(timestamp[13:15]))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def iso_epoch(timestamp):
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+
+    def day_epoch(self, day):
+        month = MONTHS.get(day[:3])
+        if month is None or not day[4:].strip().isdigit():
+            return None
+        day_of_month = int(day[4:])
+        try:
+            epoch = calendar.timegm((self.year, month, day_of_month, 0, 0, 0))
+            if epoch > time.time() + 86400:
+                epoch = calendar.timegm((self.year - 1, month, day_of_month, 0, 0, 0))
+        except ValueError:
+            return None
+        return epoch
+
+
+class SlidingWindowCounter:
+    """
+    Count events in the last `window` seconds using time buckets
+
+    Each bucket covers `bucket_size` seconds, so memory and the cost of
+    add() depend on how many buckets expire, not on how many events are
+    in the window. Each bucket is evicted at most once, so add() is O(1)
+    amortized.
+    """
+
+    __slots__ = ('window_buckets', 'bucket_size', 'buckets', 'total')
+
+    def __init__(self, window, bucket_size=1):
+        self.window_buckets = max(1, window // bucket_size)
+        self.bucket_size = bucket_size
+        self.buckets = deque()  # [bucket index, count]
+        self.total = 0
+
+    def add(self, timestamp, count=1):
+        """
+        Add events at a timestamp
+
+        Returns:
+            Events in the window ending at this timestamp
+        """
+        bucket = timestamp // self.bucket_size
+        if self.buckets and bucket < self.buckets[-1][0]:
+            bucket = self.buckets[-1][0]  # out-of-order line: count it as latest
+
+        self.expire(bucket)
+        if self.buckets and self.buckets[-1][0] == bucket:
+            self.buckets[-1][1] += count
+        else:
+            self.buckets.append([bucket, count])
+        self.total += count
+        return self.total
+
+    def expire(self, bucket):
+        """Drop buckets that fall out of the window ending at bucket"""
+        oldest = bucket - self.window_buckets
+        while self.buckets and self.buckets[0][0] <= oldest:
+            self.total -= self.buckets.popleft()[1]
+
+    def latest(self):
+        return self.buckets[-1][0] * self.bucket_size if self.buckets else None
+
+
+class BruteForceDetector:
+    """
+    Flag bursts of failed logins per source IP and per username
+
+    A burst is `threshold` failures within `window` seconds. Each key
+    raises one alert when it crosses the threshold and can alert again
+    after its window has drained below the threshold.
+
+    Failures are sshd "Failed <method> for <user> from <ip>" lines and
+    PAM "authentication failure" lines from other services. sshd's own
+    PAM lines are skipped because they repeat the "Failed password" line.
+    """
+
+    SSHD_FAILURE = re.compile(
+        r"Failed (?:password|publickey|keyboard-interactive\S*|none) for "
+        r"(?:invalid user )?(\S+) from (\S+)")
+    PAM_FAILURE = re.compile(r"authentication failure;(.*)")
+    PAM_FIELD = re.compile(r"\b(rhost|user)=(\S*)")
+    # Every failure line contains one of these
+    PREFILTER = ("Failed ", "authentication failure")
+
+    def __init__(self, threshold=5, window=60, bucket_size=1):
+        """
+        Args:
+            threshold: Failures from one IP or user that make a burst
+            window: Burst window in seconds
+            bucket_size: Counter resolution in seconds
+        """
+        self.threshold = threshold
+        self.window = window
+        self.bucket_size = bucket_size
+        self.clock = SyslogClock()
+        self.counters = {}       # ('ip' | 'user', value) -> SlidingWindowCounter
+        self.alerting = set()    # keys currently at or above the threshold
+        self.failures = Counter()
+        self.bursts = []
+        self.last_prune = None
+
+    def extract(self, line):
+        """
+        Find a failed login in a line
+
+        Returns:
+            (source ip, username) or None
+        """
+        if not any(literal in line for literal in self.PREFILTER):
+            return None
+
+        match = self.SSHD_FAILURE.search(line)
+        if match:
+            user, ip = match.groups()
+        else:
+            match = self.PAM_FAILURE.search(line)
+            if not match or 'sshd' in line[:match.start()]:
+                return None
+            fields = dict(self.PAM_FIELD.findall(match.group(1)))
+            ip, user = fields.get('rhost') or None, fields.get('user') or None
+
+        return ip, user
+
+    def event(self, failure, timestamp):
+        """
+        Combine extract() output with the line's parsed timestamp
+
+        Returns:
+            (epoch, source ip, username), or None without a usable timestamp
+        """
+        epoch = self.clock.to_epoch(timestamp)
+        if epoch is None:
+            return None
+        return (epoch,) + failure
+
+    def record(self, event):
+        """
+        Count a failed login
+
+        Args:
+            event: (epoch, source ip, username) from event()
+
+        Returns:
+            List of (kind, value, count) for keys that just became a burst
+        """
+        epoch, ip, user = event
+        alerts = []
+        for key in (('ip', ip), ('user', user)):
+            if key[1] is None:
+                continue
+            self.failures[key] += 1
+
+            counter = self.counters.get(key)
+            if counter is None:
+                counter = self.counters[key] = SlidingWindowCounter(self.window, self.bucket_size)
+            count = counter.add(epoch)
+
+            if count >= self.threshold:
+                if key not in self.alerting:
+                    self.alerting.add(key)
+                    self.bursts.append((key[0], key[1], count, epoch))
+                    alerts.append((key[0], key[1], count))
+            else:
+                self.alerting.discard(key)
+
+        self.prune(epoch)
+        return alerts
+
+    def prune(self, epoch):
+        """Forget keys idle for a whole window (once per window of log time)"""
+        if self.last_prune is None:
+            self.last_prune = epoch
+        if epoch - self.last_prune < self.window:
+            return
+        self.last_prune = epoch
+        cutoff = epoch - self.window
+        for key in [key for key, counter in self.counters.items() if counter.latest() < cutoff]:
+            del self.counters[key]
+            self.alerting.discard(key)
+
+    def describe(self, kind, value, count):
+        """Threat type text for a burst"""
+        subject = f"from {value}" if kind == 'ip' else f"for user {value}"
+        return f"Brute force: {count} failed logins {subject} within {self.window}s"
+
+    def top_sources(self, kind='ip', count=5):
+        """Return the (value, failures) pairs with the most failures"""
+        totals = Counter({key[1]: total for key, total in self.failures.items() if key[0] == kind})
+        return totals.most_common(count)
@@ -0,0 +1,236 @@
+import json
+import sys
+import time
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class TimedRegex:
+    """Compiled regex stand-in that counts and times search() calls per rule"""
+
+    __slots__ = ('regex', 'rule', 'profiler')
+
+    def __init__(self, regex, rule, profiler):
+        self.regex = regex
+        self.rule = rule
+        self.profiler = profiler
+
+    def search(self, line):
+        started = time.perf_counter()
+        match = self.regex.search(line)
+        self.profiler.rule_seconds[self.rule] += time.perf_counter() - started
+        self.profiler.rule_checks[self.rule] += 1
+        if match:
+            self.profiler.rule_hits[self.rule] += 1
+        return match
+
+
+class AnalysisProfiler:
+    """
+    Throughput, per-stage and per-rule timings for a LogAnalyzer
+
+    Enabled with LogAnalyzer.enable_profiling(), which swaps timed
+    wrappers in for the analyzer's parser, matcher and correlator. The
+    normal code paths contain no timing code, so a disabled profiler
+    costs nothing.
+
+    Stages:
+        read       waiting for lines (disk, decompression)
+        normalize  converting journald JSON lines
+        match      threat matching (includes the per-rule regex time)
+        parse      syslog header parsing
+        correlate  finding and counting failed logins
+        other      everything else (recording threats, mmap scanning, ...)
+    """
+
+    STAGES = ('read', 'normalize', 'match', 'parse', 'correlate')
+
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+        self.files = 0
+        self.seconds = 0.0
+        self.stage_seconds = defaultdict(float)
+        self.rule_hits = defaultdict(int)
+        self.rule_checks = defaultdict(int)
+        self.rule_seconds = defaultdict(float)
+        self.worker_peak_memory = 0
+
+    def timed(self, function, stage):
+        """Wrap a function so its run time is added to a stage"""
+        stage_seconds = self.stage_seconds
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stage_seconds[stage] += time.perf_counter() - started
+        return wrapper
+
+    def timed_lines(self, lines):
+        """Yield from an iterable of lines, timing each read as the read stage"""
+        iterator = iter(lines)
+        stage_seconds = self.stage_seconds
+        while True:
+            started = time.perf_counter()
+            try:
+                line = next(iterator)
+            except StopIteration:
+                stage_seconds['read'] += time.perf_counter() - started
+                return
+            stage_seconds['read'] += time.perf_counter() - started
+            yield line
+
+    def instrument_matcher(self, matcher, rules):
+        """Replace each compiled regex of a (private) matcher with a TimedRegex"""
+        matcher.compiled = [(pattern, TimedRegex(regex, rule.name, self), severity)
+                            for (pattern, regex, severity), rule in zip(matcher.compiled, rules)]
+        matcher.match = self.timed(matcher.match, 'match')
+
+    def add_file(self, line_count, byte_count, seconds):
+        """Count one analyzed file (or chunk of a followed file)"""
+        self.files += 1
+        self.lines += line_count
+        self.bytes += byte_count
+        self.seconds += seconds
+
+    def snapshot(self):
+        """Stage and rule counters as a plain dict (to send from a worker)"""
+        return {
+            'stage_seconds': dict(self.stage_seconds),
+            'rule_hits': dict(self.rule_hits),
+            'rule_checks': dict(self.rule_checks),
+            'rule_seconds': dict(self.rule_seconds),
+            'peak_memory': peak_memory(),
+        }
+
+    def merge(self, snapshot):
+        """Add the counters from a worker's snapshot()"""
+        for name in ('stage_seconds', 'rule_hits', 'rule_checks', 'rule_seconds'):
+            totals = getattr(self, name)
+            for key, value in snapshot[name].items():
+                totals[key] += value
+        self.worker_peak_memory = max(self.worker_peak_memory, snapshot['peak_memory'] or 0)
+
+    def results(self):
+        """
+        Collect every measurement
+
+        Returns:
+            dict suitable for JSON output
+        """
+        staged = sum(self.stage_seconds[stage] for stage in self.STAGES)
+        stages = {stage: self.stage_seconds[stage] for stage in self.STAGES}
+        stages['other'] = max(0.0, self.seconds - staged)
+        return {
+            'files': self.files,
+            'lines': self.lines,
+            'bytes': self.bytes,
+            'seconds': self.seconds,
+            'lines_per_second': self.lines / self.seconds if self.seconds else 0.0,
+            'bytes_per_second': self.bytes / self.seconds if self.seconds else 0.0,
+            'stage_seconds': stages,
+            'rules': {rule: {'hits': self.rule_hits[rule],
+                             'checks': self.rule_checks[rule],
+                             'seconds': self.rule_seconds[rule]}
+                      for rule in self.rule_checks},
+            'peak_memory_bytes': peak_memory(),
+            'worker_peak_memory_bytes': self.worker_peak_memory or None,
+        }
+
+    def print_report(self, top_rules=10):
+        """Print a human-readable performance report"""
+        results = self.results()
+        print(f"\n{'='*60}")
+        print("PERFORMANCE REPORT")
+        print(f"{'='*60}")
+        print(f"Files: {results['files']}  Lines: {results['lines']}  "
+              f"Data: {results['bytes'] / 1e6:.1f} MB  Time: {results['seconds']:.2f}s")
+        print(f"Throughput: {results['lines_per_second']:,.0f} lines/sec, "
+              f"{results['bytes_per_second'] / 1e6:.1f} MB/sec")
+        if results['peak_memory_bytes']:
+            print(f"Peak memory: {results['peak_memory_bytes'] / 1e6:.1f} MB", end='')
+            if results['worker_peak_memory_bytes']:
+                print(f" (largest worker: {results['worker_peak_memory_bytes'] / 1e6:.1f} MB)",
+                      end='')
+            print()
+
+        print("\nTime by stage:")
+        for stage, seconds in results['stage_seconds'].items():
+            share = seconds / results['seconds'] * 100 if results['seconds'] else 0
+            print(f"  {stage:<10} {seconds:8.2f}s {share:5.1f}%")
+
+        rules = sorted(results['rules'].items(), key=lambda item: item[1]['seconds'],
+                       reverse=True)
+        if rules:
+            print("\nSlowest rules (regex checks after the literal prefilter):")
+            for rule, counts in rules[:top_rules]:
+                print(f"  {rule[:36]:<36} {counts['hits']:>8} hits {counts['checks']:>9} checks "
+                      f"{counts['seconds']:7.3f}s")
+        print(f"{'='*60}\n")
+
+    def to_json(self):
+        return json.dumps(self.results(), indent=2)
+
+    def to_prometheus(self, prefix="log_analyzer"):
+        """
+        Format the results in the Prometheus text exposition format
+
+        Returns:
+            str, e.g. for node_exporter's textfile collector
+        """
+        results = self.results()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{escape_label(label)}"'
+                                      for key, label in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name} {value}")
+
+        metric('files_total', 'counter', "Log files analyzed", [({}, results['files'])])
+        metric('lines_total', 'counter', "Log lines analyzed", [({}, results['lines'])])
+        metric('bytes_total', 'counter', "Log bytes analyzed", [({}, results['bytes'])])
+        metric('seconds_total', 'counter', "Time spent analyzing", [({}, results['seconds'])])
+        metric('stage_seconds_total', 'counter', "Time spent in each analysis stage",
+               [({'stage': stage}, seconds) for stage, seconds in results['stage_seconds'].items()])
+        metric('rule_hits_total', 'counter', "Lines matched by each rule",
+               [({'rule': rule}, counts['hits']) for rule, counts in results['rules'].items()])
+        metric('rule_checks_total', 'counter', "Regex checks run for each rule",
+               [({'rule': rule}, counts['checks']) for rule, counts in results['rules'].items()])
+        metric('rule_seconds_total', 'counter', "Regex time spent on each rule",
+               [({'rule': rule}, counts['seconds']) for rule, counts in results['rules'].items()])
+        if results['peak_memory_bytes']:
+            metric('peak_memory_bytes', 'gauge', "Peak resident memory",
+                   [({}, results['peak_memory_bytes'])])
+        return '\n'.join(lines) + '\n'
+
+    def save(self, filename):
+        """Write the results as Prometheus text (.prom) or JSON (anything else)"""
+        with open(filename, 'w') as f:
+            f.write(self.to_prometheus() if filename.endswith('.prom') else self.to_json())
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def peak_memory():
+    """
+    Peak resident memory of this process
+
+    Returns:
+        Bytes, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
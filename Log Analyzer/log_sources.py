@@ -0,0 +1,542 @@
+import bz2
+import fnmatch
+import glob
+import gzip
+import hashlib
+import json
+import locale
+import lzma
+import os
+import queue
+import re
+import threading
+
+
+# Magic bytes at the start of each supported compressed format
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+}
+COMPRESSED_OPENERS = {
+    'gzip': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+
+# Bytes read from a followed file at a time
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def detect_compression(filepath):
+    """
+    Detect the compression format of a file from its magic bytes
+
+    Returns:
+        'gzip', 'bz2', 'xz' or None for plain files
+    """
+    with open(filepath, 'rb') as f:
+        header = f.read(6)
+    for compression, magic in COMPRESSION_MAGIC.items():
+        if header.startswith(magic):
+            return compression
+    return None
+
+
+def read_compressed_lines(filepath, compression=None, block_size=1024 * 1024, queue_size=8):
+    """
+    Yield decoded lines from a compressed log file
+
+    A reader thread decompresses fixed-size blocks into a bounded queue
+    while the caller scans lines, so memory stays at roughly
+    queue_size * block_size and decompression overlaps with analysis
+    (zlib, bz2 and lzma release the GIL while decompressing).
+
+    Args:
+        filepath: Path to the compressed file
+        compression: Format name (None = detect from magic bytes)
+        block_size: Decompressed bytes per queued block
+        queue_size: Maximum blocks buffered ahead of the caller
+    """
+    opener = COMPRESSED_OPENERS[compression or detect_compression(filepath)]
+    encoding = locale.getpreferredencoding(False)
+    blocks = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def reader():
+        try:
+            with opener(filepath, 'rb') as f:
+                while not stop.is_set():
+                    block = f.read(block_size)
+                    put(block)
+                    if not block:
+                        break
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+
+    pending = b''
+    try:
+        while True:
+            block = blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                break
+            lines = (pending + block).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line.decode(encoding, errors='ignore')
+        if pending:
+            yield pending.decode(encoding, errors='ignore')
+    finally:
+        # Also reached when the caller stops early (e.g. a line limit)
+        stop.set()
+        thread.join()
+
+
+def rotation_order(filepath):
+    """
+    Sort key placing rotated logs oldest first
+
+    auth.log.3.gz comes before auth.log.2.gz, auth.log.1 and auth.log.
+    Files without a rotation number are ordered by modification time.
+    """
+    name = os.path.basename(filepath)
+    match = re.search(r"\.(\d+)(?:\.(?:gz|bz2|xz))?$", name)
+    index = int(match.group(1)) if match else 0
+    return (-index, os.path.getmtime(filepath))
+
+
+def rotation_set(pattern):
+    """
+    Expand a glob such as /var/log/auth.log* in chronological order
+
+    Returns:
+        List of file paths, oldest first
+    """
+    paths = [path for path in glob.glob(pattern) if os.path.isfile(path)]
+    return sorted(paths, key=rotation_order)
+
+
+# Binary login records and journal files that are not text logs
+BINARY_LOGS = ('wtmp*', 'btmp*', 'lastlog', 'faillog', '*.journal', '*.journal~')
+
+
+def discover_log_files(paths, pattern="*", recursive=True, exclude=BINARY_LOGS):
+    """
+    Expand files, globs and directories into the log files to analyze
+
+    Args:
+        paths: File paths, globs (e.g. /var/log/*.log) or directories
+        pattern: Glob that file names inside directories must match
+        recursive: Descend into subdirectories (symlinked ones are skipped)
+        exclude: File name globs to skip
+
+    Returns:
+        List of (path, label) pairs without duplicates. The label is the
+        path relative to the directory it was found in, so auth.log files
+        from different hosts (host1/auth.log, host2/auth.log) stay apart;
+        files given directly or by glob are labelled with their name. Files
+        whose labels would collide are labelled with their path relative
+        to the common parent of those files instead (see unique_labels).
+    """
+    found = []
+    seen = set()
+
+    def add(path, label):
+        name = os.path.basename(path)
+        if any(fnmatch.fnmatch(name, skip) for skip in exclude):
+            return
+        key = os.path.realpath(path)
+        if key not in seen and os.path.isfile(path):
+            seen.add(key)
+            found.append((path, label))
+
+    for entry in paths:
+        matches = sorted(glob.glob(entry)) if glob.has_magic(entry) else [entry]
+        for path in matches:
+            if not os.path.isdir(path):
+                add(path, os.path.basename(path))
+                continue
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                if not recursive:
+                    dirs.clear()
+                for name in sorted(files):
+                    if fnmatch.fnmatch(name, pattern):
+                        filepath = os.path.join(root, name)
+                        add(filepath, os.path.relpath(filepath, path))
+    return unique_labels(found)
+
+
+def unique_labels(found):
+    """
+    Relabel files that share a label until every label is unique
+
+    Colliding files (e.g. host1/auth.log and host2/auth.log given
+    directly, both labelled auth.log) are labelled with their path
+    relative to the common parent of the colliding files.
+
+    Args:
+        found: List of (path, label) pairs of distinct files
+
+    Returns:
+        The list, with colliding labels replaced
+    """
+    while True:
+        by_label = {}
+        for index, (_, label) in enumerate(found):
+            by_label.setdefault(label, []).append(index)
+        collisions = [indexes for indexes in by_label.values() if len(indexes) > 1]
+        if not collisions:
+            return found
+
+        for indexes in collisions:
+            paths = [os.path.abspath(found[index][0]) for index in indexes]
+            try:
+                parent = os.path.commonpath([os.path.dirname(path) for path in paths])
+            except ValueError:  # different drives on Windows
+                parent = None
+            for index, path in zip(indexes, paths):
+                found[index] = (found[index][0],
+                                path if parent is None else os.path.relpath(path, parent))
+
+
+def content_fingerprint(filepath, offset, size=1024):
+    """
+    Fingerprint the start of a file and the bytes just before an offset
+
+    A file that was replaced in place (same inode, new contents) gets a
+    different fingerprint even if it has grown past the old offset.
+
+    Returns:
+        Short hex digest
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        digest.update(f.read(min(size, offset)))
+        f.seek(max(0, offset - size))
+        digest.update(f.read(min(size, offset)))
+    return digest.hexdigest()[:16]
+
+
+def read_head(filepath, size=1024):
+    """Return the first bytes of a log file's contents, decompressed if needed"""
+    compression = detect_compression(filepath)
+    opener = COMPRESSED_OPENERS[compression] if compression else open
+    with opener(filepath, 'rb') as f:
+        return f.read(size)
+
+
+def head_fingerprint(head, size):
+    """Short hex digest of the first size bytes of a file's contents"""
+    return hashlib.sha256(head[:size]).hexdigest()[:16]
+
+
+def same_head(entry, head):
+    """Check whether a checkpoint was made for contents starting with head"""
+    size = entry.get('head_size')  # missing in checkpoints from older versions
+    return bool(size) and len(head) >= size and head_fingerprint(head, size) == entry['head']
+
+
+class CheckpointStore:
+    """
+    Persistent record of how far each log file has been analyzed
+
+    Each entry holds the byte offset and line number reached, the file's
+    inode/device, a content fingerprint and a fingerprint of the first
+    (decompressed) bytes of the file. A file resumes only if the same
+    inode still holds the same bytes up to the offset. A rotated file
+    (found under a new name with the old inode) resumes from its old entry,
+    and a truncated or replaced file starts over from the first line. A
+    rotated file that was then compressed (auth.log.1 -> auth.log.1.gz)
+    has a new inode but starts with the same bytes, so it skips the lines
+    its old entry covered.
+    """
+
+    def __init__(self, checkpoint_file="log_checkpoints.json"):
+        """Load checkpoints from disk if the file exists"""
+        self.checkpoint_file = checkpoint_file
+        self.checkpoints = {}
+        self.load()
+
+    def load(self):
+        """Load checkpoints from file"""
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file, 'r') as f:
+                self.checkpoints = json.load(f)
+
+    def save(self):
+        """Write checkpoints to file atomically"""
+        temp_file = f"{self.checkpoint_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self.checkpoints, f, indent=2)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def resume_point(self, filepath):
+        """
+        Find where analysis of a file should continue
+
+        Returns:
+            (byte offset, number of lines already analyzed)
+        """
+        stat = os.stat(filepath)
+        key = os.path.abspath(filepath)
+
+        # The file's own entry first, then any entry that moved here by rotation
+        entries = [self.checkpoints[key]] if key in self.checkpoints else []
+        entries += [entry for path, entry in self.checkpoints.items() if path != key]
+
+        compressed = detect_compression(filepath) is not None
+        head = None
+        for entry in entries:
+            if (entry['inode'], entry['device']) != (stat.st_ino, stat.st_dev):
+                # Another file, unless it holds the same contents (e.g. compressed)
+                if head is None:
+                    head = read_head(filepath)
+                if not same_head(entry, head):
+                    continue
+                if compressed:
+                    # Offsets do not carry over, but line numbers do
+                    return 0, entry['line_number']
+            if entry['offset'] > stat.st_size:
+                continue  # truncated
+            if content_fingerprint(filepath, entry['offset']) != entry['fingerprint']:
+                continue  # replaced in place
+            return entry['offset'], entry['line_number']
+
+        return 0, 0
+
+    def update(self, filepath, offset, line_number):
+        """Record progress for a file"""
+        stat = os.stat(filepath)
+        key = os.path.abspath(filepath)
+        head = read_head(filepath)
+
+        # An entry for the same inode or contents under another name is now stale
+        for path in [path for path, entry in self.checkpoints.items()
+                     if path != key and ((entry['inode'], entry['device']) == (stat.st_ino, stat.st_dev)
+                                         or same_head(entry, head))]:
+            del self.checkpoints[path]
+
+        # Only the analyzed part of a plain file identifies it; it may still grow
+        head_size = len(head) if detect_compression(filepath) else min(len(head), offset)
+        self.checkpoints[key] = {
+            'offset': offset,
+            'line_number': line_number,
+            'inode': stat.st_ino,
+            'device': stat.st_dev,
+            'fingerprint': content_fingerprint(filepath, offset),
+            'head': head_fingerprint(head, head_size),
+            'head_size': head_size,
+        }
+
+
+class FileCursor:
+    """Read position of one followed log file"""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.handle = None
+        self.inode = None
+        self.device = None
+        self.offset = 0
+        self.line_number = 0
+        self.pending = b''
+
+    def open(self, from_start=True):
+        """
+        Open the file at its current path
+
+        Returns:
+            True if the file was opened
+        """
+        try:
+            handle = open(self.filepath, 'rb')
+        except OSError:
+            return False
+
+        stat = os.fstat(handle.fileno())
+        self.close()
+        self.handle = handle
+        self.inode = stat.st_ino
+        self.device = stat.st_dev
+        self.offset = 0 if from_start else stat.st_size
+        self.line_number = 0
+        self.pending = b''
+        handle.seek(self.offset)
+        return True
+
+    def close(self):
+        """Close the current file handle"""
+        if self.handle:
+            self.handle.close()
+            self.handle = None
+
+    def read_lines(self, block_size=READ_BLOCK_SIZE):
+        """
+        Yield complete lines appended since the last call
+
+        The file is read in blocks, so a large backlog (from_start, or a
+        burst of writes) is streamed instead of loaded at once. Reading
+        stops at the size the file had when the call began, so a file
+        that is written faster than it is read cannot starve the others.
+
+        Yields:
+            Raw lines (bytes) without trailing newlines
+        """
+        end = os.fstat(self.handle.fileno()).st_size
+        while self.offset < end:
+            data = self.handle.read(min(block_size, end - self.offset))
+            if not data:
+                break
+            self.offset += len(data)
+
+            lines = (self.pending + data).split(b'\n')
+            self.pending = lines.pop()
+            yield from lines
+
+    def flush_pending(self):
+        """Return a final unterminated line, if any"""
+        lines = [self.pending] if self.pending else []
+        self.pending = b''
+        return lines
+
+    def replaced_or_truncated(self):
+        """
+        Check whether the path was rotated or the file was truncated
+
+        Returns:
+            "rotated", "truncated" or None
+        """
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+
+        if (stat.st_ino, stat.st_dev) != (self.inode, self.device):
+            return "rotated"
+        if stat.st_size < self.offset:
+            return "truncated"
+        return None
+
+
+class LogFollower:
+    """
+    Follow log files like tail -F
+
+    Each file keeps a byte offset and inode. Only newly appended lines are
+    analyzed, so analyzer.stats and analyzer.threats_found grow
+    incrementally. When logrotate moves a file away, the old file is read
+    to the end before the new file at the same path is opened. A truncated
+    file (copytruncate) is read again from the start.
+    """
+
+    def __init__(self, analyzer, filepaths, poll_interval=0.25, from_start=False):
+        """
+        Args:
+            analyzer: LogAnalyzer that receives the new lines
+            filepaths: Path or list of paths to follow
+            poll_interval: Seconds to wait when no new data is available
+            from_start: Analyze existing contents first (default: only new lines)
+        """
+        if isinstance(filepaths, str):
+            filepaths = [filepaths]
+
+        self.analyzer = analyzer
+        self.poll_interval = poll_interval
+        self.encoding = locale.getpreferredencoding(False)
+        self.stop_event = threading.Event()
+        self.cursors = []
+
+        for filepath in filepaths:
+            cursor = FileCursor(filepath)
+            cursor.open(from_start)
+            self.cursors.append(cursor)
+
+    def poll(self):
+        """
+        Analyze data appended to every followed file since the last poll
+
+        Returns:
+            List of new threat dicts
+        """
+        # Pick up edits to the analyzer's rule pack without a restart
+        self.analyzer.reload_rules()
+
+        new_threats = []
+        self.analyzer.add_threat_listener(new_threats.append)
+        try:
+            for cursor in self.cursors:
+                self.poll_cursor(cursor)
+        finally:
+            self.analyzer.remove_threat_listener(new_threats.append)
+        return new_threats
+
+    def poll_cursor(self, cursor):
+        """Read and analyze new lines for one file, handling rotation"""
+        if cursor.handle is None:
+            # File did not exist yet (or vanished); retry from the start
+            if cursor.open(from_start=True):
+                print(f"Following {cursor.filepath}")
+            else:
+                return
+
+        self.analyze(cursor, cursor.read_lines())
+
+        change = cursor.replaced_or_truncated()
+        if change == "rotated":
+            # Drain what was written before the move, then switch files
+            self.analyze(cursor, cursor.read_lines())
+            self.analyze(cursor, cursor.flush_pending())
+            cursor.open(from_start=True)
+            self.analyze(cursor, cursor.read_lines())
+        elif change == "truncated":
+            cursor.open(from_start=True)
+            self.analyze(cursor, cursor.read_lines())
+
+    def analyze(self, cursor, lines):
+        """Pass raw lines (an iterable of bytes) of one file to the analyzer"""
+        self.analyzer.current_logfile = os.path.basename(cursor.filepath)
+        decoded = (line.decode(self.encoding, errors='ignore') for line in lines)
+        _, total_lines = self.analyzer.analyze_lines(decoded, cursor.line_number + 1)
+        cursor.line_number += total_lines
+
+    def follow(self):
+        """
+        Yield threats as they are appended to the followed files
+
+        Runs until stop() is called from another thread or a callback.
+        """
+        while not self.stop_event.is_set():
+            threats = self.poll()
+            yield from threats
+            if not threats:
+                self.stop_event.wait(self.poll_interval)
+
+    def run(self, callback):
+        """
+        Call callback(threat) for every new threat until stop() is called
+        """
+        for threat in self.follow():
+            callback(threat)
+
+    def stop(self):
+        """Stop following after the current poll"""
+        self.stop_event.set()
+
+    def close(self):
+        """Close all followed files"""
+        for cursor in self.cursors:
+            cursor.close()
@@ -0,0 +1,101 @@
+import json
+import re
+import time
+from collections import namedtuple
+
+
+# Parsed header fields of one log line. The message is line[message_start:]
+# so it never has to be copied out of the line.
+ParsedLine = namedtuple('ParsedLine', ['timestamp', 'hostname', 'service', 'pid', 'message_start'])
+
+UNSTRUCTURED = ParsedLine('N/A', 'N/A', 'N/A', 'N/A', 0)
+
+# Builds a ParsedLine from a tuple without namedtuple's keyword handling
+make_parsed = tuple.__new__
+
+
+class SyslogParser:
+    """
+    Parse log lines in RFC 3164, RFC 5424 and ISO-timestamped formats
+
+    All patterns are compiled once. RFC 3164 lines
+    ("Jan  1 10:20:30 host sshd[123]: message") use the same regex the
+    analyzer always used, so results are unchanged; the other formats
+    are only tried when it does not match. journald JSON export lines
+    (journalctl -o json) are first converted to RFC 3164 text with
+    normalize().
+    """
+
+    RFC3164_PATTERN = re.compile(r"^(\w+ +\d+ \d+:\d+:\d+) (\S+) (.+?)(\[.+?\])?: (.*)$")
+
+    # <PRI>1 TIMESTAMP HOSTNAME APP-NAME PROCID MSGID STRUCTURED-DATA MSG
+    RFC5424_PATTERN = re.compile(
+        r"^(?:<\d{1,3}>)?1 (\S+) (\S+) (\S+) (\S+) \S+ (?:-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (.*))?$")
+
+    # rsyslog high-precision file format: 2024-01-01T10:20:30.123+00:00 host sshd[1]: msg
+    ISO_PATTERN = re.compile(r"^(\d{4}-\d\d-\d\dT\S+) (\S+) (.+?)(\[.+?\])?: (.*)$")
+
+    def parse(self, line):
+        """
+        Parse a stripped log line
+
+        Returns:
+            ParsedLine (UNSTRUCTURED fields if no format matches)
+        """
+        match = self.RFC3164_PATTERN.match(line)
+        if match:
+            return make_parsed(ParsedLine, (*match.group(1, 2, 3, 4), match.start(5)))
+
+        first = line[:1]
+        if first == '<' or line.startswith('1 '):
+            match = self.RFC5424_PATTERN.match(line)
+            if match:
+                timestamp, hostname, service, pid, message = match.groups()
+                return ParsedLine(timestamp, hostname, service,
+                                  None if pid == '-' else f"[{pid}]",
+                                  match.start(5) if message is not None else len(line))
+        elif first.isdigit():
+            match = self.ISO_PATTERN.match(line)
+            if match:
+                return make_parsed(ParsedLine, (*match.group(1, 2, 3, 4), match.start(5)))
+
+        return UNSTRUCTURED
+
+    @staticmethod
+    def normalize(line):
+        """
+        Convert a journald JSON export line to RFC 3164 text
+
+        Returns:
+            The converted line, or the original line if it is not journald JSON
+        """
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return line
+        if not isinstance(entry, dict) or 'MESSAGE' not in entry:
+            return line
+
+        message = entry['MESSAGE']
+        if isinstance(message, list):  # non-UTF-8 messages are byte arrays
+            message = bytes(message).decode('utf-8', errors='ignore')
+        message = str(message).replace('\n', ' ')
+
+        try:
+            seconds = int(entry.get('__REALTIME_TIMESTAMP', 0)) // 1000000
+        except (TypeError, ValueError):
+            seconds = 0
+        timestamp = None
+        if seconds:
+            # RFC 3164 pads the day with a space; strftime's %e is not portable
+            t = time.gmtime(seconds)
+            timestamp = f"{time.strftime('%b', t)} {t.tm_mday:2d} {time.strftime('%H:%M:%S', t)}"
+
+        hostname = entry.get('_HOSTNAME', 'localhost')
+        service = entry.get('SYSLOG_IDENTIFIER') or entry.get('_COMM') or 'journal'
+        pid = entry.get('SYSLOG_PID') or entry.get('_PID')
+        tag = f"{service}[{pid}]" if pid else service
+
+        if timestamp is None:
+            return f"{hostname} {tag}: {message}"
+        return f"{timestamp} {hostname} {tag}: {message}"
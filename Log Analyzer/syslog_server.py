@@ -0,0 +1,395 @@
+import asyncio
+import socket
+import time
+
+
+# Largest message accepted on TCP; longer frames close the connection
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+
+def decode_message(data):
+    """
+    Convert one received syslog message to a log line
+
+    The <PRI> prefix is removed so RFC 3164 messages parse like lines
+    from a log file ("<34>1 ..." RFC 5424 messages still parse too).
+    """
+    if data[:1] == b'<':
+        end = data.find(b'>', 1, 5)
+        if end > 0 and data[1:end].isdigit():
+            data = data[end + 1:]
+    return data.decode('utf-8', errors='ignore')
+
+
+class SyslogTCPProtocol(asyncio.Protocol):
+    """
+    One TCP syslog connection
+
+    Framing is detected from the first byte as in RFC 6587: a digit
+    means octet counting ("LEN MSG"), anything else means one message
+    per line.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        self.octet_counting = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.connections.add(self)
+        if self.server.paused:
+            transport.pause_reading()
+
+    def connection_lost(self, exc):
+        # A last line without a newline is still a message
+        if self.buffer and not self.octet_counting:
+            self.server.submit([bytes(self.buffer)])
+            self.buffer.clear()
+        self.server.connections.discard(self)
+
+    def data_received(self, data):
+        self.server.bytes_received += len(data)
+        self.buffer += data
+        if self.octet_counting is None:
+            self.octet_counting = self.buffer[:1].isdigit()
+
+        try:
+            messages = self.octet_counted() if self.octet_counting else self.newline_delimited()
+        except ValueError as e:
+            self.server.framing_errors += 1
+            print(f"Error: closing syslog connection from "
+                  f"{self.transport.get_extra_info('peername')}: {e}")
+            self.buffer.clear()
+            self.transport.close()
+            return
+        if messages:
+            self.server.submit(messages)
+
+    def octet_counted(self):
+        """Split complete "LEN MSG" frames off the buffer"""
+        buffer = self.buffer
+        size = len(buffer)
+        position = 0
+        messages = []
+        while position < size:
+            space = buffer.find(b' ', position, position + 12)
+            if space < 0:
+                if size - position >= 12:
+                    raise ValueError("invalid octet-counting frame")
+                break
+            length = int(buffer[position:space])  # int() skips newlines between frames
+            if not 0 <= length <= MAX_MESSAGE_SIZE:
+                raise ValueError(f"invalid message length {length}")
+            start = space + 1
+            if start + length > size:
+                break
+            messages.append(buffer[start:start + length])
+            position = start + length
+        del buffer[:position]
+        return messages
+
+    def newline_delimited(self):
+        """Split complete lines off the buffer"""
+        buffer = self.buffer
+        end = buffer.rfind(b'\n')
+        if end < 0:
+            if len(buffer) > MAX_MESSAGE_SIZE:
+                raise ValueError("line longer than the maximum message size")
+            return []
+        messages = buffer[:end].split(b'\n')
+        del buffer[:end + 1]
+        return messages
+
+
+class SyslogServer:
+    """
+    Receive syslog messages over UDP and TCP and analyze them as they arrive
+
+    Messages go straight from the socket to analyzer.analyze_lines(), so
+    the collected logs never touch the disk. Messages are analyzed in
+    batches of batch_size (or whatever arrived within flush_interval)
+    on the event loop thread between reads, so the analyzer and its
+    threat listeners need no locking.
+
+    When max_batches batches are waiting, reading stops until the
+    analyzer has caught up with half of them: TCP senders are slowed by
+    TCP flow control, and UDP datagrams wait in the kernel buffer
+    (which drops them if it overflows, as with any UDP syslog server).
+    """
+
+    # Datagrams read per wakeup, so one busy UDP socket cannot starve TCP
+    UDP_READS_PER_WAKEUP = 512
+    UDP_RECEIVE_BUFFER = 8 * 1024 * 1024
+
+    def __init__(self, analyzer, host="0.0.0.0", port=5140, udp=True, tcp=True,
+                 batch_size=1000, flush_interval=0.05, max_batches=64):
+        """
+        Args:
+            analyzer: LogAnalyzer that receives the messages
+            host: Address to listen on
+            port: UDP and TCP port (514 is standard but needs root,
+                  0 picks a free port)
+            udp: Accept syslog datagrams (RFC 5426)
+            tcp: Accept syslog over TCP (RFC 6587 octet counting or
+                 newline framing)
+            batch_size: Messages analyzed per batch
+            flush_interval: Seconds before a partial batch is analyzed
+            max_batches: Waiting batches that pause reading
+        """
+        self.analyzer = analyzer
+        self.host = host
+        self.port = port
+        self.udp = udp
+        self.tcp = tcp
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_batches = max_batches
+        self.label = f"syslog:{port}"
+
+        self.loop = None
+        self.queue = None
+        self.pending = []
+        self.flush_handle = None
+        self.consumer = None
+        self.stop_event = None
+        self.tcp_server = None
+        self.udp_socket = None
+        self.connections = set()
+        self.paused = False
+
+        self.received = 0
+        self.analyzed = 0
+        self.bytes_received = 0
+        self.pauses = 0
+        self.framing_errors = 0
+        self.started = None
+        self.stats_before = {}
+
+    async def start(self):
+        """
+        Open the listening sockets and start analyzing
+
+        Raises:
+            OSError: If a port cannot be opened
+        """
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        port = self.port
+
+        if self.tcp:
+            self.tcp_server = await self.loop.create_server(
+                lambda: SyslogTCPProtocol(self), self.host, port, reuse_address=True)
+            port = self.tcp_server.sockets[0].getsockname()[1]
+
+        if self.udp:
+            self.udp_socket = socket.socket(socket.AF_INET6 if ':' in self.host else socket.AF_INET,
+                                            socket.SOCK_DGRAM)
+            try:
+                self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF,
+                                           self.UDP_RECEIVE_BUFFER)
+                self.udp_socket.bind((self.host, port))
+            except OSError:
+                self.udp_socket.close()
+                self.udp_socket = None
+                if self.tcp_server is not None:
+                    self.tcp_server.close()
+                raise
+            self.udp_socket.setblocking(False)
+            port = self.udp_socket.getsockname()[1]
+            self.loop.add_reader(self.udp_socket.fileno(), self.read_datagrams)
+
+        self.port = port
+        self.label = f"syslog:{port}"
+        self.started = time.perf_counter()
+        self.stats_before = dict(self.analyzer.stats)
+        self.consumer = self.loop.create_task(self.consume())
+
+        protocols = [name for name, enabled in (('udp', self.udp), ('tcp', self.tcp)) if enabled]
+        print(f"Listening for syslog on {self.host} port {port} ({', '.join(protocols)})")
+
+    def read_datagrams(self):
+        """Read every waiting datagram (up to UDP_READS_PER_WAKEUP)"""
+        recv = self.udp_socket.recv
+        messages = []
+        try:
+            for _ in range(self.UDP_READS_PER_WAKEUP):
+                messages.append(recv(65535))
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            print(f"Error: receiving syslog datagram: {e}")
+        if messages:
+            self.bytes_received += sum(map(len, messages))
+            self.submit(messages)
+
+    def submit(self, messages):
+        """Queue received messages for analysis"""
+        self.received += len(messages)
+        self.pending.extend(messages)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = self.loop.call_later(self.flush_interval, self.flush)
+
+    def flush(self):
+        """Hand the pending messages to the analyzer as one batch"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.pending:
+            self.queue.put_nowait(self.pending)
+            self.pending = []
+            if not self.paused and self.queue.qsize() >= self.max_batches:
+                self.pause_reading()
+
+    def pause_reading(self):
+        """Stop reading from every socket until the analyzer catches up"""
+        self.paused = True
+        self.pauses += 1
+        for connection in self.connections:
+            connection.transport.pause_reading()
+        if self.udp_socket is not None:
+            self.loop.remove_reader(self.udp_socket.fileno())
+
+    def resume_reading(self):
+        self.paused = False
+        for connection in self.connections:
+            connection.transport.resume_reading()
+        if self.udp_socket is not None:
+            self.loop.add_reader(self.udp_socket.fileno(), self.read_datagrams)
+
+    async def consume(self):
+        """Analyze queued batches as they arrive"""
+        while True:
+            batch = await self.queue.get()
+            self.analyze_batch(batch)
+            if self.paused and self.queue.qsize() <= self.max_batches // 2:
+                self.resume_reading()
+            await asyncio.sleep(0)  # let the readers run between batches
+
+    def analyze_batch(self, batch):
+        """Pass one batch of raw messages to the analyzer"""
+        analyzer = self.analyzer
+        # Pick up edits to the analyzer's rule pack without a restart
+        analyzer.reload_rules()
+        analyzer.current_logfile = self.label
+        _, total_lines = analyzer.analyze_lines(map(decode_message, batch), self.analyzed + 1)
+        self.analyzed += total_lines
+
+    async def serve(self, duration=None):
+        """
+        Receive and analyze messages until stop() is called
+
+        Args:
+            duration: Stop after this many seconds (None = run until stopped)
+        """
+        self.stop_event = asyncio.Event()
+        await self.start()
+        try:
+            await asyncio.wait_for(self.stop_event.wait(), duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await self.close()
+
+    def run(self, duration=None):
+        """
+        Serve until stop() is called, duration passes or Ctrl+C
+
+        Returns:
+            True when finished, False if the ports could not be opened
+        """
+        try:
+            asyncio.run(self.serve(duration))
+        except OSError as e:
+            print(f"Error: cannot listen on {self.host} port {self.port}: {e}")
+            return False
+        return True
+
+    def stop(self):
+        """Stop serving (safe to call from any thread or a threat listener)"""
+        if self.loop is not None and self.stop_event is not None:
+            self.loop.call_soon_threadsafe(self.stop_event.set)
+
+    async def close(self):
+        """Close the sockets and analyze everything already received"""
+        if self.udp_socket is not None:
+            if not self.paused:
+                self.loop.remove_reader(self.udp_socket.fileno())
+            self.udp_socket.close()
+            self.udp_socket = None
+        if self.tcp_server is not None:
+            self.tcp_server.close()
+            for connection in list(self.connections):
+                connection.transport.close()
+            await self.tcp_server.wait_closed()
+            self.tcp_server = None
+        await asyncio.sleep(0)  # deliver connection_lost for the closed transports
+
+        if self.consumer is not None:
+            self.consumer.cancel()
+            self.consumer = None
+        self.flush()
+        while not self.queue.empty():
+            self.analyze_batch(self.queue.get_nowait())
+        self.paused = False
+
+        self.analyzer.current_logfile = self.label
+        self.analyzer.record_file_summary(self.label, self.analyzed, self.stats_before,
+                                          time.perf_counter() - self.started,
+                                          byte_count=self.bytes_received)
+        print(f"Syslog server stopped: {self.received} messages received, "
+              f"{self.analyzed} analyzed")
+
+
+def frame_octet_counted(message):
+    """Frame one message for TCP syslog (RFC 6587 octet counting)"""
+    data = message.encode('utf-8') if isinstance(message, str) else message
+    return b"%d %s" % (len(data), data)
+
+
+def send_syslog(messages, host="127.0.0.1", port=5140, protocol="tcp", rate=None,
+                priority=13):
+    """
+    Send messages to a syslog server (e.g. a local SyslogServer for testing)
+
+    Args:
+        messages: Iterable of log lines
+        host: Server address
+        port: Server port
+        protocol: "tcp" (octet counting) or "udp" (one datagram per message)
+        rate: Maximum messages per second (None = as fast as possible;
+              UDP messages sent faster than the server reads are dropped)
+        priority: <PRI> value put in front of each message (None = no prefix)
+
+    Returns:
+        Number of messages sent
+    """
+    prefix = b"" if priority is None else b"<%d>" % priority
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    kind = socket.SOCK_STREAM if protocol == "tcp" else socket.SOCK_DGRAM
+    sent = 0
+    started = time.perf_counter()
+
+    with socket.socket(family, kind) as sock:
+        sock.connect((host, port))
+        chunk = []
+        for message in messages:
+            data = prefix + message.rstrip('\n').encode('utf-8')
+            if kind == socket.SOCK_STREAM:
+                chunk.append(frame_octet_counted(data))
+                if len(chunk) >= 1000:
+                    sock.sendall(b"".join(chunk))
+                    chunk = []
+            else:
+                sock.send(data)
+            sent += 1
+            if rate and sent % 100 == 0:
+                delay = started + sent / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        if chunk:
+            sock.sendall(b"".join(chunk))
+    return sent
@@ -0,0 +1,276 @@
+import csv
+import gzip
+import io
+import json
+import struct
+import sys
+from abc import ABC, abstractmethod
+from array import array
+
+from threat_store import ThreatRecord
+
+
+class ThreatExporter(ABC):
+    """
+    Base class for exporters that write threats as they are found
+
+    An exporter can be registered with LogAnalyzer.add_exporter() so each
+    threat is written as soon as it is recorded, or fed a finished store
+    with write_all(). Output is buffered, and files ending in .gz (or
+    compress=True) are gzip compressed while writing. Subclasses define
+    write_threat().
+    """
+
+    BUFFER_SIZE = 1024 * 1024
+    binary = False
+
+    def __init__(self, filename, compress=None):
+        """
+        Args:
+            filename: Output path
+            compress: gzip the output (None = only if filename ends in .gz)
+        """
+        self.filename = filename
+        self.count = 0
+        if compress is None:
+            compress = filename.endswith('.gz')
+
+        # GzipFile does not close a file object it was given, so keep it
+        self.file = open(filename, 'wb', buffering=self.BUFFER_SIZE)
+        raw = self.file
+        if compress:
+            raw = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+            raw = io.BufferedWriter(raw, buffer_size=self.BUFFER_SIZE)
+        self.stream = raw if self.binary else io.TextIOWrapper(raw, newline='')
+
+    def write(self, threat):
+        """Write one threat (a ThreatRecord or threat dict)"""
+        self.write_threat(threat)
+        self.count += 1
+
+    @abstractmethod
+    def write_threat(self, threat):
+        """
+        Format one threat and write it to self.stream
+
+        Called by write(), which counts the threat; text exporters write
+        str to the stream, and those with binary = True write bytes.
+        """
+
+    def write_all(self, threats):
+        """Write every threat from an iterable, e.g. a threat store"""
+        for threat in threats:
+            self.write(threat)
+
+    def close(self):
+        """Flush remaining output and close the file"""
+        try:
+            self.stream.close()
+        finally:
+            self.file.close()
+
+    def __call__(self, threat):
+        self.write(threat)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CSVExporter(ThreatExporter):
+    """CSV in the same layout as export_threats_csv"""
+
+    FIELDS = ['logfile', 'line_number', 'timestamp', 'hostname', 'service',
+              'severity', 'type', 'message']
+
+    def __init__(self, filename, compress=None):
+        super().__init__(filename, compress)
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(self.FIELDS)
+
+    def write_threat(self, threat):
+        self.writer.writerow([
+            threat.get('logfile', 'Unknown'),
+            threat['line_number'],
+            threat['timestamp'],
+            threat['hostname'],
+            threat['service'],
+            threat['severity'],
+            threat['type'],
+            threat['line'],
+        ])
+
+
+class JSONLinesExporter(ThreatExporter):
+    """One JSON object per line"""
+
+    def write_threat(self, threat):
+        self.stream.write(json.dumps({field: threat.get(field) for field in ThreatRecord.FIELDS}))
+        self.stream.write('\n')
+
+
+class ColumnarExporter(ThreatExporter):
+    """
+    Compact column-oriented binary format
+
+    Rows are grouped into blocks. Within a block each column is stored
+    contiguously: integers as little-endian int64 arrays, repetitive
+    strings as a JSON dictionary (which keeps None) plus uint32 codes, and
+    raw lines as uint32 end offsets plus the concatenated UTF-8 bytes.
+    Each column is prefixed with its byte length so a loader can skip
+    columns it does not need. Use read_columnar() to read the file back.
+
+    Layout:
+        MAGIC
+        block*: uint32 row count, then per column: uint32 length + payload
+    """
+
+    MAGIC = b'THRCOL1\n'
+    COLUMNS = ThreatRecord.__slots__
+    INT_COLUMNS = ('line_number', 'message_start')
+    DICTIONARY_COLUMNS = ('logfile', 'timestamp', 'hostname', 'service', 'pid',
+                          'severity', 'type')
+    ROWS_PER_BLOCK = 65536
+    binary = True
+
+    def __init__(self, filename, compress=None):
+        super().__init__(filename, compress)
+        self.stream.write(self.MAGIC)
+        self.block = {column: [] for column in self.COLUMNS}
+        self.block_rows = 0
+
+    def write_threat(self, threat):
+        if not isinstance(threat, ThreatRecord):
+            threat = ThreatRecord.from_dict(threat)
+        for column in self.COLUMNS:
+            self.block[column].append(getattr(threat, column))
+        self.block_rows += 1
+        if self.block_rows >= self.ROWS_PER_BLOCK:
+            self.flush_block()
+
+    def flush_block(self):
+        """Encode and write the buffered rows as one block"""
+        if not self.block_rows:
+            return
+        self.stream.write(struct.pack('<I', self.block_rows))
+        for column in self.COLUMNS:
+            payload = self.encode_column(column, self.block[column])
+            self.stream.write(struct.pack('<I', len(payload)))
+            self.stream.write(payload)
+            self.block[column] = []
+        self.block_rows = 0
+
+    @classmethod
+    def encode_column(cls, column, values):
+        if column in cls.INT_COLUMNS:
+            return little_endian(array('q', values)).tobytes()
+
+        if column in cls.DICTIONARY_COLUMNS:
+            dictionary = {}
+            codes = array('I', (dictionary.setdefault(value, len(dictionary)) for value in values))
+            header = json.dumps(list(dictionary)).encode('utf-8')
+            return struct.pack('<I', len(header)) + header + little_endian(codes).tobytes()
+
+        encoded = [value.encode('utf-8') for value in values]
+        ends = array('I')
+        position = 0
+        for value in encoded:
+            position += len(value)
+            ends.append(position)
+        return little_endian(ends).tobytes() + b''.join(encoded)
+
+    def close(self):
+        self.flush_block()
+        super().close()
+
+
+def little_endian(values):
+    """Return an array in little-endian byte order"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def decode_column(column, payload, rows):
+    """Decode one column payload written by ColumnarExporter"""
+    if column in ColumnarExporter.INT_COLUMNS:
+        return little_endian(array('q', payload)).tolist()
+
+    if column in ColumnarExporter.DICTIONARY_COLUMNS:
+        header_length = struct.unpack_from('<I', payload)[0]
+        dictionary = json.loads(payload[4:4 + header_length].decode('utf-8'))
+        codes = little_endian(array('I', payload[4 + header_length:]))
+        return [dictionary[code] for code in codes]
+
+    ends = little_endian(array('I', payload[:rows * 4]))
+    data = payload[rows * 4:]
+    values = []
+    start = 0
+    for end in ends:
+        values.append(data[start:end].decode('utf-8'))
+        start = end
+    return values
+
+
+def read_columnar(filename, columns=None):
+    """
+    Read a file written by ColumnarExporter
+
+    Args:
+        filename: Input path (.gz files are decompressed)
+        columns: Only decode these columns (None = all, as ThreatRecords)
+
+    Yields:
+        ThreatRecord objects, or dicts of the requested columns
+    """
+    opener = gzip.open if filename.endswith('.gz') else open
+    with opener(filename, 'rb') as f:
+        if f.read(len(ColumnarExporter.MAGIC)) != ColumnarExporter.MAGIC:
+            raise ValueError(f"Not a columnar threat file: {filename}")
+
+        while True:
+            header = f.read(4)
+            if not header:
+                return
+            rows = struct.unpack('<I', header)[0]
+
+            decoded = {}
+            for column in ColumnarExporter.COLUMNS:
+                length = struct.unpack('<I', f.read(4))[0]
+                if columns is not None and column not in columns:
+                    f.seek(length, io.SEEK_CUR)
+                    continue
+                decoded[column] = decode_column(column, f.read(length), rows)
+
+            if columns is None:
+                for row in zip(*(decoded[column] for column in ColumnarExporter.COLUMNS)):
+                    yield ThreatRecord(*row)
+            else:
+                names = list(decoded)
+                for row in zip(*decoded.values()):
+                    yield dict(zip(names, row))
+
+
+# Exporter chosen from the output file extension (before any .gz)
+EXPORTERS = {
+    '.csv': CSVExporter,
+    '.jsonl': JSONLinesExporter,
+    '.thrc': ColumnarExporter,
+}
+
+
+def exporter_for(filename):
+    """
+    Create the exporter matching a filename
+
+    Returns:
+        ThreatExporter, or None if the extension is not supported
+    """
+    name = filename[:-3] if filename.endswith('.gz') else filename
+    for extension, exporter in EXPORTERS.items():
+        if name.endswith(extension):
+            return exporter(filename)
+    return None
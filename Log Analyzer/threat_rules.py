@@ -0,0 +1,237 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+
+try:
+    import yaml
+except ImportError:  # YAML rule packs need PyYAML; JSON packs always work
+    yaml = None
+
+
+# One threat rule. tags and services are tuples so rules can be hashed
+# and sent to worker processes.
+ThreatRule = namedtuple('ThreatRule', ['pattern', 'severity', 'name', 'tags', 'services'])
+
+SEVERITIES = ('INFO', 'WARNING', 'CRITICAL')
+
+# The built-in rule table, shipped next to this module
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "default_rules.json")
+
+
+def user_cache_dir():
+    """Per-user directory for checked rule packs (e.g. ~/.cache/log_analyzer/rule_cache)"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'log_analyzer', 'rule_cache')
+
+
+RULE_CACHE_DIR = user_cache_dir()
+
+
+def make_rule(pattern, severity, name=None, tags=(), services=()):
+    """Build a ThreatRule with normalized tags and service filters"""
+    return ThreatRule(pattern, severity, name or pattern, tuple(tags),
+                      tuple(service.lower() for service in services))
+
+
+def rules_from_patterns(patterns):
+    """Convert a {regex: severity} table to unfiltered rules"""
+    return tuple(make_rule(pattern, severity) for pattern, severity in patterns.items())
+
+
+class ServiceFilter:
+    """
+    Decide whether a rule applies to a line's service
+
+    Service names are compared case-insensitively. Names may be globs
+    (e.g. "postfix/*"). Lines without a parsed service never match a
+    filtered rule.
+    """
+
+    __slots__ = ('names', 'globs')
+
+    def __init__(self, services):
+        self.names = frozenset(service for service in services if not glob_like(service))
+        self.globs = tuple(service for service in services if glob_like(service))
+
+    def allows(self, service):
+        if not service or service == 'N/A':
+            return False
+        service = service.lower()
+        return service in self.names or any(fnmatch.fnmatchcase(service, pattern)
+                                            for pattern in self.globs)
+
+
+def glob_like(text):
+    return any(char in text for char in "*?[")
+
+
+class RulePack:
+    """
+    Threat rules loaded from a JSON or YAML file
+
+    A pack is a list of rules, or an object with a "rules" list:
+
+        {"name": "ssh", "rules": [
+            {"name": "ssh-invalid-user", "pattern": "Invalid user.*from",
+             "severity": "WARNING", "tags": ["auth"], "services": ["sshd"]}
+        ]}
+
+    "pattern" and "severity" are required. Rules with "enabled": false are
+    skipped. A pack is checked once and the normalized rules are cached in
+    cache_dir together with the hash of the pack's bytes, so later loads of
+    an unchanged pack (by any process) skip parsing and validation. Each
+    pack path has one cache file, which is replaced when the pack changes.
+    """
+
+    def __init__(self, path, tags=None, cache_dir=RULE_CACHE_DIR):
+        """
+        Args:
+            path: Rule pack file (.json, .yaml or .yml)
+            tags: Only load rules with at least one of these tags (None = all)
+            cache_dir: Directory for compiled pack caches (default: the
+                       user's cache directory, None = no cache)
+        """
+        self.path = path
+        self.tags = set(tags) if tags else None
+        self.cache_dir = cache_dir
+        self.name = os.path.basename(path)
+        self.digest = None
+        self.stat_key = None
+        self.rules = ()
+        self.load()
+
+    def load(self):
+        """
+        Read the pack, using the cache when the contents are unchanged
+
+        The current rules are kept if the pack is invalid.
+
+        Raises:
+            ValueError: If the pack cannot be read or a rule is invalid
+        """
+        try:
+            stat = os.stat(self.path)
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise ValueError(f"Cannot read rule pack {self.path}: {e}")
+        # Set first so a broken edit is reported once, not on every changed() check
+        self.stat_key = (stat.st_mtime_ns, stat.st_size)
+
+        digest = hashlib.sha256(data).hexdigest()
+        rules = self.load_cache(digest)
+        if rules is None:
+            rules = self.parse(data)
+            self.save_cache(digest, rules)
+
+        if self.tags is not None:
+            rules = tuple(rule for rule in rules if self.tags.intersection(rule.tags))
+        self.rules = rules
+        self.digest = digest
+
+    def changed(self):
+        """Return True if the pack file was modified since it was loaded"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_mtime_ns, stat.st_size) != self.stat_key
+
+    def parse(self, data):
+        """
+        Parse and validate pack contents
+
+        Returns:
+            Tuple of ThreatRules
+        """
+        is_yaml = self.path.endswith(('.yaml', '.yml'))
+        if is_yaml and yaml is None:
+            raise ValueError("YAML rule packs need PyYAML (pip install pyyaml)")
+        try:
+            pack = yaml.safe_load(data) if is_yaml else json.loads(data)
+        except Exception as e:  # json and yaml raise different error types
+            raise ValueError(f"Invalid rule pack {self.path}: {e}")
+
+        if isinstance(pack, dict):
+            self.name = pack.get('name', self.name)
+            pack = pack.get('rules')
+        if not isinstance(pack, list):
+            raise ValueError(f"Rule pack {self.path} has no list of rules")
+
+        rules = []
+        for number, entry in enumerate(pack, 1):
+            if not isinstance(entry, dict) or 'pattern' not in entry or 'severity' not in entry:
+                raise ValueError(f"Rule {number} in {self.path} needs a pattern and a severity")
+            if not entry.get('enabled', True):
+                continue
+            severity = str(entry['severity']).upper()
+            if severity not in SEVERITIES:
+                raise ValueError(f"Rule {number} in {self.path} has unknown severity "
+                                 f"{entry['severity']!r} (use {', '.join(SEVERITIES)})")
+            try:
+                re.compile(str(entry['pattern']))
+            except re.error as e:
+                raise ValueError(f"Rule {number} in {self.path} has an invalid pattern: {e}")
+            rules.append(make_rule(str(entry['pattern']), severity, entry.get('name'),
+                                   entry.get('tags', ()), entry.get('services', ())))
+        return tuple(rules)
+
+    def cache_file(self):
+        """Cache file of this pack, named by the hash of its absolute path"""
+        key = hashlib.sha256(os.fsencode(os.path.abspath(self.path))).hexdigest()
+        return os.path.join(self.cache_dir, f"{key[:32]}.json")
+
+    def load_cache(self, digest):
+        """Return cached rules for a pack digest, or None"""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self.cache_file(), 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('digest') != digest:
+            return None
+        self.name = cached['name']
+        return tuple(ThreatRule(pattern, severity, name, tuple(tags), tuple(services))
+                     for pattern, severity, name, tags, services in cached['rules'])
+
+    def save_cache(self, digest, rules):
+        """Write normalized rules to the cache (best effort)"""
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Replaces the cache of the pack's previous contents
+            cache_file = self.cache_file()
+            temp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump({'digest': digest, 'name': self.name, 'rules': rules}, f)
+            os.replace(temp_file, cache_file)
+        except OSError:
+            pass
+
+
+def default_rules(fallback=()):
+    """
+    Load the built-in rules from default_rules.json
+
+    Args:
+        fallback: Rules to use if the file is missing or invalid
+
+    Returns:
+        Tuple of ThreatRules
+    """
+    if not os.path.exists(DEFAULT_RULES_FILE):
+        return tuple(fallback)
+    try:
+        return RulePack(DEFAULT_RULES_FILE, cache_dir=None).rules
+    except ValueError as e:
+        print(f"Error: {e} (using the built-in patterns)")
+        return tuple(fallback)
@@ -0,0 +1,507 @@
+import bisect
+import heapq
+import itertools
+import re
+import sqlite3
+import sys
+from array import array
+from collections import Counter
+
+from log_correlation import SyslogClock
+
+
+class ThreatRecord:
+    """
+    Compact record of one detected threat
+
+    Uses __slots__ instead of a dict and interns the low-cardinality
+    strings (severity, type, hostname, service, logfile) so millions of
+    records share them. The message is not stored separately because it
+    is always the tail of the raw line. Supports threat['field'] and
+    threat.get('field') so it can be used like the old threat dicts.
+    """
+
+    __slots__ = ('logfile', 'line_number', 'timestamp', 'hostname', 'service',
+                 'pid', 'severity', 'type', 'line', 'message_start')
+
+    FIELDS = ('logfile', 'line_number', 'timestamp', 'hostname', 'service',
+              'pid', 'severity', 'type', 'message', 'line')
+
+    def __init__(self, logfile, line_number, timestamp, hostname, service,
+                 pid, severity, type, line, message_start=0):
+        self.logfile = sys.intern(logfile)
+        self.line_number = line_number
+        self.timestamp = timestamp
+        self.hostname = sys.intern(hostname)
+        self.service = sys.intern(service)
+        self.pid = pid
+        self.severity = sys.intern(severity)
+        self.type = sys.intern(type)
+        self.line = line
+        self.message_start = message_start
+
+    @classmethod
+    def from_dict(cls, threat):
+        """Build a record from a threat dict as produced by analyze_lines"""
+        line = threat['line']
+        message = threat['message']
+        message_start = len(line) - len(message) if line.endswith(message) else 0
+        return cls(threat.get('logfile', 'Unknown'), threat['line_number'], threat['timestamp'],
+                   threat['hostname'], threat['service'], threat['pid'], threat['severity'],
+                   threat['type'], line, message_start)
+
+    @property
+    def message(self):
+        return self.line[self.message_start:]
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def __eq__(self, other):
+        if not isinstance(other, ThreatRecord):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        return f"ThreatRecord({self.severity} {self.logfile}:{self.line_number} {self.type!r})"
+
+
+# Source address after "from", "rhost=" or "SRC=", else the first IPv4 address
+SOURCE_IP_PATTERN = re.compile(
+    r"(?:\bfrom|\brhost=|\bSRC=|\bsrc=)\s*\[?((?:\d{1,3}\.){3}\d{1,3}|[0-9A-Fa-f]*:[0-9A-Fa-f:.]*[0-9A-Fa-f])"
+    r"|\b((?:\d{1,3}\.){3}\d{1,3})\b")
+
+
+def source_ip(line):
+    """Return the source IP address mentioned in a log line, or None"""
+    match = SOURCE_IP_PATTERN.search(line)
+    if not match:
+        return None
+    return sys.intern(match.group(1) or match.group(2))
+
+
+class ThreatFilter:
+    """
+    Conditions for a threat query
+
+    Every condition is optional; a threat must meet all the given ones.
+    Times are epoch seconds compared with the threat's log timestamp
+    (RFC 3164 timestamps have no year, see SyslogClock).
+    """
+
+    __slots__ = ('severity', 'service', 'hostname', 'source_ip', 'since', 'until')
+
+    def __init__(self, severity=None, service=None, hostname=None, source_ip=None,
+                 since=None, until=None):
+        self.severity = severity
+        self.service = service
+        self.hostname = hostname
+        self.source_ip = source_ip
+        self.since = since
+        self.until = until
+
+    def equalities(self):
+        """Return the (field, value) conditions that must match exactly"""
+        return [(field, getattr(self, field))
+                for field in ('severity', 'service', 'hostname', 'source_ip')
+                if getattr(self, field) is not None]
+
+    def timed(self):
+        return self.since is not None or self.until is not None
+
+    def __bool__(self):
+        return any(getattr(self, slot) is not None for slot in self.__slots__)
+
+
+class ThreatIndex:
+    """
+    Secondary indexes over the positions of records in a MemoryThreatStore
+
+    For each severity, service, hostname, source IP and minute of log time
+    the index keeps an array of record positions in insertion order. A
+    query walks the shortest matching array (narrowed by bisection to the
+    positions a time range can cover) and checks the remaining conditions
+    on those records only, so its cost depends on how many threats match
+    its most selective condition, not on the store size.
+    """
+
+    BUCKET_SECONDS = 60
+    FIELDS = ('severity', 'service', 'hostname', 'source_ip', 'bucket')
+
+    def __init__(self):
+        self.clock = SyslogClock()
+        self.clear()
+
+    def clear(self):
+        self.positions = {field: {} for field in self.FIELDS}
+        self.epochs = array('q')  # log time of each record (-1 if unknown)
+        self.source_ips = []      # source IP of each record (or None)
+
+    def add(self, position, record):
+        """Index the record stored at a position"""
+        ip = source_ip(record.line)
+        epoch = self.clock.to_epoch(record.timestamp)
+        self.epochs.append(-1 if epoch is None else epoch)
+        self.source_ips.append(ip)
+
+        bucket = None if epoch is None else epoch // self.BUCKET_SECONDS
+        for field, value in (('severity', record.severity), ('service', record.service),
+                             ('hostname', record.hostname), ('source_ip', ip),
+                             ('bucket', bucket)):
+            if value is not None:
+                positions = self.positions[field].get(value)
+                if positions is None:
+                    positions = self.positions[field][value] = array('I')
+                positions.append(position)
+
+    def time_buckets(self, since, until):
+        """
+        Find the buckets overlapping [since, until]
+
+        Returns:
+            (position arrays of buckets entirely inside the range,
+             position arrays of the partly covered buckets at its ends)
+        """
+        inside, edges = [], []
+        for bucket, positions in self.positions['bucket'].items():
+            start = bucket * self.BUCKET_SECONDS
+            end = start + self.BUCKET_SECONDS - 1
+            if (since is not None and end < since) or (until is not None and start > until):
+                continue
+            if (since is None or start >= since) and (until is None or end <= until):
+                inside.append(positions)
+            else:
+                edges.append(positions)
+        return inside, edges
+
+    def candidates(self, conditions, record_count):
+        """
+        Positions that may match, in insertion order
+
+        Returns:
+            (iterable of positions, True if every candidate is known to
+             satisfy all the conditions)
+        """
+        options = []
+        for field, value in conditions.equalities():
+            positions = self.positions[field].get(value)
+            if positions is None:
+                return (), True
+            options.append((len(positions), positions))
+
+        if conditions.timed():
+            selected = [positions for group in self.time_buckets(conditions.since, conditions.until)
+                        for positions in group]
+            if not selected:
+                return (), True
+            size = sum(len(positions) for positions in selected)
+            if not options or size <= min(options)[0]:
+                return heapq.merge(*selected), False
+
+            # Matching records lie between the first and last position in range
+            low = min(positions[0] for positions in selected)
+            high = max(positions[-1] for positions in selected)
+            size, positions = min(options, key=lambda option: option[0])
+            return positions[bisect.bisect_left(positions, low):
+                             bisect.bisect_right(positions, high)], False
+
+        if not options:
+            return range(record_count), True
+        size, positions = min(options, key=lambda option: option[0])
+        return positions, len(options) == 1
+
+    def count_in_range(self, since, until):
+        """Count records whose log time is in [since, until]"""
+        inside, edges = self.time_buckets(since, until)
+        count = sum(len(positions) for positions in inside)
+        for positions in edges:
+            count += sum(1 for position in positions
+                         if (since is None or self.epochs[position] >= since)
+                         and (until is None or self.epochs[position] <= until))
+        return count
+
+    def matches(self, position, record, conditions):
+        """Check every condition against one record"""
+        if conditions.severity is not None and record.severity != conditions.severity:
+            return False
+        if conditions.service is not None and record.service != conditions.service:
+            return False
+        if conditions.hostname is not None and record.hostname != conditions.hostname:
+            return False
+        if conditions.source_ip is not None and self.source_ips[position] != conditions.source_ip:
+            return False
+        if conditions.timed():
+            epoch = self.epochs[position]
+            if epoch < 0:
+                return False
+            if conditions.since is not None and epoch < conditions.since:
+                return False
+            if conditions.until is not None and epoch > conditions.until:
+                return False
+        return True
+
+    def latest_epoch(self):
+        """Newest log time of any indexed record, or None"""
+        buckets = self.positions['bucket']
+        if not buckets:
+            return None
+        return max(self.epochs[position] for position in buckets[max(buckets)])
+
+
+class MemoryThreatStore:
+    """
+    In-memory list of ThreatRecords (the default store)
+
+    Records are indexed as they are added (see ThreatIndex), so filtered
+    and paginated queries stay fast with millions of threats.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.severity_counts = Counter()
+        self.index = ThreatIndex()
+
+    def append(self, threat):
+        """
+        Store a threat dict or record
+
+        Returns:
+            The stored ThreatRecord
+        """
+        record = threat if isinstance(threat, ThreatRecord) else ThreatRecord.from_dict(threat)
+        self.index.add(len(self.records), record)
+        self.records.append(record)
+        self.severity_counts[record.severity] += 1
+        return record
+
+    def query(self, severity=None, service=None, hostname=None, source_ip=None,
+              since=None, until=None, offset=0, limit=None):
+        """
+        Iterate over stored threats matching every given condition
+
+        Args:
+            severity, service, hostname, source_ip: Exact values to match
+            since, until: Epoch seconds range of the log timestamp
+            offset: Matching threats to skip (for pagination)
+            limit: Maximum threats to return (None = all)
+
+        Returns:
+            Iterator of ThreatRecords in the order they were found
+        """
+        conditions = ThreatFilter(severity, service, hostname, source_ip, since, until)
+        return self.page(self.matching(conditions), offset, limit)
+
+    def matching(self, conditions):
+        positions, exact = self.index.candidates(conditions, len(self.records))
+        records = self.records
+        if exact:
+            return (records[position] for position in positions)
+        return (records[position] for position in positions
+                if self.index.matches(position, records[position], conditions))
+
+    @staticmethod
+    def page(records, offset=0, limit=None):
+        if offset or limit is not None:
+            return itertools.islice(records, offset, None if limit is None else offset + limit)
+        return records
+
+    def count(self, severity=None, service=None, hostname=None, source_ip=None,
+              since=None, until=None):
+        """Count stored threats matching every given condition (see query)"""
+        conditions = ThreatFilter(severity, service, hostname, source_ip, since, until)
+        if not conditions:
+            return len(self.records)
+        if not conditions.equalities():
+            return self.index.count_in_range(conditions.since, conditions.until)
+        positions, exact = self.index.candidates(conditions, len(self.records))
+        if exact:
+            return len(positions)
+        return sum(1 for _ in self.matching(conditions))
+
+    def latest_epoch(self):
+        """Newest log time of any stored threat (epoch seconds), or None"""
+        return self.index.latest_epoch()
+
+    def count_by_severity(self):
+        """Return {severity: count}"""
+        return dict(self.severity_counts)
+
+    def clear(self):
+        self.records.clear()
+        self.severity_counts.clear()
+        self.index.clear()
+
+    def flush(self):
+        """Nothing is buffered in memory"""
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+
+class SQLiteThreatStore:
+    """
+    Threat store backed by an SQLite file
+
+    Records are buffered and inserted in batches, and reads stream rows
+    from the database, so memory use does not grow with the number of
+    threats. Threats stored by earlier runs stay in the file and are
+    included in summaries and exports. Each row also stores the threat's
+    source IP and log time (epoch), and indexed columns keep filtered,
+    paginated queries fast.
+    """
+
+    COLUMNS = ('logfile', 'line_number', 'timestamp', 'hostname', 'service',
+               'pid', 'severity', 'type', 'line', 'message_start')
+    # Derived columns used only for queries (epoch is -1 when unknown)
+    QUERY_COLUMNS = ('source_ip', 'epoch')
+    INDEXES = ('severity, epoch', 'service, epoch', 'hostname, epoch', 'source_ip, epoch',
+               'epoch')
+
+    def __init__(self, database_file="threats.db", batch_size=10000):
+        """
+        Args:
+            database_file: SQLite database path
+            batch_size: Threats buffered before each insert
+        """
+        self.database_file = database_file
+        self.batch_size = batch_size
+        self.pending = []
+        self.clock = SyslogClock()
+
+        self.connection = sqlite3.connect(database_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS threats (
+                id INTEGER PRIMARY KEY,
+                {', '.join(self.COLUMNS + self.QUERY_COLUMNS)}
+            )""")
+        self.upgrade()
+        for columns in self.INDEXES:
+            name = "threats_by_" + columns.replace(', ', '_')
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON threats ({columns})")
+        self.connection.commit()
+
+    def upgrade(self):
+        """Add and fill the query columns in databases from older versions"""
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(threats)")}
+        for column in self.QUERY_COLUMNS:
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE threats ADD COLUMN {column}")
+
+        rows = self.connection.execute(
+            "SELECT id, line, timestamp FROM threats WHERE epoch IS NULL").fetchall()
+        if rows:
+            self.connection.executemany(
+                "UPDATE threats SET source_ip = ?, epoch = ? WHERE id = ?",
+                ((*self.query_values(line, timestamp), row_id) for row_id, line, timestamp in rows))
+
+    def query_values(self, line, timestamp):
+        epoch = self.clock.to_epoch(timestamp)
+        return source_ip(line), -1 if epoch is None else epoch
+
+    def append(self, threat):
+        """
+        Buffer a threat dict or record for insertion
+
+        Returns:
+            The ThreatRecord
+        """
+        record = threat if isinstance(threat, ThreatRecord) else ThreatRecord.from_dict(threat)
+        self.pending.append(tuple(getattr(record, column) for column in self.COLUMNS)
+                            + self.query_values(record.line, record.timestamp))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return record
+
+    def flush(self):
+        """Insert buffered threats"""
+        if not self.pending:
+            return
+        columns = self.COLUMNS + self.QUERY_COLUMNS
+        placeholders = ', '.join('?' * len(columns))
+        self.connection.executemany(
+            f"INSERT INTO threats ({', '.join(columns)}) VALUES ({placeholders})",
+            self.pending)
+        self.connection.commit()
+        self.pending = []
+
+    @staticmethod
+    def where(conditions):
+        """Build the WHERE clause and parameters for a ThreatFilter"""
+        clauses = [f"{field} = ?" for field, _ in conditions.equalities()]
+        params = [value for _, value in conditions.equalities()]
+        if conditions.timed():
+            clauses.append("epoch >= ?")
+            params.append(conditions.since if conditions.since is not None else 0)
+        if conditions.until is not None:
+            clauses.append("epoch <= ?")
+            params.append(conditions.until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, severity=None, service=None, hostname=None, source_ip=None,
+              since=None, until=None, offset=0, limit=None):
+        """
+        Stream stored threats matching every given condition, in insertion order
+
+        Takes the same arguments as MemoryThreatStore.query().
+        """
+        self.flush()
+        where, params = self.where(
+            ThreatFilter(severity, service, hostname, source_ip, since, until))
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM threats{where} ORDER BY id"
+        if offset or limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else limit, offset]
+        for row in self.connection.execute(sql, params):
+            yield ThreatRecord(*row)
+
+    def count(self, severity=None, service=None, hostname=None, source_ip=None,
+              since=None, until=None):
+        """Count stored threats matching every given condition"""
+        self.flush()
+        where, params = self.where(
+            ThreatFilter(severity, service, hostname, source_ip, since, until))
+        return self.connection.execute(f"SELECT COUNT(*) FROM threats{where}", params).fetchone()[0]
+
+    def latest_epoch(self):
+        """Newest log time of any stored threat (epoch seconds), or None"""
+        self.flush()
+        latest = self.connection.execute("SELECT MAX(epoch) FROM threats").fetchone()[0]
+        return latest if latest is not None and latest >= 0 else None
+
+    def count_by_severity(self):
+        """Return {severity: count}"""
+        self.flush()
+        return dict(self.connection.execute(
+            "SELECT severity, COUNT(*) FROM threats GROUP BY severity"))
+
+    def clear(self):
+        self.pending = []
+        self.connection.execute("DELETE FROM threats")
+        self.connection.commit()
+
+    def close(self):
+        self.flush()
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+
+    def __len__(self):
+        self.flush()
+        return self.connection.execute("SELECT COUNT(*) FROM threats").fetchone()[0]
+
+    def __iter__(self):
+        return self.query()